@@ -0,0 +1,170 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      accounts.py                                                       #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Tabela nick → conta de serviços (NickServ), com TTL. É preenchida #
+#                pelas capacidades IRCv3 account-notify, extended-join e           #
+#                account-tag e, quando o servidor não as tem, por uma consulta     #
+#                ACC/STATUS ao NickServ. Os admins são verificados pela conta e    #
+#                não pelo nick, sem um pedido à rede por cada comando.             #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import re
+import time
+
+from irc.strings import lower
+
+from config import CONTAS_TTL, CONTAS_TIMEOUT
+from logger import obter_logger
+
+logger = obter_logger("contas")
+
+# Capacidades IRCv3 que dão a conta de cada utilizador sem consultas
+CAPACIDADES = ("account-notify", "extended-join", "account-tag")
+
+# Respostas do NickServ (3 = identificado com a palavra-passe)
+_STATUS = re.compile(r"^STATUS (\S+) (\d)(?: (\S+))?")            # Anope
+_ACC = re.compile(r"^(\S+)(?: -> (\S+))? ACC (\d)")                # Atheme
+_FORMATACAO = re.compile(r"[\x02\x03\x0f\x16\x1d\x1f]|\x03\d{0,2}(,\d{1,2})?")
+
+class TabelaContas:
+    """
+    'consultar(nick)' envia o pedido ACC/STATUS ao NickServ; a resposta chega
+    por NOTICE e resolve quem estiver à espera em verificar().
+    'cap' é a NegociacaoCAP da ligação (para saber que capacidades estão ativas).
+    'visivel(nick)' diz se o nick partilha algum canal com o bot: sem canal em
+    comum o QUIT não chega, por isso a cache desse nick não é de confiança.
+    """
+
+    def __init__(self, consultar, cap=None, ttl=CONTAS_TTL, visivel=None):
+        self.consultar = consultar
+        self.cap = cap
+        self.ttl = ttl
+        self.visivel = visivel
+        self._contas = {}     # chave do nick → (conta ou None, expira_em)
+        self._pendentes = {}  # chave do nick → Future com a resposta do NickServ
+        self.consultas = 0    # Pedidos feitos ao NickServ (cache falhou)
+
+    def associar(self, connection):
+        for evento in ("join", "account", "nick", "quit", "pubmsg", "privmsg", "privnotice", "disconnect"):
+            connection.add_global_handler(evento, getattr(self, f"_on_{evento}"), -10)
+
+    def _ativa(self, capacidade):
+        return self.cap is not None and capacidade in self.cap.ativas
+
+    # ============================================================================ #
+    # --------------------------------- Consultas -------------------------------- #
+    # ============================================================================ #
+
+    def conta(self, nick):
+        """
+        Só a cache, sem pedidos: devolve (conhecida, conta). 'conta' é None
+        quando o nick não está identificado.
+        """
+        entrada = self._contas.get(lower(nick))
+        if entrada is None or entrada[1] <= time.monotonic():
+            return False, None
+        # Fora dos canais o nick pode já ser de outra pessoa sem o bot saber; só o
+        # account-tag (que vem em cada mensagem privada) mantém a conta em dia
+        if self.visivel is not None and not self.visivel(nick) and not self._ativa("account-tag"):
+            return False, None
+        return True, entrada[0]
+
+    async def verificar(self, nick, timeout=CONTAS_TIMEOUT):
+        # Conta do nick: da cache ou, se não estiver lá, perguntando ao NickServ.
+        conhecida, conta = self.conta(nick)
+        if conhecida:
+            return conta
+
+        chave = lower(nick)
+        futuro = self._pendentes.get(chave)
+        if futuro is None:
+            futuro = self._pendentes[chave] = asyncio.get_running_loop().create_future()
+            self.consultas += 1
+            self.consultar(nick)
+        try:
+            return await asyncio.wait_for(asyncio.shield(futuro), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("O NickServ não respondeu sobre %s; tratado como não identificado.", nick)
+            if self._pendentes.get(chave) is futuro:
+                del self._pendentes[chave]
+            return None
+
+    # ============================================================================ #
+    # ----------------------------- Atualização ---------------------------------- #
+    # ============================================================================ #
+
+    def _guardar(self, nick, conta):
+        chave = lower(nick)
+        self._contas[chave] = (conta, time.monotonic() + self.ttl)
+        futuro = self._pendentes.pop(chave, None)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(conta)
+
+    def esquecer(self, nick):
+        # Chamado também pelo EstadoCanais quando o nick deixa de partilhar canais com o bot
+        self._contas.pop(lower(nick), None)
+
+    def _on_join(self, connection, event):
+        # extended-join: JOIN #canal conta :nome real ("*" = sem conta)
+        if self._ativa("extended-join") and event.arguments:
+            conta = event.arguments[0]
+            self._guardar(event.source.nick, None if conta == "*" else conta)
+
+    def _on_account(self, connection, event):
+        # account-notify: ACCOUNT conta (ou "*" ao terminar a sessão)
+        self._guardar(event.source.nick, None if event.target in (None, "*") else event.target)
+
+    def _on_pubmsg(self, connection, event):
+        # account-tag: cada mensagem traz a conta de quem a enviou (ou nada, se não tiver)
+        if not self._ativa("account-tag") or event.source is None:
+            return
+        conta = None
+        for tag in event.tags or ():
+            if tag["key"] == "account":
+                conta = tag["value"]
+                break
+        self._guardar(event.source.nick, conta)
+
+    _on_privmsg = _on_pubmsg
+
+    def _on_nick(self, connection, event):
+        # A conta acompanha o utilizador; só se confia nela se o servidor avisa mudanças
+        entrada = self._contas.pop(lower(event.source.nick), None)
+        if entrada is not None and self._ativa("account-notify"):
+            self._contas[lower(event.target)] = entrada
+        else:
+            self.esquecer(event.target)
+
+    def _on_quit(self, connection, event):
+        self.esquecer(event.source.nick)
+
+    def _on_privnotice(self, connection, event):
+        if event.source is None or lower(event.source.nick) != "nickserv" or not event.arguments:
+            return
+        texto = _FORMATACAO.sub("", event.arguments[0]).strip()
+        m = _STATUS.match(texto)
+        if m:
+            nick, nivel, conta = m.group(1), m.group(2), m.group(3) or m.group(1)
+        else:
+            m = _ACC.match(texto)
+            if not m:
+                return
+            nick, conta, nivel = m.group(1), m.group(2) or m.group(1), m.group(3)
+        self._guardar(nick, conta if nivel == "3" else None)
+
+    def _on_disconnect(self, connection, event):
+        self._contas.clear()
+        for futuro in self._pendentes.values():
+            if not futuro.done():
+                futuro.set_result(None)
+        self._pendentes.clear()
+
+    def estatisticas(self):
+        return {"em_cache": len(self._contas), "pendentes": len(self._pendentes),
+                "consultas": self.consultas}
@@ -0,0 +1,133 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      alertas.py                                                        #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Benchmark dos alertas de preço. Cria dezenas de milhares de       #
+#                alertas em SQLite, mede o arranque (carregar o índice), e faz     #
+#                os preços de todas as moedas variarem ao acaso, medindo o custo   #
+#                de avaliar cada preço novo com as listas ordenadas (bisect)       #
+#                contra uma passagem por todos os alertas do par. Os resultados    #
+#                vão para JSON como os do bench.py.                                #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+#                                                                                  #
+# Uso:                                                                             #
+#   python benchmarks/alertas.py                      # 50 mil alertas, 200 moedas #
+#   python benchmarks/alertas.py --alertas 200000 --moedas 50 --ticks 2000         #
+#                                                                                  #
+# ================================================================================ #
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+PASTA = tempfile.mkdtemp(prefix="bench-alertas-")
+# Antes de importar o plugin: a base de dados e o log ficam na pasta temporária
+os.environ.update({
+    "ALERTAS_DB": os.path.join(PASTA, "alertas.db"),
+    "LOG_FICHEIRO": os.path.join(PASTA, "bench.log"),
+    "LOG_NIVEL": "WARNING",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench import gravar
+from plugins import alerts
+
+def _percentis(tempos):
+    tempos = sorted(tempos)
+    def p(q):
+        return round(1e6 * tempos[min(len(tempos) - 1, int(q * len(tempos)))], 2)
+    return {"p50_us": p(0.50), "p99_us": p(0.99), "max_us": p(1.0)}
+
+def criar(n, moedas, r):
+    # Alertas à volta do preço inicial (100), metade a subir e metade a descer
+    inicio = time.perf_counter()
+    for i in range(n):
+        operador = ">" if i % 2 else "<"
+        fator = 1 + r.uniform(0.001, 0.3)
+        limite = round(100 * fator if operador == ">" else 100 / fator, 2)
+        alerts.adicionar("bench", f"#canal{i % 50}", f"nick{i}", r.choice(moedas), "EUR", operador, limite)
+    return {"alertas": n, "por_segundo": round(n / (time.perf_counter() - inicio))}
+
+def carregar():
+    inicio = time.perf_counter()
+    alerts.carregar()
+    return {"alertas": len(alerts._alertas), "segundos": round(time.perf_counter() - inicio, 3)}
+
+def _passagem(alertas, preco):
+    # Referência: o que custaria sem o índice (ver todos os alertas do par)
+    return [a for a in alertas if (a.operador == ">" and preco > a.limite) or
+            (a.operador == "<" and preco < a.limite)]
+
+def ticks(n, moedas, r):
+    """
+    Passeio aleatório dos preços (±0,5% por tick). Os alertas que disparam são
+    recriados com um limite novo, para o número de alertas ficar constante.
+    """
+    precos = dict.fromkeys(moedas, 100.0)
+    tempos, tempos_passagem, total = [], [], 0
+    proximo_id = max(alerts._alertas) + 1
+    for _ in range(n):
+        for moeda in moedas:
+            par = (moeda, "EUR")
+            preco = precos[moeda] = precos[moeda] * (1 + r.uniform(-0.005, 0.005))
+
+            # Referência medida sobre a mesma população, antes de o índice mudar
+            do_par = [alerts._alertas[i] for lado in (alerts._acima, alerts._abaixo)
+                      for i in lado.get(par, ((), ()))[1]]
+            inicio = time.perf_counter()
+            _passagem(do_par, preco)
+            tempos_passagem.append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            disparados = alerts.avaliar(par, preco)
+            tempos.append(time.perf_counter() - inicio)
+
+            total += len(disparados)
+            for alerta in disparados:
+                fator = 1 + r.uniform(0.001, 0.3)
+                limite = preco * fator if alerta.operador == ">" else preco / fator
+                alerts._indexar(alerts.Alerta(proximo_id, alerta.rede, alerta.canal, alerta.nick,
+                                              moeda, "EUR", alerta.operador, limite))
+                proximo_id += 1
+    return {"avaliacoes": len(tempos), "disparados": total,
+            **_percentis(tempos), "passagem": _percentis(tempos_passagem)}
+
+def executar(opcoes):
+    r = random.Random(1)
+    moedas = [f"M{i:03d}" for i in range(opcoes.moedas)]
+    resultados = {}
+    print(f"⏳ A criar {opcoes.alertas} alertas em {PASTA} ...")
+    resultados["criar"] = criar(opcoes.alertas, moedas, r)
+    resultados["carregar"] = carregar()
+    resultados["tick"] = ticks(opcoes.ticks, moedas, r)
+    resultados["passagem"] = resultados["tick"].pop("passagem")
+
+    for nome, valores in resultados.items():
+        print(f"  {nome:<20} " + "  ".join(f"{k}={v}" for k, v in valores.items()))
+    return {"alertas": resultados}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos alertas de preço (!alert).")
+    parser.add_argument("--alertas", type=int, default=50_000)
+    parser.add_argument("--moedas", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=500, help="preços novos por moeda")
+    parser.add_argument("--saida", help="ficheiro JSON (por defeito em benchmarks/resultados/)")
+    opcoes = parser.parse_args()
+    try:
+        resultados = executar(opcoes)
+        gravar(resultados, opcoes)
+    finally:
+        alerts.fechar()
+        shutil.rmtree(PASTA, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      arquivo.py                                                        #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Benchmark do arquivo dos canais. Mede o custo do arquivar() no    #
+#                event loop, o débito da gravação em lote (ficheiros .log.gz e     #
+#                índice FTS5), as consultas !grep/!last e a reconstrução do        #
+#                índice. Os resultados vão para JSON como os do bench.py.          #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+#                                                                                  #
+# Uso:                                                                             #
+#   python benchmarks/arquivo.py                      # 1 milhão de mensagens      #
+#   python benchmarks/arquivo.py --mensagens 5000000 --consultas 2000              #
+#                                                                                  #
+# ================================================================================ #
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+PASTA = tempfile.mkdtemp(prefix="bench-arquivo-")
+# Antes de importar o plugin: o arquivo e o log ficam na pasta temporária
+os.environ.update({
+    "ARQUIVO_CANAIS": "*",
+    "ARQUIVO_PASTA": PASTA,
+    "LOG_FICHEIRO": os.path.join(PASTA, "bench.log"),
+    "LOG_NIVEL": "WARNING",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench import gravar
+from plugins import archive
+
+PALAVRAS = ("bitcoin", "olá", "preço", "bot", "servidor", "amanhã", "canal", "linux", "python",
+            "café", "jogo", "ontem", "porto", "lisboa", "música", "futebol", "chuva", "sol")
+
+def _mensagem(r):
+    return " ".join(r.choice(PALAVRAS) for _ in range(r.randint(3, 12))) + f" {r.randrange(10 ** 6)}"
+
+def _percentis(tempos):
+    tempos = sorted(tempos)
+    def p(q):
+        return round(1000 * tempos[min(len(tempos) - 1, int(q * len(tempos)))], 3)
+    return {"p50_ms": p(0.50), "p99_ms": p(0.99), "max_ms": p(1.0)}
+
+def ingerir(n, canais):
+    # Mede o tempo no event loop (arquivar) e o tempo total até estar tudo em disco.
+    r = random.Random(1)
+    nicks = [f"nick{i}" for i in range(500)]
+    mensagens = [(f"#canal{i % canais}", r.choice(nicks), _mensagem(r)) for i in range(n)]
+    inicio = time.perf_counter()
+    no_loop = 0.0
+    for canal, nick, texto in mensagens:
+        t = time.perf_counter()
+        archive.arquivar("bench", canal, nick, texto)
+        no_loop += time.perf_counter() - t
+    archive.flush()
+    # Espera pela thread (a última gravação pedida termina depois de todas as anteriores)
+    archive._thread().submit(lambda: None).result()
+    total = time.perf_counter() - inicio
+    return {"mensagens": n, "canais": canais,
+            "arquivar_us": round(1e6 * no_loop / n, 2),
+            "por_segundo": round(n / total)}
+
+def medir(funcao, argumentos):
+    tempos = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        asyncio.run(archive._na_thread(funcao, *args, float("inf"), archive.ARQUIVO_POR_PAGINA + 1))
+        tempos.append(time.perf_counter() - inicio)
+    return _percentis(tempos)
+
+def executar(opcoes):
+    r = random.Random(2)
+    resultados = {}
+    print(f"⏳ A arquivar {opcoes.mensagens} mensagens em {PASTA} ...")
+    resultados["ingestao"] = ingerir(opcoes.mensagens, opcoes.canais)
+    ficheiros = sum(os.path.getsize(c) for c, _, _, _ in archive._segmentos())
+    resultados["tamanho"] = {"ficheiros_mb": round(ficheiros / 2 ** 20, 1),
+                             "indice_mb": round(os.path.getsize(archive.DB_PATH) / 2 ** 20, 1)}
+
+    canais = [f"#canal{i}" for i in range(opcoes.canais)]
+    resultados["grep_comum"] = medir(archive._grep, [
+        ("bench", r.choice(canais), r.choice(PALAVRAS)) for _ in range(opcoes.consultas)])
+    resultados["grep_raro"] = medir(archive._grep, [
+        ("bench", r.choice(canais), str(r.randrange(10 ** 6))) for _ in range(opcoes.consultas)])
+    resultados["grep_duas_palavras"] = medir(archive._grep, [
+        ("bench", r.choice(canais), f"{r.choice(PALAVRAS)} {r.choice(PALAVRAS)}")
+        for _ in range(opcoes.consultas)])
+    resultados["last"] = medir(archive._last, [
+        ("bench", r.choice(canais), f"nick{r.randrange(500)}") for _ in range(opcoes.consultas)])
+
+    inicio = time.perf_counter()
+    total = asyncio.run(archive.reindexar())
+    resultados["reindexar"] = {"mensagens": total, "segundos": round(time.perf_counter() - inicio, 1)}
+
+    for nome, valores in resultados.items():
+        print(f"  {nome:<20} " + "  ".join(f"{k}={v}" for k, v in valores.items()))
+    return {"arquivo": resultados}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do arquivo dos canais (!grep/!last).")
+    parser.add_argument("--mensagens", type=int, default=1_000_000)
+    parser.add_argument("--canais", type=int, default=20)
+    parser.add_argument("--consultas", type=int, default=1000)
+    parser.add_argument("--saida", help="ficheiro JSON (por defeito em benchmarks/resultados/)")
+    opcoes = parser.parse_args()
+    try:
+        resultados = executar(opcoes)
+        gravar(resultados, opcoes)
+    finally:
+        archive.fechar()
+        shutil.rmtree(PASTA, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
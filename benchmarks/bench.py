@@ -0,0 +1,509 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      bench.py                                                          #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Benchmark de carga do bot. Arranca o bot.py verdadeiro num        #
+#                processo à parte, ligado a um servidor IRC local (TCP ou TLS) e   #
+#                a APIs falsas do Telegram e da Binance, e mede cenários de        #
+#                tráfego: mensagens públicas, tempestades de comandos, !crypto,    #
+#                netsplits com rajadas de JOIN, ciclos de reconexão e a ponte com  #
+#                o Telegram e alertas de preço. Mostra mensagens/s, latência       #
+#                p50/p99, CPU e RSS e grava tudo em JSON para comparar execuções   #
+#                entre commits.                                                    #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+#                                                                                  #
+# Uso:                                                                             #
+#   python benchmarks/bench.py                        # Todos os cenários          #
+#   python benchmarks/bench.py --cenarios pubmsg,comandos --tls                    #
+#   python benchmarks/bench.py --comparar antes.json depois.json                   #
+#                                                                                  #
+# ================================================================================ #
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import platform
+import re
+import shutil
+import signal
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from servidores import ServidorIRC, APIsFalsas, certificado_teste
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+CENARIOS = ("pubmsg", "comandos", "crypto", "netsplit", "reconexao", "telegram", "alertas")
+
+# Chat do Telegram falso ligado ao primeiro canal no cenário telegram
+CHAT_PONTE = "100"
+
+# ================================================================================ #
+# ----------------------------- MEDIÇÕES DO PROCESSO ----------------------------- #
+# ================================================================================ #
+
+def _cpu(pid):
+    # Segundos de CPU (utilizador + sistema) do processo, ou None fora do Linux.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            campos = f.read().rsplit(")", 1)[1].split()
+        return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _memoria(pid):
+    # (RSS atual, pico de RSS) em MB, ou (None, None) fora do Linux.
+    valores = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linha in f:
+                chave, _, valor = linha.partition(":")
+                if chave in ("VmRSS", "VmHWM"):
+                    valores[chave] = int(valor.split()[0]) / 1024
+    except (OSError, ValueError):
+        pass
+    return valores.get("VmRSS"), valores.get("VmHWM")
+
+def _percentil(valores, q):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+def _latencias(valores):
+    return {
+        "p50_ms": round(_percentil(valores, 0.50) * 1000, 3) if valores else None,
+        "p99_ms": round(_percentil(valores, 0.99) * 1000, 3) if valores else None,
+        "max_ms": round(max(valores) * 1000, 3) if valores else None,
+    }
+
+class Respostas:
+    """
+    Associa as respostas do bot aos pedidos enviados: cada pedido tem um
+    marcador (token) que aparece na resposta; vários pedidos com o mesmo
+    marcador no mesmo canal são respondidos por ordem. Com 'agrupados', uma
+    resposta serve todos os pedidos iguais à espera nesse canal.
+    """
+
+    def __init__(self, padrao, agrupados=False):
+        self.padrao = re.compile(padrao)
+        self.agrupados = agrupados
+        self.enviados = collections.defaultdict(collections.deque)
+        self.latencias = []
+        self.linhas = 0
+        self.todas = asyncio.Event()
+        self.esperadas = 0
+
+    def enviado(self, canal, token):
+        self.enviados[(canal, token)].append(time.perf_counter())
+        self.esperadas += 1
+
+    def ao_receber(self, linha, instante):
+        if not linha.startswith("PRIVMSG"):
+            return
+        m = self.padrao.search(linha)
+        pendentes = self.enviados[(linha.split(" ", 2)[1], m.group(1))] if m else None
+        if pendentes:
+            self.linhas += 1
+            for _ in range(len(pendentes) if self.agrupados else 1):
+                self.latencias.append(instante - pendentes.popleft())
+            if len(self.latencias) >= self.esperadas:
+                self.todas.set()
+
+# ================================================================================ #
+# ---------------------------------- CENÁRIOS ------------------------------------ #
+# ================================================================================ #
+
+async def _enviar_em_blocos(irc, linhas, bloco=500):
+    for i in range(0, len(linhas), bloco):
+        irc.enviar(*linhas[i:i + bloco])
+        await irc.drenar()
+
+async def cenario_pubmsg(irc, apis, canais, opcoes):
+    # Muitas mensagens normais (sem comandos) espalhadas pelos canais.
+    n = opcoes.mensagens
+    linhas = [f":u{i % 1000}!u@bench PRIVMSG {canais[i % len(canais)]} :mensagem de carga número {i}"
+              for i in range(n)]
+    inicio = time.perf_counter()
+    await _enviar_em_blocos(irc, linhas)
+    fim = await irc.sincronizar(timeout=300)
+    return {"mensagens": n, "mensagens_s": round(n / (fim - inicio), 1)}
+
+async def _tempestade(irc, canais, comandos, padrao, opcoes):
+    # Envia os comandos (nick diferente em cada um, para não bater no limite por nick)
+    # e espera pelas respostas, medindo a latência de cada uma.
+    respostas = Respostas(padrao, agrupados=opcoes.agrupar)
+    irc.ao_receber = respostas.ao_receber
+    linhas = [f":c{i}!u@bench PRIVMSG {canais[i % len(canais)]} :{texto}"
+              for i, (_, texto) in enumerate(comandos)]
+
+    inicio = time.perf_counter()
+    for i in range(0, len(linhas), 200):
+        # A latência conta a partir do momento em que o bloco sai para o bot
+        for j, (token, _) in enumerate(comandos[i:i + 200], i):
+            respostas.enviado(canais[j % len(canais)], token)
+        irc.enviar(*linhas[i:i + 200])
+        await irc.drenar()
+    try:
+        await asyncio.wait_for(respostas.todas.wait(), opcoes.timeout)
+    except asyncio.TimeoutError:
+        pass
+    duracao = time.perf_counter() - inicio
+    irc.ao_receber = None
+    return {
+        "comandos": len(comandos),
+        "respostas": len(respostas.latencias),
+        "linhas_resposta": respostas.linhas,
+        "respostas_s": round(len(respostas.latencias) / duracao, 1),
+        **_latencias(respostas.latencias),
+    }
+
+async def cenario_comandos(irc, apis, canais, opcoes):
+    # Tempestade de comandos locais (!status e !seen): despacho, limites e fila de saída.
+    comandos = [(f"tok{i}", f"!status tok{i}" if i % 2 else f"!seen tok{i}")
+                for i in range(opcoes.comandos)]
+    return await _tempestade(irc, canais, comandos, r"\b(tok\d+)\b", opcoes)
+
+async def cenario_crypto(irc, apis, canais, opcoes):
+    # !crypto sobre as moedas da Binance falsa: cache, single-flight e sessão HTTP.
+    antes = apis.binance
+    comandos = [(apis.moedas[i % len(apis.moedas)], f"!crypto {apis.moedas[i % len(apis.moedas)]}")
+                for i in range(opcoes.comandos)]
+    resultado = await _tempestade(irc, canais, comandos, r"\b(M\d{3})\b", opcoes)
+    resultado["pedidos_binance"] = apis.binance - antes
+    return resultado
+
+async def cenario_netsplit(irc, apis, canais, opcoes):
+    # Netsplit: muitos QUIT seguidos e depois o regresso de todos com JOIN.
+    n = opcoes.joins
+    antes_tg = apis.telegram
+    saudacoes = []
+    irc.ao_receber = lambda linha, _: saudacoes.append(linha) if linha.startswith("PRIVMSG") else None
+
+    quits = [f":j{i}!u@bench QUIT :*.net *.split" for i in range(n)]
+    joins = [f":j{i}!u@bench JOIN {canais[i % len(canais)]}" for i in range(n)]
+    inicio = time.perf_counter()
+    await _enviar_em_blocos(irc, quits)
+    await _enviar_em_blocos(irc, joins)
+    fim = await irc.sincronizar(timeout=300)
+    await asyncio.sleep(opcoes.espera)  # Dá tempo à fila de saída e ao Telegram
+    irc.ao_receber = None
+    return {
+        "eventos": 2 * n,
+        "eventos_s": round(2 * n / (fim - inicio), 1),
+        "linhas_enviadas_pelo_bot": len(saudacoes),
+        "pedidos_telegram": apis.telegram - antes_tg,
+    }
+
+async def cenario_reconexao(irc, apis, canais, opcoes):
+    # O servidor fecha a ligação; mede o tempo até o bot voltar a entrar nos canais.
+    tempos = []
+    for _ in range(opcoes.ciclos):
+        espera = asyncio.ensure_future(irc.esperar(lambda l: l.startswith("JOIN"), timeout=120))
+        inicio = time.perf_counter()
+        irc.desligar()
+        try:
+            tempos.append(await espera - inicio)
+        except asyncio.TimeoutError:
+            break
+        await irc.sincronizar()
+    return {"ciclos": opcoes.ciclos, "reconectou": len(tempos),
+            "tempo_ate_join_s": [round(t, 3) for t in tempos]}
+
+async def _esperar_ate(condicao, timeout):
+    fim = time.perf_counter() + timeout
+    while not condicao() and time.perf_counter() < fim:
+        await asyncio.sleep(0.005)
+    return time.perf_counter()
+
+async def cenario_telegram(irc, apis, canais, opcoes):
+    # Ponte com o Telegram: mensagens do chat até ao canal, linhas do canal até ao
+    # chat (pedidos à API para N linhas) e /seen de ida e volta pelo chat.
+    canal, n = canais[0], opcoes.ponte
+    resultado = {"mensagens": n}
+
+    # Telegram → IRC
+    envios, chegadas = {}, {}
+    marcador = re.compile(r"\bponte(\d+)\b")
+    def no_irc(linha, instante):
+        m = marcador.search(linha) if linha.startswith(f"PRIVMSG {canal} ") else None
+        if m:
+            chegadas.setdefault(m.group(1), instante)
+    irc.ao_receber = no_irc
+    for i in range(n):
+        envios[str(i)] = time.perf_counter()
+        apis.publicar(CHAT_PONTE, f"mensagem ponte{i}")
+    await _esperar_ate(lambda: len(chegadas) >= n, opcoes.timeout)
+    irc.ao_receber = None
+    resultado["telegram_irc_entregues"] = len(chegadas)
+    resultado.update({f"telegram_irc_{k}": v
+                      for k, v in _latencias([chegadas[c] - envios[c] for c in chegadas]).items()})
+
+    # IRC → Telegram
+    textos = []
+    apis.ao_enviar = lambda chat, texto, instante: textos.append(texto) if chat == CHAT_PONTE else None
+    antes, antes_edicoes = apis.telegram, apis.edicoes
+    inicio = time.perf_counter()
+    await _enviar_em_blocos(irc, [f":u{i}!u@bench PRIVMSG {canal} :linha irc{i}" for i in range(n)])
+    fim = await _esperar_ate(lambda: textos and textos[-1].endswith(f"irc{n - 1}"), opcoes.timeout)
+    resultado["irc_telegram_s"] = round(fim - inicio, 3)
+    resultado["irc_telegram_pedidos_api"] = apis.telegram - antes
+    resultado["irc_telegram_edicoes"] = apis.edicoes - antes_edicoes
+
+    # Conversa lenta (uma linha por janela): as linhas vão sendo acrescentadas à mesma mensagem
+    antes, antes_edicoes = apis.telegram, apis.edicoes
+    for i in range(10):
+        irc.enviar(f":u{i}!u@bench PRIVMSG {canal} :conversa lenta {i}")
+        await asyncio.sleep(0.3)
+    await _esperar_ate(lambda: textos and textos[-1].endswith("conversa lenta 9"), opcoes.timeout)
+    resultado["conversa_pedidos_api"] = apis.telegram - antes
+    resultado["conversa_edicoes"] = apis.edicoes - antes_edicoes
+
+    # /seen no chat → resposta no chat
+    tempos = []
+    for i in range(20):
+        textos.clear()
+        nick = re.compile(rf"\bu{i}\b")
+        inicio = time.perf_counter()
+        apis.publicar(CHAT_PONTE, f"/seen u{i}", utilizador=f"t{i}", uid=2000 + i)
+        fim = await _esperar_ate(lambda: any(nick.search(t) for t in textos), 10)
+        tempos.append(fim - inicio)
+    apis.ao_enviar = None
+    resultado.update({f"comando_{k}": v for k, v in _latencias(tempos).items()})
+    return resultado
+
+async def cenario_alertas(irc, apis, canais, opcoes):
+    # Muitos !alert em várias moedas; mede os pedidos à Binance por intervalo e o
+    # tempo entre o preço mudar e saírem os avisos de todos os canais.
+    n = opcoes.alertas
+    criados, avisos = [], {}
+    aviso = re.compile(r"^PRIVMSG (\S+) :🔔 (M\d{3}) a ")
+    def ao_receber(linha, instante):
+        if "🔔 Alerta #" in linha:
+            criados.append(instante)
+        m = aviso.match(linha)
+        if m:
+            avisos[m.groups()] = instante
+    irc.ao_receber = ao_receber
+
+    pedidos = [(canais[i % len(canais)], apis.moedas[i % len(apis.moedas)]) for i in range(n)]
+    await _enviar_em_blocos(irc, [f":a{i}!u@bench PRIVMSG {canal} :!alert {moeda} > {2 + i % 100 / 100}"
+                                  for i, (canal, moeda) in enumerate(pedidos)])
+    await _esperar_ate(lambda: len(criados) >= n, opcoes.timeout)
+
+    # Alertas parados: quantos pedidos à Binance em 3 intervalos (ALERTAS_INTERVALO=1)
+    antes = apis.binance
+    await asyncio.sleep(3)
+    pedidos_binance = apis.binance - antes
+
+    # Todas as moedas sobem acima de todos os limites
+    esperados = set(pedidos)
+    inicio = time.perf_counter()
+    apis.precos.update(dict.fromkeys(apis.moedas, 10.0))
+    await _esperar_ate(lambda: len(avisos) >= len(esperados), opcoes.timeout)
+    irc.ao_receber = None
+    apis.precos.clear()
+    return {
+        "alertas": n,
+        "criados": len(criados),
+        "pedidos_binance_3_intervalos": pedidos_binance,
+        "avisos": len(avisos),
+        "avisos_esperados": len(esperados),
+        "ate_ultimo_aviso_s": round(max(avisos.values(), default=inicio) - inicio, 3),
+    }
+
+# ================================================================================ #
+# ------------------------------- EXECUÇÃO DO BOT -------------------------------- #
+# ================================================================================ #
+
+def _ambiente(opcoes, porta_irc, porta_http, canais, ca):
+    env = dict(os.environ)
+    env.update({
+        "IRC_SERVER": "localhost" if opcoes.tls else "127.0.0.1",
+        "IRC_PORT": str(porta_irc),
+        "IRC_NICK": "benchbot",
+        "IRC_TLS": "true" if opcoes.tls else "false",
+        "IRC_TLS_CA": ca or "",
+        "IRC_TRANSPORTE": opcoes.transporte,
+        "IRC_ADMINS": "admin",
+        "REDES": "",
+        "CANAIS": ",".join(canais),
+        "CANAIS_COM_ALERTAS": ",".join(canais),
+        "TELEGRAM_BOT_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": "1",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{porta_http}",
+        "TELEGRAM_INTERVALO": "0",
+        "TELEGRAM_JANELA": "0.2",
+        "BINANCE_API_URL": f"http://127.0.0.1:{porta_http}/api/v3",
+        "METRICAS": "true" if opcoes.metricas else "false",
+        "METRICAS_PORTA": "0",
+        "ALERTAS_INTERVALO": "1",
+    })
+    if "telegram" in opcoes.cenarios:
+        # Só com o cenário telegram: a ponte retransmite as linhas do primeiro canal
+        env.update({"TELEGRAM_PONTES": f"{CHAT_PONTE}={canais[0]}", "TELEGRAM_POLL_TIMEOUT": "5"})
+    if not opcoes.agrupar:
+        # Cada pedido tem a sua resposta (o --agrupar mede o agrupamento de pedidos iguais)
+        env["AGRUPAR_JANELA"] = "0"
+    if not opcoes.flood_real:
+        # Sem controlo de flood nem limites na fila de entrada mede-se o bot e não
+        # os limites configurados (uma tempestade de comandos seria descartada)
+        env.update({"FLOOD_RAJADA": "1000000", "FLOOD_TAXA": "1000000",
+                    "ENTRADA_FILA_ALVO": "1000000", "ENTRADA_FILA_MAX": "1000000"})
+    return env
+
+def _commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        sujo = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if sujo else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+async def executar(opcoes):
+    pasta = tempfile.mkdtemp(prefix="bench_irc_")
+    contexto, ca = None, None
+    if opcoes.tls:
+        gerado = certificado_teste(pasta)
+        if gerado is None:
+            sys.exit("❌ --tls precisa do openssl para gerar o certificado de teste.")
+        ca, chave = gerado
+        contexto = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        contexto.load_cert_chain(ca, chave)
+
+    canais = ["#portugal", "#crypto"] + [f"#c{i}" for i in range(opcoes.canais - 2)]
+    apis = APIsFalsas()
+    irc = ServidorIRC(contexto)
+    porta_http = await apis.iniciar()
+    porta_irc = await irc.iniciar()
+
+    processo = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(RAIZ, "bot.py"), cwd=pasta,
+        env=_ambiente(opcoes, porta_irc, porta_http, canais, ca),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    resultados = {}
+    try:
+        await asyncio.wait_for(irc.registado.wait(), 30)
+        while irc.canais != set(canais):
+            await asyncio.sleep(0.05)
+        await irc.sincronizar()
+        await asyncio.sleep(1)  # Índice de pares da Binance e arranque dos plugins
+
+        for nome in opcoes.cenarios:
+            cpu_antes, inicio = _cpu(processo.pid), time.perf_counter()
+            resultado = await globals()[f"cenario_{nome}"](irc, apis, canais, opcoes)
+            duracao = time.perf_counter() - inicio
+            cpu_depois = _cpu(processo.pid)
+            rss, pico = _memoria(processo.pid)
+            resultado["duracao_s"] = round(duracao, 3)
+            if cpu_antes is not None and cpu_depois is not None:
+                resultado["cpu_s"] = round(cpu_depois - cpu_antes, 3)
+                resultado["cpu_pct"] = round(100 * (cpu_depois - cpu_antes) / duracao, 1)
+            resultado["rss_mb"] = round(rss, 1) if rss else None
+            resultado["rss_pico_mb"] = round(pico, 1) if pico else None
+            resultados[nome] = resultado
+            print(f"• {nome}: {json.dumps(resultado, ensure_ascii=False)}", flush=True)
+    finally:
+        if processo.returncode is None:
+            processo.send_signal(signal.SIGTERM)
+            try:
+                await asyncio.wait_for(processo.wait(), 15)
+            except asyncio.TimeoutError:
+                processo.kill()
+        await irc.parar()
+        await apis.parar()
+        shutil.rmtree(pasta, ignore_errors=True)
+    return resultados
+
+# ================================================================================ #
+# ------------------------------ RESULTADOS EM JSON ------------------------------ #
+# ================================================================================ #
+
+def gravar(resultados, opcoes):
+    commit = _commit()
+    dados = {
+        "commit": commit,
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "opcoes": {k: v for k, v in vars(opcoes).items() if k not in ("comparar", "saida")},
+        "cenarios": resultados,
+    }
+    caminho = opcoes.saida
+    if not caminho:
+        os.makedirs(RESULTADOS, exist_ok=True)
+        caminho = os.path.join(RESULTADOS, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados gravados em {caminho}")
+
+def comparar(antes, depois):
+    # Mostra lado a lado os valores numéricos de duas execuções.
+    with open(antes, encoding="utf-8") as f:
+        a = json.load(f)
+    with open(depois, encoding="utf-8") as f:
+        b = json.load(f)
+    print(f"{'métrica':<34}{a['commit']:>16}{b['commit']:>16}{'variação':>12}")
+    for cenario in b["cenarios"]:
+        for chave, valor in b["cenarios"][cenario].items():
+            anterior = a["cenarios"].get(cenario, {}).get(chave)
+            if not isinstance(valor, (int, float)) or not isinstance(anterior, (int, float)):
+                continue
+            variacao = f"{100 * (valor - anterior) / anterior:+.1f}%" if anterior else "-"
+            print(f"{cenario + '.' + chave:<34}{anterior:>16}{valor:>16}{variacao:>12}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga do bot IRC.")
+    parser.add_argument("--cenarios", default=",".join(CENARIOS),
+                        help=f"lista separada por vírgulas ({', '.join(CENARIOS)})")
+    parser.add_argument("--tls", action="store_true", help="liga por TLS (certificado próprio)")
+    parser.add_argument("--transporte", default="asyncio", choices=("asyncio", "reactor"))
+    parser.add_argument("--metricas", action="store_true", help="corre o bot com METRICAS=true")
+    parser.add_argument("--flood-real", action="store_true",
+                        help="mantém o controlo de flood e os limites da fila de entrada configurados "
+                             "(por defeito são desligados)")
+    parser.add_argument("--agrupar", action="store_true",
+                        help="agrupa os pedidos iguais no mesmo canal (AGRUPAR_JANELA; por defeito desligado)")
+    parser.add_argument("--canais", type=int, default=50)
+    parser.add_argument("--mensagens", type=int, default=20000, help="mensagens no cenário pubmsg")
+    parser.add_argument("--comandos", type=int, default=2000, help="comandos nos cenários de comandos")
+    parser.add_argument("--joins", type=int, default=2000, help="utilizadores no netsplit")
+    parser.add_argument("--ponte", type=int, default=500, help="mensagens em cada sentido no cenário telegram")
+    parser.add_argument("--alertas", type=int, default=2000, help="alertas criados no cenário alertas")
+    parser.add_argument("--ciclos", type=int, default=2, help="ciclos de reconexão")
+    parser.add_argument("--espera", type=float, default=2.0, help="espera após o netsplit (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="tempo máximo por tempestade (s)")
+    parser.add_argument("--saida", help="ficheiro JSON (por defeito em benchmarks/resultados/)")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"),
+                        help="compara dois ficheiros de resultados")
+    opcoes = parser.parse_args()
+
+    if opcoes.comparar:
+        comparar(*opcoes.comparar)
+        return
+
+    opcoes.cenarios = [c.strip() for c in opcoes.cenarios.split(",") if c.strip()]
+    desconhecidos = set(opcoes.cenarios) - set(CENARIOS)
+    if desconhecidos:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(desconhecidos))}")
+    opcoes.canais = max(opcoes.canais, 2)
+
+    resultados = asyncio.run(executar(opcoes))
+    gravar(resultados, opcoes)
+
+if __name__ == "__main__":
+    main()
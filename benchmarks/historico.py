@@ -0,0 +1,136 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      historico.py                                                      #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Benchmark do histórico de atividade do !seen. Enche uma base de   #
+#                dados temporária com milhões de nicks e mede as consultas         #
+#                exatas, por prefixo (ana*) e de apelidos, a gravação em lote e a  #
+#                limpeza de retenção. Os resultados vão para JSON como os do       #
+#                bench.py (e comparam-se com --comparar).                          #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+#                                                                                  #
+# Uso:                                                                             #
+#   python benchmarks/historico.py                    # 2 milhões de nicks         #
+#   python benchmarks/historico.py --nicks 5000000 --consultas 5000                #
+#                                                                                  #
+# ================================================================================ #
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+PASTA = tempfile.mkdtemp(prefix="bench-seen-")
+# Antes de importar o plugin: a base de dados e o log ficam na pasta temporária
+os.environ.update({
+    "SEEN_DB": os.path.join(PASTA, "seen.db"),
+    "LOG_FICHEIRO": os.path.join(PASTA, "bench.log"),
+    "LOG_NIVEL": "WARNING",
+    "SEEN_RETENCAO_DIAS": "365",
+    "SEEN_MAX_REGISTOS": "0",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench import gravar
+from irc.strings import lower
+from plugins import seen
+
+SILABAS = ("ana", "rui", "eva", "jo", "pt", "zé", "lu", "mar", "tia", "go", "bot", "xx", "neo", "kim")
+ACOES = ("msg", "msg", "msg", "join", "part", "quit", "nick", "action")
+
+def _nick(i):
+    r = random.Random(i)
+    return "".join(r.choice(SILABAS) for _ in range(r.randint(2, 3))) + str(i)
+
+def _percentis(tempos):
+    tempos = sorted(tempos)
+    def p(q):
+        return round(1000 * tempos[min(len(tempos) - 1, int(q * len(tempos)))], 3)
+    return {"p50_ms": p(0.50), "p99_ms": p(0.99), "max_ms": p(1.0)}
+
+def encher(n, lote=50000):
+    # Insere n nicks diretamente (como se fossem anos de atividade), com idades até 2 anos.
+    conn = seen._ligacao()
+    agora = time.time()
+    inicio = time.perf_counter()
+    for base in range(0, n, lote):
+        linhas = []
+        for i in range(base, min(n, base + lote)):
+            nick = _nick(i)
+            linhas.append((lower(nick), nick, agora - random.random() * 730 * 86400,
+                           random.choice(ACOES), "#canal%d" % (i % 50), "mensagem de teste %d" % i))
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO atividade VALUES (?, ?, ?, ?, ?, ?)", linhas)
+            conn.executemany("INSERT OR REPLACE INTO apelidos VALUES (?, ?, ?)",
+                             [(l[0], linhas[j - 1][0], l[2]) for j, l in enumerate(linhas) if j % 20 == 0])
+    return time.perf_counter() - inicio
+
+def medir(funcao, argumentos):
+    tempos = []
+    for arg in argumentos:
+        inicio = time.perf_counter()
+        funcao(arg)
+        tempos.append(time.perf_counter() - inicio)
+    return _percentis(tempos)
+
+def executar(opcoes):
+    random.seed(1)
+    resultados = {}
+    print(f"⏳ A inserir {opcoes.nicks} nicks em {PASTA} ...")
+    duracao = encher(opcoes.nicks)
+    tamanho = os.path.getsize(seen.DB_PATH)
+    resultados["insercao"] = {"nicks": opcoes.nicks, "segundos": round(duracao, 1),
+                              "tamanho_mb": round(tamanho / 2 ** 20, 1)}
+
+    existentes = [_nick(random.randrange(opcoes.nicks)) for _ in range(opcoes.consultas)]
+    prefixos = [_nick(random.randrange(opcoes.nicks))[:4] + "*" for _ in range(opcoes.consultas)]
+    resultados["exata"] = medir(seen.procurar, existentes)
+    resultados["inexistente"] = medir(seen.procurar, [f"nunca{i}" for i in range(opcoes.consultas)])
+    resultados["prefixo"] = medir(seen.procurar, prefixos)
+    resultados["apelidos"] = medir(seen.apelidos, existentes)
+    resultados["resposta_seen"] = medir(seen.get_seen, existentes)
+
+    # Gravação em lote: SEEN_FLUSH_LIMITE atualizações de nicks existentes e novos
+    inicio = time.perf_counter()
+    for i in range(opcoes.atualizacoes):
+        seen.log_seen(_nick(random.randrange(opcoes.nicks * 2)), "msg", "#canal", "olá")
+    seen.flush_db()
+    resultados["gravacao"] = {"atualizacoes": opcoes.atualizacoes,
+                              "por_segundo": round(opcoes.atualizacoes / (time.perf_counter() - inicio))}
+
+    # Retenção de 365 dias sobre idades até 2 anos: apaga cerca de metade
+    inicio = time.perf_counter()
+    apagados = asyncio.run(seen.limpar())
+    resultados["limpeza"] = {"apagados": apagados, "segundos": round(time.perf_counter() - inicio, 1),
+                             "tamanho_mb": round(os.path.getsize(seen.DB_PATH) / 2 ** 20, 1)}
+    resultados["prefixo_depois_limpeza"] = medir(seen.procurar, prefixos)
+
+    for nome, valores in resultados.items():
+        print(f"  {nome:<24} " + "  ".join(f"{k}={v}" for k, v in valores.items()))
+    return {"historico": resultados}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do histórico de atividade (!seen).")
+    parser.add_argument("--nicks", type=int, default=2_000_000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--atualizacoes", type=int, default=100_000)
+    parser.add_argument("--saida", help="ficheiro JSON (por defeito em benchmarks/resultados/)")
+    opcoes = parser.parse_args()
+    try:
+        resultados = executar(opcoes)
+        gravar(resultados, opcoes)
+    finally:
+        seen.close_db()
+        shutil.rmtree(PASTA, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
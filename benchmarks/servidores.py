@@ -0,0 +1,251 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      servidores.py                                                     #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Servidores locais usados pelos benchmarks: um servidor IRC        #
+#                mínimo (TCP ou TLS) controlado pelo script de carga, e versões    #
+#                falsas das APIs do Telegram e da Binance em aiohttp.web.          #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import json
+import os
+import subprocess
+import time
+
+from aiohttp import web
+
+# ================================================================================ #
+# ----------------------------- SERVIDOR IRC FALSO ------------------------------- #
+# ================================================================================ #
+
+class ServidorIRC:
+    """
+    Aceita a ligação do bot, responde ao registo (001 + 005) e deixa o
+    cenário enviar linhas e esperar pelas respostas. Cada linha recebida
+    é passada a 'ao_receber(linha, instante)'.
+    """
+
+    def __init__(self, contexto_ssl=None):
+        self.contexto_ssl = contexto_ssl
+        self.writer = None
+        self.nick = None
+        self.canais = set()
+        self.recebidas = 0
+        self.ligacoes = 0
+        self.ao_receber = None
+        self.registado = asyncio.Event()
+        self._esperas = []  # (predicado, future)
+        self._servidor = None
+
+    async def iniciar(self, host="127.0.0.1", porta=0):
+        self._servidor = await asyncio.start_server(self._cliente, host, porta, ssl=self.contexto_ssl)
+        return self._servidor.sockets[0].getsockname()[1]
+
+    async def parar(self):
+        self.desligar()
+        self._servidor.close()
+
+    async def _cliente(self, reader, writer):
+        self.writer = writer
+        self.ligacoes += 1
+        self.canais.clear()
+        self.registado.clear()
+        try:
+            while True:
+                dados = await reader.readline()
+                if not dados:
+                    break
+                self._linha(dados.decode("utf-8", "replace").rstrip("\r\n"))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if self.writer is writer:
+                self.writer = None
+
+    def _linha(self, linha):
+        agora = time.perf_counter()
+        self.recebidas += 1
+        comando, _, resto = linha.partition(" ")
+        if comando == "NICK":
+            self.nick = resto.strip()
+            self.enviar(f":srv 001 {self.nick} :Bem-vindo ao servidor de testes",
+                        f":srv 005 {self.nick} CHANTYPES=# PREFIX=(ov)@+ MODES=4 NICKLEN=30 :are supported")
+            self.registado.set()
+        elif comando == "JOIN":
+            for canal in resto.split()[0].split(","):
+                self.canais.add(canal)
+                self.enviar(f":{self.nick}!bot@bench JOIN {canal}")
+        elif comando == "PING":
+            self.enviar(f":srv PONG srv {resto}")
+
+        if self.ao_receber is not None:
+            self.ao_receber(linha, agora)
+        for espera in list(self._esperas):
+            predicado, futuro = espera
+            if not futuro.done() and predicado(linha):
+                futuro.set_result(agora)
+                self._esperas.remove(espera)
+
+    def enviar(self, *linhas):
+        if self.writer is not None:
+            self.writer.write("".join(f"{l}\r\n" for l in linhas).encode())
+
+    async def drenar(self):
+        if self.writer is not None:
+            await self.writer.drain()
+
+    async def esperar(self, predicado, timeout=60):
+        # Espera por uma linha do bot que satisfaça o predicado; devolve o instante.
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperas.append((predicado, futuro))
+        return await asyncio.wait_for(futuro, timeout)
+
+    async def sincronizar(self, timeout=60):
+        # PING com marcador: quando o PONG volta, o bot já processou tudo o que veio antes.
+        marcador = f"sync{time.perf_counter_ns()}"
+        espera = asyncio.ensure_future(self.esperar(lambda l: l.startswith("PONG") and marcador in l, timeout))
+        self.enviar(f"PING :{marcador}")
+        await self.drenar()
+        return await espera
+
+    def desligar(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+def certificado_teste(pasta):
+    """
+    Gera um certificado próprio para 'localhost' com o openssl da linha de
+    comandos. Devolve (cert, chave) ou None se o openssl não existir.
+    """
+    cert, chave = os.path.join(pasta, "cert.pem"), os.path.join(pasta, "chave.pem")
+    try:
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-keyout", chave, "-out", cert, "-subj", "/CN=localhost",
+             "-addext", "subjectAltName=DNS:localhost"],
+            check=True, capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return cert, chave
+
+# ================================================================================ #
+# ------------------------ APIS FALSAS DO TELEGRAM E BINANCE --------------------- #
+# ================================================================================ #
+
+class APIsFalsas:
+    """
+    Telegram (sendMessage, editMessageText, getUpdates) e Binance (ticker/price,
+    exchangeInfo) no mesmo servidor HTTP. 'publicar' junta uma mensagem de um
+    chat ao que o getUpdates devolve; cada texto que o bot envia ou edita é
+    passado a 'ao_enviar(chat_id, texto, instante)'.
+    """
+
+    def __init__(self, moedas=200, atraso=0.0):
+        self.moedas = [f"M{i:03d}" for i in range(moedas)]
+        self.atraso = atraso  # Latência simulada de cada pedido (segundos)
+        self.telegram = 0
+        self.edicoes = 0
+        self.binance = 0
+        self.precos = {}  # Moeda → preço (as outras valem 1.2345)
+        self.ao_enviar = None
+        self._atualizacoes = []
+        self._nova_atualizacao = asyncio.Event()
+        self._runner = None
+
+    async def iniciar(self, host="127.0.0.1", porta=0):
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", self._send_message)
+        app.router.add_post("/bot{token}/editMessageText", self._edit_message_text)
+        app.router.add_post("/bot{token}/getUpdates", self._get_updates)
+        app.router.add_get("/api/v3/ticker/price", self._preco)
+        app.router.add_get("/api/v3/exchangeInfo", self._exchange_info)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, porta)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+
+    async def parar(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def publicar(self, chat_id, texto, utilizador="ana", uid=1000):
+        # Mensagem escrita num chat do Telegram (entregue ao bot pelo getUpdates)
+        self._atualizacoes.append({
+            "update_id": len(self._atualizacoes) + 1,
+            "message": {"message_id": len(self._atualizacoes) + 1, "text": texto,
+                        "chat": {"id": int(chat_id), "type": "group"},
+                        "from": {"id": uid, "is_bot": False, "username": utilizador}},
+        })
+        self._nova_atualizacao.set()
+
+    async def _get_updates(self, request):
+        # Long polling: responde logo se houver mensagens depois do offset, senão espera por elas.
+        dados = await request.json()
+        offset = dados.get("offset") or 0
+        fim = time.monotonic() + float(dados.get("timeout", 0))
+        while True:
+            novas = [a for a in self._atualizacoes if a["update_id"] >= offset][:100]
+            restante = fim - time.monotonic()
+            if novas or restante <= 0:
+                return web.json_response({"ok": True, "result": novas})
+            self._nova_atualizacao.clear()
+            try:
+                await asyncio.wait_for(self._nova_atualizacao.wait(), restante)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send_message(self, request):
+        dados = await request.post()
+        self.telegram += 1
+        if self.atraso:
+            await asyncio.sleep(self.atraso)
+        self._enviado(dados)
+        return web.json_response({"ok": True, "result": {"message_id": self.telegram}})
+
+    async def _edit_message_text(self, request):
+        dados = await request.post()
+        self.telegram += 1
+        self.edicoes += 1
+        if self.atraso:
+            await asyncio.sleep(self.atraso)
+        self._enviado(dados)
+        return web.json_response({"ok": True, "result": {"message_id": int(dados["message_id"])}})
+
+    def _enviado(self, dados):
+        if self.ao_enviar is not None:
+            self.ao_enviar(dados.get("chat_id"), dados.get("text", ""), time.perf_counter())
+
+    def _cotacao(self, simbolo):
+        # Preço de um par EUR (ou None se não existir); 'precos' muda o de uma moeda.
+        if simbolo[:-3] in self.moedas and simbolo.endswith("EUR"):
+            return f"{self.precos.get(simbolo[:-3], 1.2345):.8f}"
+        return None
+
+    async def _preco(self, request):
+        # ?symbol=X, ?symbols=["X","Y"] ou sem parâmetros (todos os pares), como na Binance
+        self.binance += 1
+        if self.atraso:
+            await asyncio.sleep(self.atraso)
+        if "symbol" in request.query:
+            simbolos = [request.query["symbol"]]
+        elif "symbols" in request.query:
+            simbolos = json.loads(request.query["symbols"])
+        else:
+            simbolos = [m + "EUR" for m in self.moedas]
+        precos = [{"symbol": s, "price": self._cotacao(s)} for s in simbolos]
+        if any(p["price"] is None for p in precos):
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+        return web.json_response(precos[0] if "symbol" in request.query else precos)
+
+    async def _exchange_info(self, request):
+        simbolos = [{"symbol": m + "EUR", "baseAsset": m, "quoteAsset": "EUR", "status": "TRADING"}
+                    for m in self.moedas]
+        return web.Response(text=json.dumps({"symbols": simbolos}), content_type="application/json")
@@ -29,10 +29,17 @@
 #   14. !ajuda	                - Mostra todos os comandos                         #
 #   15. !join <#canal>	        - Bot entra num canal (admin)                      #
 #   16. !part <#canal>	        - Bot sai de um canal (admin)                      #
+#   17. !fila	                - Estado da fila de saída (admin)                  #
+#   18. !reload <plugin>	    - Recarrega um plugin sem desligar (admin)         #
 #                                                                                  #
 # Observações:                                                                     #
 #   - O bot usa asyncio para processamento assíncrono e reconexão automática.      #
+#   - A ligação IRC é nativa em asyncio (irc_async.py); IRC_TRANSPORTE=reactor     #
+#     volta ao irc.client.Reactor com process_once como modo de recurso.           #
+#   - Liga-se a várias redes no mesmo event loop (REDES em config.py): cada rede   #
+#     tem ligação, fila de saída, limites e reconexão próprios.                    #
 #   - Limita comandos por utilizador para prevenir spam.                           #
+#   - Toda a saída passa por um escalonador com controlo de flood (outbound.py).   #
 #   - Integração com Telegram via função enviar_telegram() para notificações.      #
 #   - Necessário definir variáveis de configuração em config.py (SERVER, PORT,     #
 #     NICK, PASSWORD, CANAIS, etc.).                                               #
@@ -40,7 +47,7 @@
 #                                                                                  #
 # ================================================================================ #
 
-from logger import logger
+from logger import logger, logger_rede
 import signal
 import sys
 import asyncio
@@ -49,15 +56,33 @@ import irc.client
 import irc.connection
 import threading
 import time
+import random
+import irc_async
+from outbound import EscalonadorSaida, PRIORIDADE_ALTA, PRIORIDADE_NORMAL, PRIORIDADE_BAIXA
+from inbound import EscalonadorEntrada
+from ratelimit import LimitadorTaxa
+from channels import EstadoCanais, CAPACIDADES as CAP_CANAIS
+from accounts import TabelaContas, CAPACIDADES as CAP_CONTAS
+import modes     # Empilhamento de MODE/KICK segundo o ISUPPORT
+from joins import AgregadorEntradas, juntar_nicks
+import metrics   # Histogramas e contadores internos (METRICAS=true)
 
 # ================================================================================ #
 # ------------------ IMPORTA VARIÁVEIS DE CONFIGURAÇÃO E PLUGINS ----------------- #
 # ================================================================================ #
 
-from config import SERVER, PORT, NICK, PASSWORD, CANAIS, CANAIS_COM_ALERTAS, BOAS_VINDAS
-from plugins.seen import log_seen, init_db
-from plugins.commands import executar_comando
-from plugins.telegram import enviar_telegram
+from config import REDES, TRANSPORTE, TLS_CA, PLUGINS, PLUGINS_AUTORELOAD, NICKSERV_CONSULTA
+from config import RECONEXAO_MIN, RECONEXAO_MAX, RECONEXAO_ALERTA
+# Os plugins são usados através do módulo (ex.: seen.log_seen) para que um
+# !reload substitua também as funções chamadas a partir daqui. Estes estão
+# sempre carregados; PLUGINS só acrescenta os extra (ex.: stats, profiler).
+from plugins import commands, seen, admin, telegram, crypto, archive, alerts
+from plugins.registry import carregar_plugins, vigiar_plugins
+
+carregar_plugins(PLUGINS)  # Cada plugin extra regista os seus comandos
+
+# Capacidades IRCv3 pedidas ao ligar (as que o servidor não tiver são ignoradas)
+CAPACIDADES = CAP_CANAIS + CAP_CONTAS + ("message-tags", "server-time", "batch")
 
 # ================================================================================ #
 # --------------------- CORRIGIR EVENT LOOP APENAS NO WINDOWS -------------------- #
@@ -71,88 +96,232 @@ if sys.platform.startswith('win'):
 # ================================================================================ #
 
 class IRCBot:
-    def __init__(self):
-        logger.info("Inicializando o bot IRC.")
-        self.reactor = irc.client.Reactor()
-        self.user_commands = {}
+    def __init__(self, rede=REDES[0], multirede=False):
+        self.rede = rede  # Configuração desta rede (servidor, nick, canais, ...)
+        self.multirede = multirede
+        self.log = logger_rede(rede.nome)
+        # Loggers próprios para poder calar o tráfego dos canais (LOG_NIVEIS=mensagens=WARNING)
+        # sem perder o registo dos comandos
+        self.log_msg = logger_rede(rede.nome, "mensagens")
+        self.log_cmd = logger_rede(rede.nome, "comandos")
+        self.log.info(f"Inicializando o bot IRC (transporte: {TRANSPORTE}).")
+        self.reactor = irc.client.Reactor() if TRANSPORTE == "reactor" else None
+        # Uma só ligação por bot, reaproveitada em cada reconexão: os handlers são
+        # associados uma vez e nunca se acumulam
+        self.connection = self.reactor.server() if self.reactor else irc_async.LigacaoAsyncIRC()
+        self.limitador = LimitadorTaxa()  # Limite de comandos por utilizador
         self.running = True
+        self._parado = asyncio.Event()
+        self.saida = EscalonadorSaida(self._enviar_linha)  # Controlo de flood
+        # Comandos recebidos: filas limitadas por destino, ordem garantida e tempo limite
+        self.entrada = EscalonadorEntrada(ao_esgotar=self.comando_esgotado, rede=rede.nome)
+        metrics.registar_coletor(f"entrada_{rede.nome}", lambda: [
+            (f"irc_entrada_{chave}", {"rede": self.rede.nome}, valor)
+            for chave, valor in self.entrada.estatisticas().items() if chave != "descartados"])
+        # Quem está em cada canal (com op/voz e user@host), para os comandos de moderação
+        self.estado = EstadoCanais(
+            pedir_who=lambda canal: self.saida.agendar(canal, f"WHO {canal}", PRIORIDADE_BAIXA),
+            ao_esquecer=lambda nick: self.contas.esquecer(nick))
+        metrics.registar_coletor(f"canais_{rede.nome}", lambda: [
+            (f"irc_estado_{chave}", {"rede": self.rede.nome}, valor)
+            for chave, valor in self.estado.estatisticas().items()])
+        # Conta de serviços de cada nick (admins verificados pela conta, não pelo nick)
+        # Com SASL a identificação fica feita durante o registo, antes do 001
+        sasl = (rede.nick, rede.password) if rede.sasl and rede.password else None
+        self.cap = irc_async.NegociacaoCAP(CAPACIDADES, sasl=sasl)
+        self.contas = TabelaContas(
+            consultar=lambda nick: self.saida.agendar(
+                "NickServ", f"PRIVMSG NickServ :{NICKSERV_CONSULTA} {nick}", PRIORIDADE_ALTA),
+            cap=self.cap, visivel=lambda nick: bool(self.estado.canais_de(nick)))
+        # Saudações e alertas de entradas agrupados (e calados nos netsplits)
+        self.entradas = AgregadorEntradas(saudar=self._saudar, alertar=self._alertar_entradas)
+        metrics.registar_coletor(f"entradas_{rede.nome}", lambda: [
+            (f"irc_entradas_{chave}", {"rede": self.rede.nome}, valor)
+            for chave, valor in self.entradas.estatisticas().items()])
+        self._associar_handlers()
+
+        # Estado da reconexão
+        self._reconexao = None       # Tarefa de reconexão em curso (só há uma)
+        self._leitor = None          # Tarefa que lê do socket (transporte asyncio)
+        self._falhas = 0             # Tentativas falhadas seguidas (define a espera)
+        self._registado = False      # Chegou o 001 desde a última ligação
+        self._desligado_em = None    # Instante da queda, para medir o tempo até voltar aos canais
+        self._por_entrar = set()     # Canais ainda sem JOIN confirmado depois do 001
 
         self.loop = asyncio.get_event_loop()
-        self._connect()
 
     # ============================================================================ #
     # ---- Cria a ligação segura ao servidor IRC e associa handlers a eventos ---- #
     # ============================================================================ #
     
-    def _connect(self):
-        factory = irc.connection.Factory(
-            wrapper=lambda sock: ssl.create_default_context().wrap_socket(sock, server_hostname=SERVER)
-        )
-        self.connection = self.reactor.server().connect(SERVER, PORT, NICK, connect_factory=factory)
-
-        # ======================================================================== #
-        # ----------------------- Associa eventos a funções ---------------------- #
-        # ======================================================================== #
-        
-        self.connection.add_global_handler("welcome", self.on_welcome)
-        self.connection.add_global_handler("pubmsg", self.on_pubmsg)
-        self.connection.add_global_handler("privmsg", self.on_privmsg)
-        self.connection.add_global_handler("join", self.on_join)
-        self.connection.add_global_handler("part", self.on_part)
-        self.connection.add_global_handler("nicknameinuse", self.on_nickname_in_use)
-        self.connection.add_global_handler("disconnect", self.on_disconnect)
+    async def _connect(self):
+        if TRANSPORTE == "asyncio":
+            # Ligação nativa: a leitura corre numa tarefa própria, sem polling
+            await self._parar_leitor()  # O leitor da ligação anterior não pode ficar a correr
+            await self.connection.connect(self.rede.server, self.rede.port, self.rede.nick,
+                                          usar_tls=self.rede.tls, contexto_ssl=self._contexto_ssl(),
+                                          pedir_cap=True)
+            # A referência fica guardada: o asyncio só guarda referências fracas às tarefas
+            self._leitor = asyncio.create_task(self.connection.processar())
+            self._leitor.add_done_callback(self._leitor_terminou)
+            return
+
+        if self.rede.tls:
+            factory = irc.connection.Factory(
+                wrapper=lambda sock: self._contexto_ssl().wrap_socket(sock, server_hostname=self.rede.server)
+            )
+        else:
+            factory = irc.connection.Factory()
+
+        # O irc.client envia NICK/USER logo a seguir a ligar o socket. O CAP LS tem de
+        # ir antes, para o servidor suspender o registo até ao CAP END (e o SASL
+        # terminar antes do 001), por isso segue diretamente no socket acabado de abrir.
+        def ligar(endereco):
+            sock = factory(endereco)
+            sock.sendall(b"CAP LS 302\r\n")
+            return sock
+
+        self.connection.connect(self.rede.server, self.rede.port, self.rede.nick, connect_factory=ligar)
+
+    def _leitor_terminou(self, tarefa):
+        # Recolhe a exceção do leitor (senão perde-se); a queda já chegou como "disconnect"
+        if not tarefa.cancelled() and tarefa.exception() is not None:
+            self.log.error("Erro na leitura da ligação IRC.", exc_info=tarefa.exception())
+
+    def _cancelar_leitor(self):
+        # Cancela o leitor, a não ser que seja ele a chamar (o "disconnect" vem do seu finally)
+        if self._leitor is not None and not self._leitor.done() and self._leitor is not asyncio.current_task():
+            self._leitor.cancel()
+
+    async def _parar_leitor(self):
+        self._cancelar_leitor()
+        tarefa, self._leitor = self._leitor, None
+        if tarefa is not None and tarefa is not asyncio.current_task():
+            await asyncio.gather(tarefa, return_exceptions=True)
+
+    def _contexto_ssl(self):
+        contexto = ssl.create_default_context()
+        if TLS_CA:
+            contexto.load_verify_locations(TLS_CA)  # Confia também no certificado indicado
+        return contexto
+
+    # ============================================================================ #
+    # ----------------------- Associa eventos a funções -------------------------- #
+    # ============================================================================ #
+
+    def _associar_handlers(self):
+        handlers = {
+            "welcome": self.on_welcome,
+            "pubmsg": self.on_pubmsg,
+            "privmsg": self.on_privmsg,
+            "join": self.on_join,
+            "part": self.on_part,
+            "quit": self.on_quit,
+            "nick": self.on_nick,
+            "kick": self.on_kick,
+            "action": self.on_action,
+            "nicknameinuse": self.on_nickname_in_use,
+            "disconnect": self.on_disconnect,
+        }
+        self.cap.associar(self.connection)
+        self.estado.associar(self.connection)
+        self.contas.associar(self.connection)
+        self.entradas.associar(self.connection)
+        for evento, handler in handlers.items():
+            # Com as métricas desligadas, cronometrar devolve o próprio handler
+            handler = metrics.cronometrar("irc_handler_segundos", evento=evento)(handler)
+            self.connection.add_global_handler(evento, handler)
+        if metrics.ATIVAS and TRANSPORTE == "reactor":
+            # No transporte asyncio as linhas são contadas no ciclo de leitura
+            self.connection.add_global_handler(
+                "all_raw_messages", lambda c, e: metrics.contar("irc_linhas_recebidas_total"))
 
     # ============================================================================ #
     # ---------------------- Handler para nickname já em uso --------------------- #
     # ============================================================================ #
     
     def on_nickname_in_use(self, connection, event):
-        logger.info("Nickname já está em uso.")
-        connection.nick(NICK + "_")
+        self.log.info("Nickname já está em uso.")
+        connection.nick(self.rede.nick + "_")
 
     # ============================================================================ #
     # ----------------- Handler quando o bot se liga com sucesso ----------------- #
     # ============================================================================ #
     
     def on_welcome(self, connection, event):
-        logger.info("Ligado com sucesso ao servidor.")
-        # Identifica-se no NickServ
-        connection.privmsg("NickServ", f"IDENTIFY {NICK} {PASSWORD}")
-        # Junta-se a todos os canais definidos
-        for canal in CANAIS:
-            logger.info(f"A entrar no canal: {canal}")
-            connection.join(canal)
+        self.log.info("Ligado com sucesso ao servidor.")
+        self._falhas = 0
+        self._registado = True
+        # Identifica-se no NickServ (sem SASL, ou se a autenticação SASL falhou)
+        if not self.cap.autenticado:
+            self.saida.agendar("NickServ", f"PRIVMSG NickServ :IDENTIFY {self.rede.nick} {self.rede.password}",
+                               PRIORIDADE_ALTA)
+        # Junta-se a todos os canais definidos, num só JOIN #a,#b,#c
+        self.log.info(f"A entrar nos canais: {', '.join(self.rede.canais)}")
+        self._por_entrar = {canal.lower() for canal in self.rede.canais}
+        for linha in modes.empilhar_joins(self.rede.canais):
+            self.saida.agendar("JOIN", linha, PRIORIDADE_ALTA)
         # Notifica via Telegram
-        enviar_telegram("✅ O bot ligou-se com sucesso ao IRC.")
+        self.alerta("✅ O bot ligou-se com sucesso ao IRC.")
 
     # ============================================================================ #
     # -------------------- Handler quando o bot é desconectado ------------------- #
     # ============================================================================ #
     
     def on_disconnect(self, connection, event):
-        logger.warning("Desconectado do servidor.")
-        try:
-            enviar_telegram("⚠️ O bot foi desconectado do servidor IRC.")
-        except Exception as e:
-            logger.error(f"Erro ao enviar notificação para Telegram: {e}")
-        # Tenta reconectar de forma assíncrona
-        asyncio.create_task(self.reconectar())
+        if not self.running:
+            return  # Encerramento pedido: não há nada a recuperar
+        self.log.warning("Desconectado do servidor.")
+        self._cancelar_leitor()
+        self.saida.limpar()  # O que estava em fila pertencia à ligação perdida
+        self.entrada.limpar()  # Comandos ainda por começar também
+        if not self._registado:
+            # Caiu antes do 001: a tentativa conta como falhada e a espera aumenta
+            self._tentativa_falhada()
+        else:
+            self._registado = False
+            self._desligado_em = time.monotonic()
+            try:
+                self.alerta("⚠️ O bot foi desconectado do servidor IRC.")
+            except Exception as e:
+                self.log.error(f"Erro ao enviar notificação para Telegram: {e}")
+        self.agendar_reconexao()
 
     # ============================================================================ #
-    # ------------- Função assíncrona para reconectar automaticamente ------------ #
+    # ------------- Reconexão automática (espera exponencial com jitter) --------- #
     # ============================================================================ #
-    
-    async def reconectar(self, tentativas=5):  # Espera 5 segundos entre tentativas
-        for tentativa in range(tentativas):
-            await asyncio.sleep(5)
-            logger.info(f"Tentativa de reconexão {tentativa + 1} de {tentativas}...")
+
+    def agendar_reconexao(self):
+        # Só há uma tarefa de reconexão por bot, por mais quedas que cheguem
+        if self._reconexao is None or self._reconexao.done():
+            self._reconexao = asyncio.create_task(self.reconectar())
+
+    def _espera(self):
+        # Duplica a cada falha até RECONEXAO_MAX; metade é aleatória, para que várias
+        # redes (ou vários bots) não voltem todos ao mesmo tempo
+        teto = min(RECONEXAO_MAX, RECONEXAO_MIN * 2 ** min(self._falhas, 30))
+        return teto / 2 + random.uniform(0, teto / 2)
+
+    async def reconectar(self):
+        # Tenta até conseguir; nunca desiste enquanto o bot estiver a correr
+        while self.running:
+            espera = self._espera()
+            self.log.info(f"Tentativa de reconexão {self._falhas + 1} dentro de {espera:.1f}s...")
+            await asyncio.sleep(espera)
+            if not self.running:
+                return
             try:
-                self._connect()
-                logger.info("Reconectado com sucesso.")
+                await self._connect()
+                self.log.info("Ligação restabelecida; à espera do registo.")
                 return
             except Exception as e:
-                logger.error(f"Erro ao tentar reconectar: {e}")
-        enviar_telegram("❌ Falha ao reconectar após várias tentativas.")
+                self.log.error(f"Erro ao tentar reconectar: {e}")
+                self._tentativa_falhada()
+
+    def _tentativa_falhada(self):
+        self._falhas += 1
+        if self._falhas == RECONEXAO_ALERTA:
+            self.alerta(f"❌ Falha ao reconectar após {self._falhas} tentativas; o bot continua a tentar.")
 
     # ============================================================================ #
     # ---------------------- Handler para mensagens públicas --------------------- #
@@ -162,32 +331,40 @@ class IRCBot:
         source = event.source.nick  # Nick do utilizador
         target = event.target       # Canal da mensagem
         message = event.arguments[0]
-        logger.debug(f"Mensagem pública de {source} em {target}: {message}")
+        self.log_msg.debug("Mensagem pública de %s em %s: %s", source, target, message)
 
-        log_seen(source)  # Regista que este nick falou recentemente
-        
-        # Limita a 5 comandos por minuto
-        if self.user_commands.get(source, 0) >= 5:
-            logger.warning(f"{source} excedeu o limite de comandos.")
-            return
+        seen.log_seen(source, "msg", target, message)  # Última atividade deste nick
+        archive.arquivar(self.rede.nome, target, source, message)  # Só nos canais em ARQUIVO_CANAIS
+        telegram.retransmitir(self.rede.nome, target, source, message)  # Só nos canais em TELEGRAM_PONTES
 
         # Se for comando, executa
         if message.startswith("!"):
-            self.user_commands[source] = self.user_commands.get(source, 0) + 1
-            asyncio.create_task(self.reset_user_command_count(source))  # Reset após 60s
             partes = message.split()
             comando = partes[0].lower()
             args = partes[1:]
-            logger.info(f"Comando recebido: {comando} de {source} em {target} com args: {args}")
-            asyncio.create_task(executar_comando(self, source, comando, args, target))
+            if not self._dentro_do_limite(source, target, comando):
+                return
+            self.log_cmd.info("Comando recebido: %s de %s em %s com args: %s", comando, source, target, args)
+            commands.despachar(self, source, comando, args, target)
 
     # ============================================================================ #
-    # --------- Reseta o contador de comandos do utilizador após um delay -------- #
+    # ------- Limita os comandos por utilizador (admins não têm limite) ---------- #
     # ============================================================================ #
     
-    async def reset_user_command_count(self, user, delay=60):
-        await asyncio.sleep(delay)
-        self.user_commands.pop(user, None)
+    def _dentro_do_limite(self, source, canal, comando):
+        # Só a cache de contas: um nick ainda por verificar fica sujeito ao limite
+        if admin.is_admin(source, self.contas) or self.limitador.permitir(source, canal, comando):
+            return True
+        self.log_cmd.warning("%s excedeu o limite de comandos.", source)
+        metrics.contar("irc_comandos_bloqueados_total", rede=self.rede.nome)
+        return False
+
+    # ============================================================================ #
+    # ------ Comando cancelado pela fila de entrada por passar do tempo limite --- #
+    # ============================================================================ #
+
+    def comando_esgotado(self, alvo, comando):
+        self.message(alvo, f"⌛ {comando} demorou demasiado e foi cancelado.")
 
     # ============================================================================ #
     # ---------------------- Handler para mensagens privadas --------------------- #
@@ -197,14 +374,16 @@ class IRCBot:
         source = event.source.nick
         message = event.arguments[0]
         target = source  # Responde na própria mensagem
-        logger.debug(f"Mensagem privada de {source}: {message}")
+        self.log_msg.debug("Mensagem privada de %s: %s", source, message)
 
         if message.startswith("!"):
             partes = message.split()
             comando = partes[0].lower()
             args = partes[1:]
-            logger.info(f"Comando privado recebido: {comando} de {source} com args: {args}")
-            asyncio.create_task(executar_comando(self, source, comando, args, target))
+            if not self._dentro_do_limite(source, None, comando):
+                return
+            self.log_cmd.info("Comando privado recebido: %s de %s com args: %s", comando, source, args)
+            commands.despachar(self, source, comando, args, target)
 
     # ============================================================================ #
     # ---------------------- Handler para entrada em canais ---------------------- #
@@ -213,24 +392,48 @@ class IRCBot:
     def on_join(self, connection, event):
         nick = event.source.nick
         canal = event.target
-        logger.debug(f"{nick} entrou no canal {canal}")
+        self.log_msg.debug("%s entrou no canal %s", nick, canal)
 
-        # Boas-vindas personalizadas
-        if canal in BOAS_VINDAS and nick != NICK:
-            try:
-                mensagem = BOAS_VINDAS[canal].format(nick=nick)
-                self.message(canal, mensagem)
-                logger.debug(f"Enviado mensagem de boas-vindas para {nick} em {canal}")
-            except Exception as e:
-                logger.error(f"Erro ao enviar alerta para Telegram: {e}")
+        if nick == connection.get_nickname():
+            self._entrou(canal)  # O próprio bot a entrar no canal
+            return
+        seen.log_seen(nick, "join", canal)
+
+        # Boas-vindas e alertas passam pelo agregador: num netsplit ou numa rajada
+        # de entradas sai uma só saudação por canal em vez de uma por nick
+        if canal in self.rede.boas_vindas or canal in self.rede.canais_com_alertas:
+            self.entradas.entrou(event)
+
+    def _saudar(self, canal, nicks):
+        # Boas-vindas personalizadas ({nick} recebe a lista de quem entrou)
+        if canal in self.rede.boas_vindas:
+            mensagem = self.rede.boas_vindas[canal].format(nick=juntar_nicks(nicks))
+            self.message(canal, mensagem, PRIORIDADE_BAIXA)
+            self.log_msg.debug("Enviado mensagem de boas-vindas para %s em %s", nicks, canal)
+
+    def _alertar_entradas(self, canal, nicks):
+        # Alertas via Telegram (um resumo por janela)
+        if canal not in self.rede.canais_com_alertas:
+            return
+        try:
+            if len(nicks) == 1:
+                self.alerta(f"👤 <b>{nicks[0]}</b> entrou no canal <b>{canal}</b>.")
+            else:
+                self.alerta(f"👥 {len(nicks)} utilizadores entraram no canal <b>{canal}</b>: "
+                            f"{juntar_nicks(nicks)}.")
+            self.log_msg.debug("Enviado alerta para Telegram: %s entraram em %s", nicks, canal)
+        except Exception as e:
+            self.log.error(f"Erro ao enviar alerta para Telegram: {e}")
 
-        # Alertas via Telegram
-        if canal in CANAIS_COM_ALERTAS and nick != NICK:
-            try:
-                enviar_telegram(f"👤 <b>{nick}</b> entrou no canal <b>{canal}</b>.")
-                logger.debug(f"Enviado alerta para Telegram: {nick} entrou em {canal}")
-            except Exception as e:
-                logger.error(f"Erro ao enviar alerta para Telegram: {e}")
+    def _entrou(self, canal):
+        # Depois de uma queda, mede o tempo até o bot estar outra vez em todos os canais
+        self._por_entrar.discard(canal.lower())
+        if self._por_entrar or self._desligado_em is None:
+            return
+        duracao = time.monotonic() - self._desligado_em
+        self._desligado_em = None
+        self.log.info(f"De volta a todos os canais {duracao:.1f}s depois da queda.")
+        metrics.observar("irc_reconexao_segundos", duracao, rede=self.rede.nome)
 
     # ============================================================================ #
     # ----------------------- Handler para saída de canais ----------------------- #
@@ -239,45 +442,98 @@ class IRCBot:
     def on_part(self, connection, event):
         nick = event.source.nick
         canal = event.target
-        logger.debug(f"{nick} saiu do canal {canal}")
+        self.log_msg.debug("%s saiu do canal %s", nick, canal)
 
         # Notifica se o bot saiu
-        if nick == NICK:
+        if nick == connection.get_nickname():
             try:
-                enviar_telegram(f"👋 O bot saiu do canal <b>{canal}</b>.")
-                logger.debug(f"O bot saiu do canal {canal}")
+                self.alerta(f"👋 O bot saiu do canal <b>{canal}</b>.")
+                self.log.debug(f"O bot saiu do canal {canal}")
             except Exception as e:
-                logger.error(f"Erro ao enviar alerta para Telegram: {e}")
+                self.log.error(f"Erro ao enviar alerta para Telegram: {e}")
+            return
+        seen.log_seen(nick, "part", canal, event.arguments[0] if event.arguments else None)
+
+    # ============================================================================ #
+    # ------------- Restante atividade registada no histórico do !seen ----------- #
+    # ============================================================================ #
+
+    def on_quit(self, connection, event):
+        seen.log_seen(event.source.nick, "quit", mensagem=event.arguments[0] if event.arguments else None)
+
+    def on_nick(self, connection, event):
+        seen.log_nick(event.source.nick, event.target)
+
+    def on_kick(self, connection, event):
+        if event.arguments:
+            motivo = event.arguments[1] if len(event.arguments) > 1 else None
+            seen.log_seen(event.arguments[0], "kick", event.target, motivo)
+
+    def on_action(self, connection, event):
+        # /me num canal (em privado não fica registado)
+        if irc.client.is_channel(event.target) and event.arguments:
+            seen.log_seen(event.source.nick, "action", event.target, event.arguments[0])
 
     # ============================================================================ #
     # ----------- Função para enviar mensagem a um canal ou utilizador ----------- #
     # ============================================================================ #
     
-    def message(self, target, text):
-        try:
-            logger.info(f"Enviando mensagem para {target}: {text}")
-            self.connection.privmsg(target, text)
-        except Exception as e:
-            logger.error(f"Erro ao enviar mensagem para {target}: {e}")
+    def message(self, target, text, prioridade=PRIORIDADE_NORMAL):
+        self.log_cmd.info("Enviando mensagem para %s: %s", target, text)
+        self.saida.agendar(target, f"PRIVMSG {target} :{text}", prioridade)
+
+    # ============================================================================ #
+    # ----- Alerta para o Telegram (com o nome da rede quando há várias) --------- #
+    # ============================================================================ #
+
+    def alerta(self, mensagem):
+        if self.multirede:
+            mensagem = f"[{self.rede.nome}] {mensagem}"
+        telegram.enviar_telegram(mensagem)
+
+    # ============================================================================ #
+    # ------- Escreve uma linha no servidor (chamado pelo escalonador) ----------- #
+    # ============================================================================ #
+
+    def _enviar_linha(self, linha):
+        self.connection.send_raw(linha)
         
     # ============================================================================ #
     # ---------------------------- Para encerrar o bot --------------------------- #
     # ============================================================================ #
     
     def stop(self):
-        logger.info("Encerrando o bot...")
+        self.log.info("Encerrando o bot...")
         self.running = False
+        self._parado.set()
         try:
             self.connection.quit("Bot encerrado.")
         except Exception as e:
-            logger.error(f"Erro ao encerrar conexão IRC: {e}")
+            self.log.error(f"Erro ao encerrar conexão IRC: {e}")
 
     # ============================================================================ #
     # ------------------------- Loop principal assíncrono ------------------------ #
     # ============================================================================ #
     
     async def start(self):
-        logger.info("Iniciando o loop do bot.")
+        self.log.info("Iniciando o loop do bot.")
+        asyncio.create_task(self.saida.processar())  # Envio com controlo de flood
+        asyncio.create_task(self.entrada.processar())  # Execução dos comandos recebidos
+        try:
+            await self._connect()
+        except Exception as e:
+            # Uma rede inacessível no arranque não pode impedir as outras de arrancar
+            self.log.error(f"Erro ao ligar ao servidor: {e}")
+            self.agendar_reconexao()
+
+        if TRANSPORTE == "asyncio":
+            # Os eventos chegam pela tarefa de leitura; aqui só se espera pelo fim
+            await self._parado.wait()
+            if self._leitor is not None:
+                await asyncio.wait([self._leitor], timeout=2)  # O servidor fecha a ligação depois do QUIT
+            await self._parar_leitor()
+            return
+
         while self.running:
             self.reactor.process_once(timeout=0.2)  # Processa eventos IRC
             await asyncio.sleep(0.1)
@@ -286,48 +542,95 @@ class IRCBot:
     # ------------------------ Funções administrativas IRC ----------------------- #
     # ============================================================================ #
     
+    # Comandos de moderação passam à frente de qualquer outro texto em fila
+    
     async def set_mode(self, canal, modo, nick):
-        logger.info(f"Definindo modo {modo} para {nick} em {canal}")
-        self.connection.mode(canal, f"{modo} {nick}")
-
-    async def kick(self, canal, nick, motivo=""):
-        logger.info(f"Expulsando {nick} de {canal} com motivo: {motivo}")
-        self.connection.kick(canal, nick, motivo)
+        await self.set_modes(canal, [(modo[0], modo[1:], nick)])
+
+    async def set_modes(self, canal, alteracoes):
+        # Vários (sinal, modo, parâmetro) empilhados em tão poucas linhas MODE quanto o servidor permite
+        linhas = modes.empilhar_modos(canal, alteracoes, modes.limite_modos(self.connection.features))
+        self.log.info(f"Definindo {len(alteracoes)} modo(s) em {canal} em {len(linhas)} linha(s)")
+        for linha in linhas:
+            self.saida.agendar(canal, linha, PRIORIDADE_ALTA)
+
+    async def kick(self, canal, nicks, motivo=""):
+        if isinstance(nicks, str):
+            nicks = [nicks]
+        self.log.info(f"Expulsando {', '.join(nicks)} de {canal} com motivo: {motivo}")
+        maximo = modes.limite_alvos(self.connection.features, "KICK")
+        for linha in modes.empilhar_kicks(canal, nicks, motivo, maximo):
+            self.saida.agendar(canal, linha, PRIORIDADE_ALTA)
 
     async def invite(self, nick, canal):
-        logger.info(f"Enviando convite para {nick} para o canal {canal}")
-        self.connection.invite(nick, canal)
+        self.log.info(f"Enviando convite para {nick} para o canal {canal}")
+        self.saida.agendar(canal, f"INVITE {nick} {canal}", PRIORIDADE_ALTA)
 
     async def set_topic(self, canal, topico):
-        logger.info(f"Definindo tópico de {canal} para: {topico}")
-        self.connection.topic(canal, topico)
+        self.log.info(f"Definindo tópico de {canal} para: {topico}")
+        self.saida.agendar(canal, f"TOPIC {canal} :{topico}", PRIORIDADE_ALTA)
+
+    def join(self, canal):
+        self.saida.agendar(canal, f"JOIN {canal}", PRIORIDADE_ALTA)
+
+    def part(self, canal):
+        self.saida.agendar(canal, f"PART {canal}", PRIORIDADE_ALTA)
 
 # ================================================================================ #
 # -------------------------- FUNÇÃO PRINCIPAL ASSÍNCRONA ------------------------- #
 # ================================================================================ #
 
 async def main():
-    bot = IRCBot()
+    # Um bot por rede, todos no mesmo event loop; plugins, !seen e Telegram são partilhados
+    bots = [IRCBot(rede, multirede=len(REDES) > 1) for rede in REDES]
 
     # ============================================================================ #
     # ------ Função para encerrar graciosamente ao receber SIGINT ou SIGTERM ----- #
     # ============================================================================ #
     
-    def desligar_graciosamente(signalnum, frame):
+    def desligar_graciosamente():
         logger.info("Sinal de encerramento recebido.")
         try:
-            enviar_telegram("⚠️ O bot foi encerrado manualmente ou pelo sistema.")
-            time.sleep(1)  # Dá tempo para a mensagem sair antes do encerramento
+            telegram.enviar_telegram("⚠️ O bot foi encerrado manualmente ou pelo sistema.")
         except Exception as e:
             logger.error(f"Erro ao enviar notificação para Telegram: {e}")
-        bot.stop()
-        sys.exit(1)
+        for bot in bots:
+            bot.stop()
+
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sinal, desligar_graciosamente)
+        except NotImplementedError:
+            # Windows: não há add_signal_handler, passa o pedido para o loop
+            signal.signal(sinal, lambda signalnum, frame: loop.call_soon_threadsafe(desligar_graciosamente))
+
+    # Tarefas de fundo partilhadas por todas as redes
+    asyncio.create_task(seen.flush_periodico())  # Gravação em lote do !seen
+    asyncio.create_task(seen.limpeza_periodica())  # Retenção e compactação do !seen
+    asyncio.create_task(archive.flush_periodico())  # Gravação em lote do arquivo dos canais
+    asyncio.create_task(crypto.manter_indice())  # Índice de pares da Binance
+    asyncio.create_task(alerts.vigiar(bots))  # Alertas de preço (!alert)
+    asyncio.create_task(telegram.ponte(bots))  # Chats do Telegram ligados aos canais (TELEGRAM_PONTES)
+    if PLUGINS_AUTORELOAD:
+        asyncio.create_task(vigiar_plugins())  # Recarrega plugins alterados no disco
+    if metrics.ATIVAS:
+        asyncio.create_task(metrics.medir_atraso_loop())  # Atraso do event loop
+        try:
+            await metrics.servir()  # Endpoint Prometheus local
+        except OSError as e:
+            logger.error(f"Erro ao abrir o endpoint de métricas: {e}")
 
-    signal.signal(signal.SIGINT, desligar_graciosamente)
-    signal.signal(signal.SIGTERM, desligar_graciosamente)
+    logger.info(f"Bot em execução em {len(bots)} rede(s). Pressiona CTRL+C para sair.")
+    await asyncio.gather(*(bot.start() for bot in bots))
 
-    logger.info("Bot em execução. Pressiona CTRL+C para sair.")
-    await bot.start()
+    seen.close_db()  # Grava os registos do !seen ainda em memória
+    archive.fechar()  # Grava as mensagens do arquivo ainda em memória
+    alerts.fechar()
+    # Dá tempo para a fila do Telegram sair antes do encerramento
+    await telegram.fechar_telegram()
+    await crypto.fechar_sessao()
+    sys.exit(1)
 
 # ================================================================================ #
 # ---------------------------------- ENTRY POINT --------------------------------- #
@@ -339,7 +642,7 @@ if __name__ == "__main__":
     except Exception as e:
         logger.exception("Erro inesperado.")
         try:
-            enviar_telegram(f"❌ Ocorreu um erro inesperado no bot: {e}. Verifica o log para mais detalhes.")
+            telegram.enviar_telegram(f"❌ Ocorreu um erro inesperado no bot: {e}. Verifica o log para mais detalhes.")
         except:
             pass
         sys.exit(1)
@@ -0,0 +1,353 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      channels.py                                                       #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Estado dos canais em memória: quem está em cada canal (com op/    #
+#                voz), em que canais está cada nick e o respetivo user@host.       #
+#                Alimentado por NAMES/WHO/JOIN/PART/KICK/QUIT/NICK/MODE, permite   #
+#                aos comandos verificar presenças em O(1) e criar bans *!*@host    #
+#                sem pedidos extra ao servidor.                                    #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import re
+
+from irc.strings import lower  # Comparação de nicks/canais sem maiúsculas (RFC 1459)
+
+from logger import obter_logger
+
+logger = obter_logger("canais")
+
+# Os handlers do estado correm antes dos do bot (prioridade menor sai primeiro),
+# para que on_join/on_part já vejam o estado atualizado
+PRIORIDADE_ESTADO = -10
+
+# Capacidades IRCv3 que completam o NAMES: todos os prefixos (@+nick) e o user@host
+CAPACIDADES = ("multi-prefix", "userhost-in-names")
+
+class Utilizador:
+    __slots__ = ("nick", "user", "host", "canais")
+
+    def __init__(self, nick, user=None, host=None):
+        self.nick = nick      # Nick com as maiúsculas originais
+        self.user = user
+        self.host = host
+        self.canais = set()   # Chaves (minúsculas) dos canais partilhados com o bot
+
+    def mascara(self):
+        return f"{self.nick}!{self.user or '*'}@{self.host or '*'}"
+
+class Canal:
+    __slots__ = ("nome", "membros", "bans", "banidos", "completo")
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.membros = {}     # chave do nick → modos do membro ("", "o", "ov", ...)
+        self.bans = set()     # Máscaras de ban conhecidas (MODE +b e lista de bans)
+        self.banidos = {}     # chave do nick → máscara com que o bot o baniu (!ban)
+        self.completo = False # Já chegou o fim do NAMES
+
+def _padrao(mascara):
+    # Máscara IRC (com * e ?) → expressão regular; [ ] \ são caracteres normais de nick
+    return re.compile(re.escape(lower(mascara)).replace(r"\*", ".*").replace(r"\?", "."))
+
+class EstadoCanais:
+    """
+    Estado de uma ligação IRC. 'pedir_who(canal)' é chamado quando o bot entra
+    num canal, para obter o user@host de quem já lá estava, e 'ao_esquecer(nick)'
+    quando um nick deixa de partilhar canais com o bot (ex.: a cache de contas).
+    """
+
+    def __init__(self, pedir_who=None, ao_esquecer=None):
+        self.pedir_who = pedir_who
+        self.ao_esquecer = ao_esquecer
+        self.utilizadores = {}   # chave do nick → Utilizador
+        self.canais = {}         # chave do canal → Canal
+        self._names = {}         # chave do canal → membros recebidos no NAMES em curso
+        self._connection = None
+
+    def associar(self, connection):
+        self._connection = connection
+        for evento in ("join", "part", "kick", "quit", "nick", "mode", "namreply", "endofnames",
+                       "whoreply", "banlist", "pubmsg", "disconnect"):
+            connection.add_global_handler(evento, getattr(self, f"_on_{evento}"), PRIORIDADE_ESTADO)
+
+    def limpar(self):
+        self.utilizadores.clear()
+        self.canais.clear()
+        self._names.clear()
+
+    # ============================================================================ #
+    # ------------------------------- Consultas O(1) ----------------------------- #
+    # ============================================================================ #
+
+    def no_canal(self, canal, nick):
+        c = self.canais.get(lower(canal))
+        return c is not None and lower(nick) in c.membros
+
+    def conhecido(self, canal):
+        # True quando o bot está no canal e já recebeu a lista de membros.
+        c = self.canais.get(lower(canal))
+        return c is not None and c.completo
+
+    def modos(self, canal, nick):
+        c = self.canais.get(lower(canal))
+        return c.membros.get(lower(nick), "") if c is not None else ""
+
+    def e_op(self, canal, nick):
+        return "o" in self.modos(canal, nick)
+
+    def tem_voz(self, canal, nick):
+        return "v" in self.modos(canal, nick)
+
+    def utilizador(self, nick):
+        return self.utilizadores.get(lower(nick))
+
+    def canais_de(self, nick):
+        u = self.utilizadores.get(lower(nick))
+        return [self.canais[k].nome for k in u.canais] if u is not None else []
+
+    def membros(self, canal):
+        c = self.canais.get(lower(canal))
+        if c is None:
+            return []
+        return [self.utilizadores[k].nick for k in c.membros if k in self.utilizadores]
+
+    def mascara_ban(self, nick):
+        # *!*@host quando o host é conhecido; caso contrário, nick!*@*
+        u = self.utilizadores.get(lower(nick))
+        if u is not None and u.host:
+            return f"*!*@{u.host}"
+        return f"{nick}!*@*"
+
+    def registar_ban(self, canal, nick, mascara):
+        # Guarda a máscara usada no ban: depois do kick o host do nick deixa de ser conhecido.
+        c = self.canais.get(lower(canal))
+        if c is not None:
+            c.banidos[lower(nick)] = mascara
+
+    def bans_de(self, canal, nick):
+        """
+        Bans do canal que apanham o nick: o que o bot lhe pôs (mesmo que já não
+        esteja no canal) e os bans conhecidos que batem com a máscara completa
+        (ou com nick!*@* quando o user@host não é conhecido).
+        """
+        c = self.canais.get(lower(canal))
+        if c is None:
+            return []
+        u = self.utilizadores.get(lower(nick))
+        mascara = lower(u.mascara() if u is not None else f"{nick}!*@*")
+        bans = [ban for ban in c.bans if _padrao(ban).fullmatch(mascara)]
+        proprio = c.banidos.get(lower(nick))
+        if proprio is not None and proprio not in bans:
+            bans.append(proprio)
+        return bans
+
+    # ============================================================================ #
+    # ------------------------------ Atualização --------------------------------- #
+    # ============================================================================ #
+
+    def _eu(self, nick):
+        return self._connection is not None and lower(nick) == lower(self._connection.get_nickname())
+
+    def _ver(self, nick, user=None, host=None):
+        # Devolve o Utilizador do nick (criando-o) e atualiza o user@host se vier.
+        chave = lower(nick)
+        u = self.utilizadores.get(chave)
+        if u is None:
+            u = self.utilizadores[chave] = Utilizador(nick, user, host)
+        elif host and (u.host != host or u.user != user):
+            u.user, u.host = user, host
+        return u
+
+    def _entrar(self, canal, nick, user=None, host=None, modos=""):
+        c = self.canais.get(lower(canal))
+        if c is None:
+            return
+        u = self._ver(nick, user, host)
+        c.membros[lower(nick)] = modos
+        u.canais.add(lower(canal))
+
+    def _sair(self, canal, nick):
+        chave_canal, chave = lower(canal), lower(nick)
+        c = self.canais.get(chave_canal)
+        if c is not None:
+            c.membros.pop(chave, None)
+        u = self.utilizadores.get(chave)
+        if u is not None:
+            u.canais.discard(chave_canal)
+            if not u.canais:
+                self._esquecer(chave)  # Já não partilha nenhum canal com o bot
+
+    def _largar_canal(self, canal):
+        # O bot saiu do canal: esquece-o e a quem só lá estava.
+        c = self.canais.pop(lower(canal), None)
+        self._names.pop(lower(canal), None)
+        if c is None:
+            return
+        for chave in c.membros:
+            u = self.utilizadores.get(chave)
+            if u is not None:
+                u.canais.discard(lower(canal))
+                if not u.canais:
+                    self._esquecer(chave)
+
+    def _esquecer(self, chave):
+        u = self.utilizadores.pop(chave)
+        if self.ao_esquecer is not None:
+            self.ao_esquecer(u.nick)
+
+    def _on_join(self, connection, event):
+        nick, canal = event.source.nick, event.target
+        if self._eu(nick):
+            self._largar_canal(canal)
+            self.canais[lower(canal)] = Canal(canal)
+            if self.pedir_who is not None:
+                self.pedir_who(canal)
+        self._entrar(canal, nick, event.source.user, event.source.host)
+
+    def _on_part(self, connection, event):
+        if self._eu(event.source.nick):
+            self._largar_canal(event.target)
+        else:
+            self._sair(event.target, event.source.nick)
+
+    def _on_kick(self, connection, event):
+        expulso = event.arguments[0] if event.arguments else ""
+        if self._eu(expulso):
+            self._largar_canal(event.target)
+        else:
+            self._sair(event.target, expulso)
+
+    def _on_quit(self, connection, event):
+        # Num netsplit chegam centenas destes seguidos: cada um custa O(canais do nick)
+        u = self.utilizadores.pop(lower(event.source.nick), None)
+        if u is None:
+            return
+        chave = lower(event.source.nick)
+        for chave_canal in u.canais:
+            c = self.canais.get(chave_canal)
+            if c is not None:
+                c.membros.pop(chave, None)
+        if self.ao_esquecer is not None:
+            self.ao_esquecer(u.nick)
+
+    def _on_nick(self, connection, event):
+        antiga, novo = lower(event.source.nick), event.target
+        u = self.utilizadores.pop(antiga, None)
+        if u is None:
+            return
+        u.nick = novo
+        self.utilizadores[lower(novo)] = u
+        for chave_canal in u.canais:
+            c = self.canais.get(chave_canal)
+            if c is not None and antiga in c.membros:
+                c.membros[lower(novo)] = c.membros.pop(antiga)
+
+    def _on_mode(self, connection, event):
+        c = self.canais.get(lower(event.target))
+        if c is None or not event.arguments:
+            return
+        prefixos = set(connection.features.prefix.values())  # Modos de membro (o, v, h, ...)
+        chanmodes = getattr(connection.features, "chanmodes", ["beI", "k", "l", ""])
+        com_parametro = prefixos | set(chanmodes[0]) | set(chanmodes[1])
+        so_ao_ativar = set(chanmodes[2])
+
+        parametros = list(event.arguments[1:])
+        sinal = "+"
+        for modo in event.arguments[0]:
+            if modo in "+-":
+                sinal = modo
+                continue
+            if modo in com_parametro or (sinal == "+" and modo in so_ao_ativar):
+                if not parametros:
+                    break
+                parametro = parametros.pop(0)
+            else:
+                continue
+
+            if modo in prefixos:
+                chave = lower(parametro)
+                if chave in c.membros:
+                    atuais = c.membros[chave]
+                    if sinal == "+" and modo not in atuais:
+                        c.membros[chave] = atuais + modo
+                    elif sinal == "-":
+                        c.membros[chave] = atuais.replace(modo, "")
+            elif modo == "b":
+                if sinal == "+":
+                    c.bans.add(parametro)
+                else:
+                    c.bans.discard(parametro)
+                    for chave in [k for k, m in c.banidos.items() if lower(m) == lower(parametro)]:
+                        del c.banidos[chave]
+
+    def _on_namreply(self, connection, event):
+        # arguments: [tipo do canal, canal, "nick1 @nick2 +nick3 ..."]
+        if len(event.arguments) < 3 or lower(event.arguments[1]) not in self.canais:
+            return
+        simbolos = connection.features.prefix  # "@" → "o", "+" → "v", ...
+        novos = self._names.setdefault(lower(event.arguments[1]), {})
+        for entrada in event.arguments[2].split():
+            modos = ""
+            while entrada and entrada[0] in simbolos:  # multi-prefix: "@+nick"
+                modos += simbolos[entrada[0]]
+                entrada = entrada[1:]
+            nick, _, resto = entrada.partition("!")   # userhost-in-names: nick!user@host
+            user, _, host = resto.partition("@")
+            self._ver(nick, user or None, host or None)
+            novos[lower(nick)] = modos
+
+    def _on_endofnames(self, connection, event):
+        canal = event.arguments[0] if event.arguments else ""
+        c = self.canais.get(lower(canal))
+        novos = self._names.pop(lower(canal), None)
+        if c is None or novos is None:
+            return
+        # Troca a lista de uma vez: quem deixou de aparecer sai do canal
+        for chave in set(c.membros) - set(novos):
+            self._sair(canal, chave)
+        c.membros = novos
+        for chave in novos:
+            u = self.utilizadores.get(chave)
+            if u is not None:
+                u.canais.add(lower(canal))
+        c.completo = True
+        logger.debug("Estado de %s: %d membros.", canal, len(novos))
+
+    def _on_whoreply(self, connection, event):
+        # arguments: [canal, user, host, servidor, nick, flags ("H@", "G+"), "hops nome"]
+        if len(event.arguments) < 6:
+            return
+        canal, user, host, _, nick, flags = event.arguments[:6]
+        self._ver(nick, user, host)
+        c = self.canais.get(lower(canal))
+        if c is not None and lower(nick) in c.membros:
+            # Sem multi-prefix o WHO só mostra o modo mais alto: junta-se ao que já se sabe
+            simbolos = connection.features.prefix
+            atuais = c.membros[lower(nick)]
+            c.membros[lower(nick)] = atuais + "".join(
+                simbolos[s] for s in flags if s in simbolos and simbolos[s] not in atuais)
+
+    def _on_banlist(self, connection, event):
+        # arguments: [canal, máscara, quem pôs, quando]
+        c = self.canais.get(lower(event.arguments[0])) if len(event.arguments) > 1 else None
+        if c is not None:
+            c.bans.add(event.arguments[1])
+
+    def _on_pubmsg(self, connection, event):
+        # Quem fala num canal traz o user@host no prefixo: aproveita-se sem WHO
+        source = event.source
+        u = self.utilizadores.get(lower(source.nick))
+        if u is not None and u.host is None and source.host:
+            u.user, u.host = source.user, source.host
+
+    def _on_disconnect(self, connection, event):
+        self.limpar()
+
+    def estatisticas(self):
+        return {"canais": len(self.canais), "utilizadores": len(self.utilizadores),
+                "membros": sum(len(c.membros) for c in self.canais.values())}
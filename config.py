@@ -11,6 +11,7 @@
 # ================================================================================ #
 
 import os
+from dataclasses import dataclass
 from dotenv import load_dotenv
 
 # ================================================================================ #
@@ -19,6 +20,21 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _limite(texto):
+    # Converte "5/60" em (5, 60.0): 5 ocorrências por janela de 60 segundos
+    n, _, janela = texto.strip().partition("/")
+    return int(n), float(janela or 60)
+
+def _limites(texto):
+    # Converte "#canal=10/60,!crypto=3/60" em {"#canal": (10, 60.0), "!crypto": (3, 60.0)}
+    pares = (item.split("=", 1) for item in texto.split(",") if "=" in item)
+    return {chave.strip().lower(): _limite(valor) for chave, valor in pares}
+
+def _pares(texto):
+    # Converte "a=1,b=2" em {"a": "1", "b": "2"} (itens sem "=" são ignorados)
+    pares = (item.split("=", 1) for item in texto.split(",") if "=" in item)
+    return {chave.strip(): valor.strip() for chave, valor in pares if chave.strip() and valor.strip()}
+
 # Canais onde o bot deve entrar
 CANAIS = os.getenv("CANAIS", "#portugal,#crypto").split(",")
 
@@ -38,6 +54,67 @@ PORT = int(os.getenv("IRC_PORT", "6697"))
 # Palavra-passe para identificação no NickServ (se configurada)
 PASSWORD = os.getenv("IRC_PASSWORD", "password")
 
+# Usa TLS na ligação (desativar apenas em portas não seguras, ex.: 6667)
+USAR_TLS = os.getenv("IRC_TLS", "true").lower() in ("1", "true", "sim", "yes")
+
+# Certificado (CA) adicional em que confiar, para servidores com certificado próprio
+TLS_CA = os.getenv("IRC_TLS_CA", "")
+
+# Transporte da ligação IRC:
+#   "asyncio" → ligação nativa em asyncio (por defeito, sem polling)
+#   "reactor" → irc.client.Reactor com process_once (modo de recurso)
+TRANSPORTE = os.getenv("IRC_TRANSPORTE", "asyncio").lower()
+
+# Identificação no NickServ por SASL PLAIN durante o registo (em vez de PRIVMSG IDENTIFY)
+SASL = os.getenv("IRC_SASL", "true").lower() in ("1", "true", "sim", "yes")
+
+# Reconexão: espera inicial e máxima (segundos) entre tentativas, que duplica a
+# cada falha com uma parte aleatória; o alerta no Telegram sai ao fim de N falhas
+RECONEXAO_MIN = float(os.getenv("RECONEXAO_MIN", "2"))
+RECONEXAO_MAX = float(os.getenv("RECONEXAO_MAX", "300"))
+RECONEXAO_ALERTA = int(os.getenv("RECONEXAO_ALERTA", "5"))
+
+# ================================================================================ #
+# ------------------------------------ LOGS -------------------------------------- #
+# ================================================================================ #
+
+# Ficheiro de log e nível mínimo registado
+LOG_FICHEIRO = os.getenv("LOG_FICHEIRO", "bot.log")
+LOG_NIVEL = os.getenv("LOG_NIVEL", "DEBUG").upper()
+
+# Escrita do log numa thread de fundo (o event loop só põe o registo numa fila)
+LOG_ASSINCRONO = os.getenv("LOG_ASSINCRONO", "true").lower() in ("1", "true", "sim", "yes")
+
+# Rotação do ficheiro: "tamanho", "diaria" ou "" (sem rotação)
+LOG_ROTACAO = os.getenv("LOG_ROTACAO", "tamanho").lower()
+
+# Tamanho máximo (MB) antes de rodar e número de ficheiros antigos a manter
+LOG_TAMANHO_MAX = float(os.getenv("LOG_TAMANHO_MAX", "10"))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+
+# Comprime os ficheiros antigos com gzip (bot.log.1.gz, ...)
+LOG_COMPRIMIR = os.getenv("LOG_COMPRIMIR", "true").lower() in ("1", "true", "sim", "yes")
+
+# Níveis por módulo, ex.: "mensagens=WARNING,crypto=DEBUG"
+# (mensagens = cada linha dos canais; comandos, irc, saida, seen, crypto, telegram, plugins)
+LOG_NIVEIS = {
+    modulo.strip(): nivel.strip().upper()
+    for modulo, _, nivel in (item.partition("=") for item in os.getenv("LOG_NIVEIS", "").split(","))
+    if modulo.strip() and nivel.strip()
+}
+
+# ================================================================================ #
+# ----------------------------------- PLUGINS ------------------------------------ #
+# ================================================================================ #
+
+# Plugins extra carregados no arranque (cada um regista os seus comandos). Os que
+# o bot.py usa diretamente (commands, admin, seen, crypto, telegram, archive e
+# alerts) estão sempre carregados e não se desligam aqui.
+PLUGINS = os.getenv("PLUGINS", "stats,profiler").split(",")
+
+# Recarrega automaticamente os plugins alterados no disco (modo de desenvolvimento)
+PLUGINS_AUTORELOAD = os.getenv("PLUGINS_AUTORELOAD", "false").lower() in ("1", "true", "sim", "yes")
+
 # ================================================================================ #
 # ----------------------------- PERMISSÕES DE ADMIN ------------------------------ #
 # ================================================================================ #
@@ -45,6 +122,19 @@ PASSWORD = os.getenv("IRC_PASSWORD", "password")
 # Lista de utilizadores (nicks) com permissões administrativas no bot
 ADMINS = os.getenv("IRC_ADMINS", "admin,admin1").split(",")
 
+# Exige que o admin esteja identificado (conta de serviços) em vez de confiar no nick.
+# A conta vem do IRCv3 (account-notify, extended-join, account-tag) ou do NickServ.
+ADMINS_POR_CONTA = os.getenv("ADMINS_POR_CONTA", "true").lower() in ("1", "true", "sim", "yes")
+
+# Comando do NickServ usado quando o servidor não indica a conta:
+#   "STATUS" → Anope (STATUS nick → "STATUS nick 3 conta")
+#   "ACC"    → Atheme (ACC nick → "nick ACC 3")
+NICKSERV_CONSULTA = os.getenv("NICKSERV_CONSULTA", "STATUS").upper()
+
+# Tempo (segundos) que a conta de um nick fica em cache e tempo máximo de espera pelo NickServ
+CONTAS_TTL = float(os.getenv("CONTAS_TTL", "600"))
+CONTAS_TIMEOUT = float(os.getenv("CONTAS_TIMEOUT", "5"))
+
 # ================================================================================ #
 # --------------------------- CONFIGURAÇÃO DO TELEGRAM --------------------------- #
 # ================================================================================ #
@@ -55,9 +145,42 @@ TELEGRAM_BOT_TOKEN = os.getenv(
     "0123456789:AAAAAAAAAAAAAAAAA-AAAAAAAAAAAAAAAAA"
 )
 
+# Endereço base da API do Telegram (pode apontar para um servidor local de testes)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
 # Chat ID ou grupo para onde o bot enviará notificações
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "0123456789")
 
+# Número máximo de alertas em fila (quando cheia, descartam-se os mais antigos)
+TELEGRAM_FILA_MAX = int(os.getenv("TELEGRAM_FILA_MAX", "200"))
+
+# Janela (segundos) em que alertas seguidos são juntos numa só mensagem
+TELEGRAM_JANELA = float(os.getenv("TELEGRAM_JANELA", "2"))
+
+# Intervalo mínimo (segundos) entre envios para o mesmo chat (grupos: 20/min)
+TELEGRAM_INTERVALO = float(os.getenv("TELEGRAM_INTERVALO", "3"))
+
+# Tentativas de envio antes de desistir de uma mensagem
+TELEGRAM_TENTATIVAS = int(os.getenv("TELEGRAM_TENTATIVAS", "5"))
+
+# Pontes entre chats do Telegram e canais IRC, nos dois sentidos:
+# "chat=#canal" ou "chat=rede/#canal" (ex.: "-1001234=#portugal,-1005678=libera/#crypto")
+TELEGRAM_PONTES = _pares(os.getenv("TELEGRAM_PONTES", ""))
+
+# Utilizadores do Telegram (ID numérico) com poderes de admin, com o nome de admin
+# IRC que lhes corresponde (ex.: "123456789=NunchuckCoder")
+TELEGRAM_ADMINS = _pares(os.getenv("TELEGRAM_ADMINS", ""))
+
+# Segundos que cada pedido getUpdates fica à espera de mensagens novas (long polling)
+TELEGRAM_POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "30"))
+
+# Ficheiro onde fica o último update lido (um reinício não repete mensagens)
+TELEGRAM_OFFSET_FICHEIRO = os.getenv("TELEGRAM_OFFSET_FICHEIRO", "db/telegram.offset")
+
+# Segundos durante os quais as linhas de um canal vão sendo acrescentadas (editando)
+# à mesma mensagem do Telegram, em vez de cada lote ser uma mensagem nova
+TELEGRAM_EDITAR_JANELA = float(os.getenv("TELEGRAM_EDITAR_JANELA", "60"))
+
 # ================================================================================ #
 # --------------------------- MENSAGENS DE BOAS-VINDAS --------------------------- #
 # ================================================================================ #
@@ -76,3 +199,200 @@ BOAS_VINDAS = {
 # Lista de canais onde devem ser enviados alertas de entradas/saídas para o Telegram
 # Por defeito, usa os mesmos canais definidos em CANAIS
 CANAIS_COM_ALERTAS = os.getenv("CANAIS_COM_ALERTAS", ",".join(CANAIS)).split(",")
+
+# Entradas num canal dentro desta janela (segundos) dão uma só saudação e um só alerta
+ENTRADAS_JANELA = float(os.getenv("ENTRADAS_JANELA", "3"))
+
+# Tempo (segundos) durante o qual quem saiu num netsplit volta sem ser saudado
+NETSPLIT_MEMORIA = float(os.getenv("NETSPLIT_MEMORIA", "1800"))
+
+# Tempo (segundos) sem voltar a saudar o mesmo nick no mesmo canal
+SAUDADOS_MEMORIA = float(os.getenv("SAUDADOS_MEMORIA", "3600"))
+
+# ================================================================================ #
+# ------------------------- ARMAZENAMENTO DO !SEEN ------------------------------- #
+# ================================================================================ #
+
+# Intervalo (segundos) entre gravações em lote das atualizações pendentes
+SEEN_FLUSH_INTERVALO = float(os.getenv("SEEN_FLUSH_INTERVALO", "5"))
+
+# Número de nicks pendentes que força uma gravação imediata
+SEEN_FLUSH_LIMITE = int(os.getenv("SEEN_FLUSH_LIMITE", "500"))
+
+# Ficheiro da base de dados do histórico de atividade
+SEEN_DB = os.getenv("SEEN_DB", "db/seen.db")
+
+# Retenção: registos mais antigos que N dias são apagados (0 = guardar tudo) e a
+# tabela nunca passa de SEEN_MAX_REGISTOS nicks (0 = sem limite)
+SEEN_RETENCAO_DIAS = float(os.getenv("SEEN_RETENCAO_DIAS", "365"))
+SEEN_MAX_REGISTOS = int(os.getenv("SEEN_MAX_REGISTOS", "5000000"))
+
+# Intervalo (segundos) entre limpezas/compactações da base de dados
+SEEN_LIMPEZA_INTERVALO = float(os.getenv("SEEN_LIMPEZA_INTERVALO", "21600"))
+
+# ================================================================================ #
+# ------------------------------ ARQUIVO DOS CANAIS ------------------------------ #
+# ================================================================================ #
+
+# Canais cujas mensagens são arquivadas (ex.: "#portugal,#crypto"; "*" = todos).
+# Vazio por defeito: o arquivo só existe para os canais que o pedem.
+ARQUIVO_CANAIS = [c.strip().lower() for c in os.getenv("ARQUIVO_CANAIS", "").split(",") if c.strip()]
+
+# Pasta dos ficheiros diários comprimidos (<rede>/<canal>/AAAA-MM-DD.log.gz) e do índice
+ARQUIVO_PASTA = os.getenv("ARQUIVO_PASTA", "db/arquivo")
+
+# Intervalo (segundos) entre gravações em lote e mensagens pendentes que forçam uma gravação
+ARQUIVO_FLUSH_INTERVALO = float(os.getenv("ARQUIVO_FLUSH_INTERVALO", "2"))
+ARQUIVO_FLUSH_LIMITE = int(os.getenv("ARQUIVO_FLUSH_LIMITE", "2000"))
+
+# Retenção (dias) aplicada pelo !arquivo limpar (0 = guardar tudo)
+ARQUIVO_RETENCAO_DIAS = float(os.getenv("ARQUIVO_RETENCAO_DIAS", "90"))
+
+# Resultados por página do !grep e do !last
+ARQUIVO_POR_PAGINA = int(os.getenv("ARQUIVO_POR_PAGINA", "5"))
+
+# ================================================================================ #
+# --------------------------- CONTROLO DE FLOOD (SAÍDA) -------------------------- #
+# ================================================================================ #
+
+# Linhas que podem sair de seguida antes de o limite entrar em ação
+FLOOD_RAJADA = int(os.getenv("FLOOD_RAJADA", "5"))
+
+# Linhas por segundo em regime contínuo (ajustar aos limites do servidor)
+FLOOD_TAXA = float(os.getenv("FLOOD_TAXA", "1"))
+
+# ================================================================================ #
+# --------------------------- FILA DE ENTRADA (COMANDOS) ------------------------- #
+# ================================================================================ #
+
+# Comandos em execução ao mesmo tempo (em todos os canais de uma rede)
+ENTRADA_TRABALHADORES = int(os.getenv("ENTRADA_TRABALHADORES", "8"))
+
+# Comandos à espera por canal/nick e no total; acima disso sai o menos importante
+ENTRADA_FILA_ALVO = int(os.getenv("ENTRADA_FILA_ALVO", "20"))
+ENTRADA_FILA_MAX = int(os.getenv("ENTRADA_FILA_MAX", "500"))
+
+# Tempo (segundos) que um comando pode demorar antes de ser cancelado (0 ou menos = sem limite)
+ENTRADA_TEMPO_LIMITE = float(os.getenv("ENTRADA_TEMPO_LIMITE", "20"))
+
+# Janela (segundos) em que pedidos iguais no mesmo canal (ex.: três "!crypto eth")
+# têm uma só resposta; só para os comandos registados com agrupar=True (0 = desligado)
+AGRUPAR_JANELA = float(os.getenv("AGRUPAR_JANELA", "3"))
+
+# ================================================================================ #
+# ------------------------------ PREÇOS DE CRYPTO -------------------------------- #
+# ================================================================================ #
+
+# Endpoint base da API da Binance (pode apontar para um servidor local de testes)
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", "https://api.binance.com/api/v3")
+
+# Intervalo (segundos) entre atualizações da lista de pares da Binance
+CRYPTO_INDICE_INTERVALO = float(os.getenv("CRYPTO_INDICE_INTERVALO", "3600"))
+
+# Tempo (segundos) que um preço obtido da Binance fica em cache
+CRYPTO_TTL = float(os.getenv("CRYPTO_TTL", "10"))
+
+# Tempo (segundos) que um par inexistente fica em cache (cache negativa)
+CRYPTO_TTL_NEGATIVO = float(os.getenv("CRYPTO_TTL_NEGATIVO", "300"))
+
+# Número máximo de pares guardados em cache
+CRYPTO_CACHE_MAX = int(os.getenv("CRYPTO_CACHE_MAX", "1000"))
+
+# ================================================================================ #
+# ------------------------------ ALERTAS DE PREÇO -------------------------------- #
+# ================================================================================ #
+
+# Intervalo (segundos) entre consultas aos preços das moedas com alertas (um só pedido
+# à Binance por intervalo, seja qual for o número de alertas)
+ALERTAS_INTERVALO = float(os.getenv("ALERTAS_INTERVALO", "10"))
+
+# Alertas ativos por nick (em cada rede) e no total
+ALERTAS_MAX_NICK = int(os.getenv("ALERTAS_MAX_NICK", "10"))
+ALERTAS_MAX = int(os.getenv("ALERTAS_MAX", "100000"))
+
+# Base de dados onde os alertas ficam guardados entre reinícios
+ALERTAS_DB = os.getenv("ALERTAS_DB", "db/alertas.db")
+
+# ================================================================================ #
+# ------------------------ LIMITE DE COMANDOS POR UTILIZADOR --------------------- #
+# ================================================================================ #
+
+# Limite por nick (janela deslizante): "<comandos>/<segundos>"
+RATE_LIMIT = _limite(os.getenv("RATE_LIMIT", "5/60"))
+
+# Limites específicos por canal, ex.: "#crypto=10/60,#portugal=3/60"
+RATE_LIMIT_CANAIS = _limites(os.getenv("RATE_LIMIT_CANAIS", ""))
+
+# Limites adicionais por comando, ex.: "!crypto=3/60,!ajuda=1/300"
+RATE_LIMIT_COMANDOS = _limites(os.getenv("RATE_LIMIT_COMANDOS", ""))
+
+# Número máximo de nicks seguidos em memória (os inativos há mais tempo saem primeiro)
+RATE_LIMIT_MAX_NICKS = int(os.getenv("RATE_LIMIT_MAX_NICKS", "5000"))
+
+# ================================================================================ #
+# -------------------------------- MÚLTIPLAS REDES ------------------------------- #
+# ================================================================================ #
+
+# Redes IRC a que o bot se liga em simultâneo (um só processo), ex.: "ptnet,libera".
+# Cada rede lê as variáveis com o seu nome como prefixo (PTNET_IRC_SERVER,
+# LIBERA_CANAIS, ...) e usa os valores acima quando uma variável não existe.
+# Sem REDES, o bot liga-se apenas à rede definida pelas variáveis acima.
+
+@dataclass
+class Rede:
+    nome: str
+    server: str
+    port: int
+    nick: str
+    password: str
+    tls: bool
+    sasl: bool
+    canais: list
+    canais_com_alertas: list
+    boas_vindas: dict
+
+def _rede(nome, prefixo=""):
+    def ler(chave, padrao):
+        return os.getenv(prefixo + chave, padrao)
+
+    canais = ler("CANAIS", ",".join(CANAIS)).split(",")
+    return Rede(
+        nome=nome,
+        server=ler("IRC_SERVER", SERVER),
+        port=int(ler("IRC_PORT", str(PORT))),
+        nick=ler("IRC_NICK", NICK),
+        password=ler("IRC_PASSWORD", PASSWORD),
+        tls=ler("IRC_TLS", str(USAR_TLS)).lower() in ("1", "true", "sim", "yes"),
+        sasl=ler("IRC_SASL", str(SASL)).lower() in ("1", "true", "sim", "yes"),
+        canais=canais,
+        canais_com_alertas=ler("CANAIS_COM_ALERTAS", ",".join(canais)).split(","),
+        boas_vindas=BOAS_VINDAS,
+    )
+
+_NOMES_REDES = [nome.strip() for nome in os.getenv("REDES", "").split(",") if nome.strip()]
+REDES = [_rede(nome, nome.upper() + "_") for nome in _NOMES_REDES] or [_rede(SERVER)]
+
+# ================================================================================ #
+# ----------------------------------- MÉTRICAS ----------------------------------- #
+# ================================================================================ #
+
+# Recolhe métricas de latência e contadores (desligado não tem custo)
+METRICAS = os.getenv("METRICAS", "false").lower() in ("1", "true", "sim", "yes")
+
+# Endpoint local com as métricas em formato Prometheus (porta 0 = sem endpoint)
+METRICAS_HOST = os.getenv("METRICAS_HOST", "127.0.0.1")
+METRICAS_PORTA = int(os.getenv("METRICAS_PORTA", "9108"))
+
+# ================================================================================ #
+# --------------------------- PERFIS EM EXECUÇÃO (!profile) ---------------------- #
+# ================================================================================ #
+
+# Pasta dos ficheiros gerados pelo !profile (pilhas de CPU, memória, tarefas)
+PERFIL_PASTA = os.getenv("PERFIL_PASTA", "perfis")
+
+# Intervalo (segundos) entre amostras do perfil de CPU
+PERFIL_AMOSTRAGEM = float(os.getenv("PERFIL_AMOSTRAGEM", "0.005"))
+
+# Duração máxima (segundos) de um perfil e linhas do resumo enviado ao admin
+PERFIL_MAX_SEGUNDOS = float(os.getenv("PERFIL_MAX_SEGUNDOS", "300"))
+PERFIL_TOP = int(os.getenv("PERFIL_TOP", "5"))
@@ -0,0 +1,183 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      inbound.py                                                        #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Escalonador de entrada dos comandos. Cada destino (canal ou nick  #
+#                em privado) tem uma fila limitada e executa um comando de cada    #
+#                vez, pela ordem de chegada, para as respostas nunca saírem        #
+#                trocadas; um número fixo de trabalhadores serve todos os          #
+#                destinos à vez. Cada comando tem um tempo limite (é cancelado     #
+#                quando passa) e, com as filas cheias, sai primeiro o trabalho     #
+#                menos importante.                                                 #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import collections
+import time
+
+import metrics
+from logger import obter_logger
+from config import ENTRADA_TRABALHADORES, ENTRADA_FILA_ALVO, ENTRADA_FILA_MAX, ENTRADA_TEMPO_LIMITE
+from outbound import PRIORIDADE_NORMAL, PRIORIDADE_BAIXA  # As mesmas faixas da saída
+
+logger = obter_logger("entrada")
+
+class EscalonadorEntrada:
+    """
+    Fila de entrada com 'trabalhadores' comandos em execução no máximo.
+    'submeter' recebe uma função que cria a corrotina (só é chamada quando o
+    comando vai mesmo correr) e 'ao_esgotar(alvo, nome)' é chamado quando um
+    comando passa do tempo limite e é cancelado (cada 'submeter' pode indicar
+    outro, ex.: para o aviso ir para o chat do Telegram de onde veio o comando).
+    """
+
+    def __init__(self, trabalhadores=ENTRADA_TRABALHADORES, por_alvo=ENTRADA_FILA_ALVO,
+                 maximo=ENTRADA_FILA_MAX, tempo_limite=ENTRADA_TEMPO_LIMITE, ao_esgotar=None, rede=""):
+        self.trabalhadores = trabalhadores
+        self.por_alvo = por_alvo
+        self.maximo = maximo
+        self.tempo_limite = tempo_limite
+        self.ao_esgotar = ao_esgotar
+        self.rede = rede
+
+        # Destino → fila de (prioridade, instante, fábrica, nome, tempo limite, ao_esgotar)
+        self._filas = {}
+        # Destinos com trabalho e sem nenhum comando em execução, pela vez de cada um
+        self._prontos = collections.deque()
+        self._ocupados = {}  # Destino → (comando em execução, instante em que começou)
+        self._pendentes = 0
+        self._ha_trabalho = asyncio.Event()
+
+        # Estatísticas
+        self.executados = 0
+        self.esgotados = 0
+        self.descartados = [0] * (PRIORIDADE_BAIXA + 1)  # Por prioridade
+
+    # ============================================================================ #
+    # ------------------------------ Entrada na fila ----------------------------- #
+    # ============================================================================ #
+
+    def submeter(self, alvo, fabrica, prioridade=PRIORIDADE_NORMAL, nome="", tempo_limite=0, ao_esgotar=None):
+        # Põe o comando na fila de 'alvo'; devolve False se foi ele o descartado.
+        fila = self._filas.get(alvo)
+        cheia = fila is not None and len(fila) >= self.por_alvo
+        if cheia or self._pendentes >= self.maximo:
+            # Fila do destino cheia: só se descarta dentro dela; senão, em qualquer fila
+            if not self._descartar(prioridade, alvo if cheia else None):
+                self._contar_descarte(prioridade, alvo, nome)
+                return False
+            fila = self._filas.get(alvo)
+
+        if fila is None:
+            fila = self._filas[alvo] = collections.deque()
+            if alvo not in self._ocupados:
+                self._prontos.append(alvo)
+        fila.append((prioridade, time.monotonic(), fabrica, nome, tempo_limite or self.tempo_limite,
+                     ao_esgotar or self.ao_esgotar))
+        self._pendentes += 1
+        self._ha_trabalho.set()
+        return True
+
+    def _descartar(self, prioridade, alvo=None):
+        """
+        Tira da fila o comando menos importante que 'prioridade' (número maior),
+        o mais antigo entre os de igual prioridade: é o que já responderia mais
+        tarde. Procura só na fila de 'alvo' ou, sem alvo, em todas.
+        """
+        escolhido = None
+        for destino in ([alvo] if alvo is not None else list(self._filas)):
+            for indice, item in enumerate(self._filas.get(destino, ())):
+                if item[0] > prioridade and (escolhido is None or item[0] > escolhido[2][0]):
+                    escolhido = (destino, indice, item)
+        if escolhido is None:
+            return False
+
+        destino, indice, item = escolhido
+        fila = self._filas[destino]
+        del fila[indice]
+        self._pendentes -= 1
+        if not fila:
+            del self._filas[destino]
+            if destino in self._prontos:
+                self._prontos.remove(destino)
+        self._contar_descarte(item[0], destino, item[3])
+        return True
+
+    def _contar_descarte(self, prioridade, alvo, nome):
+        self.descartados[prioridade] += 1
+        metrics.contar("irc_comandos_descartados_total", rede=self.rede, prioridade=str(prioridade))
+        logger.warning("Fila de entrada cheia: %s para %s descartado.", nome or "comando", alvo)
+
+    def limpar(self):
+        # Descarta o que ainda não começou (ex.: ligação perdida); o que corre termina.
+        self._filas.clear()
+        self._prontos.clear()
+        self._pendentes = 0
+        self._ha_trabalho.clear()
+
+    # ============================================================================ #
+    # -------------------------------- Trabalhadores ----------------------------- #
+    # ============================================================================ #
+
+    async def processar(self):
+        await asyncio.gather(*(self._trabalhador() for _ in range(self.trabalhadores)))
+
+    async def _trabalhador(self):
+        while True:
+            while not self._prontos:
+                self._ha_trabalho.clear()
+                await self._ha_trabalho.wait()
+            alvo = self._prontos.popleft()
+            fila = self._filas[alvo]
+            item = fila.popleft()
+            self._pendentes -= 1
+            if not fila:
+                del self._filas[alvo]
+
+            # Um só comando por destino de cada vez: as respostas saem pela ordem dos pedidos
+            self._ocupados[alvo] = (item[3], time.monotonic())
+            try:
+                await self._executar(alvo, item)
+            finally:
+                del self._ocupados[alvo]
+                if alvo in self._filas:
+                    self._prontos.append(alvo)
+                    self._ha_trabalho.set()
+
+    async def _executar(self, alvo, item):
+        _, instante, fabrica, nome, tempo_limite, ao_esgotar = item
+        metrics.observar("irc_entrada_espera_segundos", time.monotonic() - instante)
+        try:
+            # Tempo limite <= 0: o comando corre até ao fim
+            await asyncio.wait_for(fabrica(), tempo_limite if tempo_limite > 0 else None)
+        except asyncio.TimeoutError:
+            self.esgotados += 1
+            metrics.contar("irc_comandos_esgotados_total", rede=self.rede)
+            logger.warning("%s em %s cancelado ao fim de %gs.", nome or "Comando", alvo, tempo_limite)
+            if ao_esgotar is not None:
+                ao_esgotar(alvo, nome)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Erro ao executar %s em %s.", nome or "comando", alvo)
+        self.executados += 1
+
+    def em_execucao(self):
+        # [(destino, comando, segundos a correr)], os mais demorados primeiro
+        agora = time.monotonic()
+        return sorted(((alvo, nome, agora - inicio) for alvo, (nome, inicio) in self._ocupados.items()),
+                      key=lambda item: -item[2])
+
+    def estatisticas(self):
+        return {
+            "pendentes": self._pendentes,
+            "em_execucao": len(self._ocupados),
+            "maior_fila": max((len(f) for f in self._filas.values()), default=0),
+            "executados": self.executados,
+            "esgotados": self.esgotados,
+            "descartados": list(self.descartados),
+        }
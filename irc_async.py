@@ -0,0 +1,456 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      irc_async.py                                                      #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Transporte IRC nativo em asyncio. Abre a ligação com              #
+#                asyncio.open_connection (TLS opcional), faz a leitura em blocos   #
+#                com um analisador incremental de linhas e despacha os eventos     #
+#                com a mesma forma que o irc.client (pubmsg, privmsg, join, ...),  #
+#                para que os handlers do bot funcionem com ambos os transportes.   #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import base64
+import ssl
+
+from irc import ctcp
+from irc.client import (
+    Event,
+    InvalidCharacters,
+    MessageTooLong,
+    NickMask,
+    ServerNotConnectedError,
+    is_channel,
+)
+from irc.events import Command
+from irc.features import FeatureSet
+from irc.message import Tag
+
+import metrics
+from logger import obter_logger
+
+logger = obter_logger("irc")
+
+# Tamanho de cada leitura do socket (várias linhas são processadas de uma vez)
+TAMANHO_LEITURA = 2 ** 14
+
+# Limite de segurança para uma linha sem terminador (tags IRCv3 + 512 bytes)
+TAMANHO_MAXIMO_LINHA = 8191 + 512
+
+# ================================================================================ #
+# ------------------------ ANALISADOR INCREMENTAL DE LINHAS ---------------------- #
+# ================================================================================ #
+
+class AnalisadorLinhas:
+    """
+    Acumula os bytes recebidos e devolve apenas as linhas completas.
+    O resto (linha parcial) fica guardado até chegar o próximo bloco.
+    """
+
+    def __init__(self):
+        self._pendente = b""
+
+    def alimentar(self, dados):
+        blocos = (self._pendente + dados).split(b"\n")
+        self._pendente = blocos.pop()
+        if len(self._pendente) > TAMANHO_MAXIMO_LINHA:
+            # Linha absurda sem terminador: descarta para não crescer sem limite
+            logger.warning("Linha recebida demasiado longa, descartada.")
+            self._pendente = b""
+
+        linhas = []
+        for bloco in blocos:
+            bloco = bloco.rstrip(b"\r")
+            if not bloco:
+                continue
+            try:
+                linhas.append(bloco.decode("utf-8"))
+            except UnicodeDecodeError:
+                # Muitos clientes antigos ainda enviam latin-1
+                linhas.append(bloco.decode("latin-1"))
+        return linhas
+
+
+def analisar_linha(linha):
+    """
+    Divide uma linha IRC em (tags, prefixo, comando, parâmetros).
+    Exemplo: "@a=1 :nick!u@h PRIVMSG #c :olá" →
+             ([{'key': 'a', 'value': '1'}], "nick!u@h", "PRIVMSG", ["#c", "olá"])
+    """
+    tags = None
+    if linha.startswith("@"):
+        brutas, _, linha = linha.partition(" ")
+        tags = [Tag.parse(item) for item in brutas[1:].split(";") if item]
+        linha = linha.lstrip(" ")
+
+    prefixo = None
+    if linha.startswith(":"):
+        prefixo, _, linha = linha[1:].partition(" ")
+        linha = linha.lstrip(" ")
+
+    antes, separador, final = linha.partition(" :")
+    parametros = antes.split()
+    if separador:
+        parametros.append(final)
+
+    comando = parametros.pop(0) if parametros else ""
+    return tags, prefixo, comando, parametros
+
+# ================================================================================ #
+# ----------------------------- CAPACIDADES IRCv3 -------------------------------- #
+# ================================================================================ #
+
+class NegociacaoCAP:
+    """
+    Negociação de capacidades IRCv3 (CAP LS / REQ / ACK / END) sobre qualquer
+    ligação com add_global_handler e send_raw (asyncio ou irc.client).
+    'pedidas' são as capacidades que o bot quer; 'ativas' as aceites.
+    Com 'sasl=(conta, senha)' autentica-se com SASL PLAIN antes do CAP END,
+    para o bot já estar identificado quando o registo termina.
+    """
+
+    def __init__(self, pedidas=(), sasl=None):
+        self.pedidas = set(pedidas)
+        self.sasl = sasl
+        if sasl:
+            self.pedidas.add("sasl")
+        self.disponiveis = {}  # nome → valor anunciado (ex.: "sasl" → "PLAIN,EXTERNAL")
+        self.ativas = set()
+        self.autenticado = False
+        self._em_espera = 0
+        self._terminada = False
+        self._connection = None
+
+    def associar(self, connection):
+        # Uma vez por ligação: cada nova sessão recomeça do zero no "disconnect"
+        self._connection = connection
+        connection.add_global_handler("cap", self._on_cap, -20)
+        connection.add_global_handler("authenticate", self._on_authenticate, -20)
+        for evento in ("saslsuccess", "saslalready"):
+            connection.add_global_handler(evento, self._on_sasl_ok, -20)
+        for evento in ("saslfail", "sasltoolong", "saslaborted", "nicklocked"):
+            connection.add_global_handler(evento, self._on_sasl_falhou, -20)
+        connection.add_global_handler("disconnect", lambda c, e: self.reiniciar(), -20)
+
+    def reiniciar(self):
+        self.disponiveis.clear()
+        self.ativas.clear()
+        self.autenticado = False
+        self._em_espera = 0
+        self._terminada = False
+
+    def _pedir(self, nomes):
+        if nomes:
+            self._connection.send_raw("CAP REQ :" + " ".join(sorted(nomes)))
+            self._em_espera += 1
+        self._talvez_terminar()
+
+    def _talvez_terminar(self):
+        if self._em_espera <= 0 and not self._terminada:
+            self._terminada = True
+            self._connection.send_raw("CAP END")
+
+    def _on_cap(self, connection, event):
+        if not event.arguments:
+            return
+        sub, resto = event.arguments[0].upper(), event.arguments[1:]
+        nomes = resto[-1].split() if resto else []
+
+        if sub in ("LS", "NEW"):
+            for item in nomes:
+                nome, _, valor = item.partition("=")
+                self.disponiveis[nome] = valor
+            if sub == "LS" and len(resto) > 1 and resto[0] == "*":
+                return  # Lista em várias linhas: espera pela última
+            self._pedir((self.pedidas & set(self.disponiveis)) - self.ativas)
+        elif sub == "ACK":
+            for nome in nomes:
+                if nome.startswith("-"):
+                    self.ativas.discard(nome[1:])
+                else:
+                    self.ativas.add(nome)
+            logger.info("Capacidades IRCv3 ativas: %s", ", ".join(sorted(self.ativas)) or "nenhuma")
+            if "sasl" in nomes and self.sasl and not self._terminada:
+                # O CAP END fica à espera do resultado da autenticação
+                self._em_espera += 1
+                connection.send_raw("AUTHENTICATE PLAIN")
+            self._em_espera -= 1
+            self._talvez_terminar()
+        elif sub == "NAK":
+            logger.warning("O servidor recusou as capacidades: %s", " ".join(nomes))
+            self._em_espera -= 1
+            self._talvez_terminar()
+        elif sub == "DEL":
+            for nome in nomes:
+                self.ativas.discard(nome)
+                self.disponiveis.pop(nome, None)
+
+    # ============================================================================ #
+    # ------------------------------- SASL PLAIN --------------------------------- #
+    # ============================================================================ #
+
+    def _on_authenticate(self, connection, event):
+        if event.target != "+" or not self.sasl:
+            return
+        conta, senha = self.sasl
+        dados = base64.b64encode(f"{conta}\0{conta}\0{senha}".encode()).decode()
+        # Blocos de 400 bytes; um bloco de exatamente 400 obriga a um "+" no fim
+        for i in range(0, len(dados), 400):
+            connection.send_raw("AUTHENTICATE " + dados[i:i + 400])
+        if len(dados) % 400 == 0:
+            connection.send_raw("AUTHENTICATE +")
+
+    def _on_sasl_ok(self, connection, event):
+        self.autenticado = True
+        logger.info("Autenticado por SASL como %s.", self.sasl[0] if self.sasl else "?")
+        self._fim_sasl()
+
+    def _on_sasl_falhou(self, connection, event):
+        logger.warning("Autenticação SASL falhou (%s); segue sem identificação.", event.type)
+        self._fim_sasl()
+
+    def _fim_sasl(self):
+        if not self._terminada:
+            self._em_espera -= 1
+            self._talvez_terminar()
+
+# ================================================================================ #
+# ---------------------------- LIGAÇÃO IRC ASSÍNCRONA ---------------------------- #
+# ================================================================================ #
+
+class LigacaoAsyncIRC:
+    """
+    Ligação a um servidor IRC sobre asyncio. Expõe os mesmos métodos que o
+    irc.client.ServerConnection usa no bot (privmsg, join, mode, kick, ...).
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.connected = False
+        self.real_nickname = None
+        self.real_server_name = ""
+        self.features = FeatureSet()
+        self.reader = None
+        self.writer = None
+        self._analisador = AnalisadorLinhas()
+
+    # ============================================================================ #
+    # ----------------------- Registo e despacho de handlers --------------------- #
+    # ============================================================================ #
+
+    def add_global_handler(self, event, handler, priority=0):
+        lista = self.handlers.setdefault(event, [])
+        lista.append((priority, handler))
+        lista.sort(key=lambda par: par[0])
+
+    def remove_global_handler(self, event, handler):
+        lista = self.handlers.get(event, [])
+        self.handlers[event] = [par for par in lista if par[1] != handler]
+
+    def _handle_event(self, event):
+        for _, handler in self.handlers.get(event.type, ()):
+            try:
+                handler(self, event)
+            except Exception:
+                # Um handler com erro não pode derrubar o ciclo de leitura
+                logger.exception("Erro no handler do evento %s.", event.type)
+
+    # ============================================================================ #
+    # ------------------------- Ligação e ciclo de leitura ----------------------- #
+    # ============================================================================ #
+
+    async def connect(self, server, port, nickname, password=None, username=None,
+                      ircname=None, usar_tls=True, contexto_ssl=None, pedir_cap=False):
+        if usar_tls and contexto_ssl is None:
+            contexto_ssl = ssl.create_default_context()
+
+        self.server = server
+        self.port = port
+        self.nickname = nickname
+        self.real_nickname = nickname
+        self.real_server_name = ""
+        self.features = FeatureSet()
+        self._analisador = AnalisadorLinhas()
+
+        self.reader, self.writer = await asyncio.open_connection(
+            server, port,
+            ssl=contexto_ssl if usar_tls else None,
+            server_hostname=server if usar_tls else None,
+        )
+        self.connected = True
+
+        if pedir_cap:
+            # Antes do NICK: o servidor suspende o registo até ao CAP END (ver NegociacaoCAP)
+            self.send_raw("CAP LS 302")
+        if password:
+            self.pass_(password)
+        self.nick(nickname)
+        self.user(username or nickname, ircname or nickname)
+        return self
+
+    async def processar(self):
+        """Lê do socket até a ligação cair e despacha cada linha recebida."""
+        motivo = "Connection reset by peer"
+        try:
+            while True:
+                dados = await self.reader.read(TAMANHO_LEITURA)
+                if not dados:
+                    break
+                for linha in self._analisador.alimentar(dados):
+                    metrics.contar("irc_linhas_recebidas_total")
+                    self._processar_linha(linha)
+        except asyncio.CancelledError:
+            motivo = "Leitura cancelada"
+            raise
+        except (OSError, ssl.SSLError) as e:
+            motivo = str(e) or motivo
+        finally:
+            self.disconnect(motivo)
+
+    def disconnect(self, message=""):
+        if not self.connected:
+            return
+        self.connected = False
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        self._handle_event(Event("disconnect", self.server, "", [message]))
+
+    def is_connected(self):
+        return self.connected
+
+    def get_nickname(self):
+        return self.real_nickname
+
+    def get_server_name(self):
+        return self.real_server_name or ""
+
+    # ============================================================================ #
+    # ------------------ Conversão de linhas em eventos irc.client --------------- #
+    # ============================================================================ #
+
+    def _processar_linha(self, linha):
+        tags, prefixo, bruto, arguments = analisar_linha(linha)
+        if not bruto:
+            return
+
+        source = NickMask(prefixo) if prefixo else None
+        command = Command.lookup(bruto)
+
+        if source and not self.real_server_name:
+            self.real_server_name = source
+
+        if command == "ping":
+            # Responde logo ao PING, sem passar por filas
+            self.send_raw("PONG :" + (arguments[0] if arguments else ""))
+        elif command == "nick":
+            if source and source.nick == self.real_nickname:
+                self.real_nickname = arguments[0]
+        elif command == "welcome":
+            self.real_nickname = arguments[0]
+        elif command == "featurelist":
+            self.features.load(arguments)
+
+        if command in ("privmsg", "notice"):
+            self._handle_message(arguments, command, source, tags)
+        else:
+            self._handle_other(arguments, command, source, tags)
+
+    def _handle_message(self, arguments, command, source, tags):
+        if len(arguments) < 2:
+            return
+        target, msg = arguments[:2]
+        if command == "privmsg":
+            if is_channel(target):
+                command = "pubmsg"
+        else:
+            command = "pubnotice" if is_channel(target) else "privnotice"
+
+        for m in ctcp.dequote(msg):
+            if isinstance(m, tuple):
+                tipo = "ctcp" if command in ("privmsg", "pubmsg") else "ctcpreply"
+                self._handle_event(Event(tipo, source, target, list(m), tags))
+                if tipo == "ctcp" and m[0] == "ACTION":
+                    self._handle_event(Event("action", source, target, list(m[1:]), tags))
+            else:
+                self._handle_event(Event(command, source, target, [m], tags))
+
+    def _handle_other(self, arguments, command, source, tags):
+        target = None
+        if command == "quit":
+            arguments = arguments[:1]
+        elif command == "ping":
+            target = arguments[0] if arguments else None
+        else:
+            target = arguments[0] if arguments else None
+            arguments = arguments[1:]
+        if command == "mode" and not is_channel(target):
+            command = "umode"
+        self._handle_event(Event(command, source, target, arguments, tags))
+
+    # ============================================================================ #
+    # ------------------------------ Envio de comandos --------------------------- #
+    # ============================================================================ #
+
+    def send_raw(self, string):
+        if not self.connected:
+            raise ServerNotConnectedError("Not connected.")
+        if "\n" in string or "\r" in string:
+            raise InvalidCharacters("Carriage returns not allowed in privmsg(text)")
+        dados = string.encode("utf-8") + b"\r\n"
+        if len(dados) > 512:
+            raise MessageTooLong("Messages limited to 512 bytes including CR/LF")
+        # write() só coloca os bytes no buffer do transporte: nunca bloqueia
+        self.writer.write(dados)
+
+    def send_items(self, *items):
+        self.send_raw(" ".join(filter(None, items)))
+
+    def pass_(self, password):
+        self.send_items("PASS", password)
+
+    def nick(self, newnick):
+        self.send_items("NICK", newnick)
+
+    def user(self, username, realname):
+        self.send_items("USER", username, "0", "*", ":" + realname)
+
+    def privmsg(self, target, text):
+        self.send_items("PRIVMSG", target, ":" + text)
+
+    def notice(self, target, text):
+        self.send_items("NOTICE", target, ":" + text)
+
+    def join(self, channel, key=""):
+        self.send_items("JOIN", channel, key)
+
+    def part(self, channels, message=""):
+        if not isinstance(channels, str):
+            channels = ",".join(channels)
+        self.send_items("PART", channels, message and ":" + message)
+
+    def mode(self, target, command):
+        self.send_items("MODE", target, command)
+
+    def kick(self, channel, nick, comment=""):
+        self.send_items("KICK", channel, nick, comment and ":" + comment)
+
+    def invite(self, nick, channel):
+        self.send_items("INVITE", nick, channel)
+
+    def topic(self, channel, new_topic=None):
+        if new_topic is None:
+            self.send_items("TOPIC", channel)
+        else:
+            self.send_items("TOPIC", channel, ":" + new_topic)
+
+    def pong(self, target, target2=""):
+        self.send_items("PONG", target, target2)
+
+    def quit(self, message=""):
+        self.send_items("QUIT", message and ":" + message)
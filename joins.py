@@ -0,0 +1,173 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      joins.py                                                          #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Agregação das entradas nos canais. Reconhece os netsplits (QUIT   #
+#                "servidor.a servidor.b" e os BATCH netsplit/netjoin do IRCv3)     #
+#                para não saudar quem apenas volta de um split, junta as entradas  #
+#                reais de uma janela curta numa só saudação e num só alerta, e     #
+#                lembra-se de quem já foi saudado para não repetir a saudação a    #
+#                quem entra e sai em ciclo (o alerta sai em todas as entradas).    #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import re
+import time
+
+from irc.strings import lower
+
+from config import ENTRADAS_JANELA, NETSPLIT_MEMORIA, SAUDADOS_MEMORIA
+from logger import obter_logger
+
+logger = obter_logger("entradas")
+
+# Mensagem de QUIT de um netsplit: os dois servidores separados por um espaço
+# ("*.net *.split", "irc.a.org irc.b.org")
+_NETSPLIT = re.compile(r"^[\w*-]+(\.[\w*-]+)+ [\w*-]+(\.[\w*-]+)+$")
+
+# Máximo de nicks escritos numa saudação/alerta agrupado (o resto vai como "e mais N")
+MAX_NICKS = 8
+
+def juntar_nicks(nicks, maximo=MAX_NICKS):
+    # ["a", "b", "c"] → "a, b e c"; listas longas terminam em "e mais N"
+    if len(nicks) > maximo:
+        return ", ".join(nicks[:maximo]) + f" e mais {len(nicks) - maximo}"
+    if len(nicks) == 1:
+        return nicks[0]
+    return ", ".join(nicks[:-1]) + " e " + nicks[-1]
+
+class AgregadorEntradas:
+    """
+    Recebe as entradas de outros utilizadores (entrou) e, passada a janela de
+    ENTRADAS_JANELA segundos, chama 'alertar(canal, nicks)' uma vez por canal com
+    as entradas reais acumuladas e 'saudar(canal, nicks)' só com as que ainda não
+    foram saudadas há menos de SAUDADOS_MEMORIA segundos.
+    """
+
+    def __init__(self, saudar, alertar, janela=ENTRADAS_JANELA):
+        self.saudar = saudar
+        self.alertar = alertar
+        self.janela = janela
+        self._em_split = {}    # chave do nick → instante em que saiu num netsplit
+        self._batches = {}     # referência do BATCH → tipo ("netsplit", "netjoin", ...)
+        self._saudados = {}    # (chave do canal, chave do nick) → instante da saudação
+        self._pendentes = {}   # chave do canal → (nome do canal, [nicks a saudar], [nicks a alertar])
+        self._temporizadores = {}
+        self.regressos = 0     # Entradas silenciadas por serem regressos de um split
+        self.repetidos = 0     # Entradas sem saudação por já terem sido saudadas (o alerta sai)
+
+    def associar(self, connection):
+        for evento in ("quit", "batch", "disconnect"):
+            connection.add_global_handler(evento, getattr(self, f"_on_{evento}"), -10)
+
+    # ============================================================================ #
+    # --------------------------------- Netsplits -------------------------------- #
+    # ============================================================================ #
+
+    def _on_quit(self, connection, event):
+        motivo = event.arguments[0] if event.arguments else ""
+        if _NETSPLIT.match(motivo) or self._no_batch(event, "netsplit"):
+            self._em_split[lower(event.source.nick)] = time.monotonic()
+        else:
+            self._em_split.pop(lower(event.source.nick), None)
+
+    def _on_batch(self, connection, event):
+        # BATCH +ref tipo ... abre, BATCH -ref fecha
+        referencia = event.target or ""
+        if referencia.startswith("+") and event.arguments:
+            self._batches[referencia[1:]] = event.arguments[0].lower()
+        elif referencia.startswith("-"):
+            self._batches.pop(referencia[1:], None)
+
+    def _no_batch(self, event, tipo):
+        for tag in event.tags or ():
+            if tag["key"] == "batch":
+                return self._batches.get(tag["value"]) == tipo
+        return False
+
+    def _regresso(self, event):
+        # Volta de um split: o QUIT foi de netsplit ou o JOIN vem num BATCH netjoin
+        if self._no_batch(event, "netjoin"):
+            return True
+        chave = lower(event.source.nick)
+        saida = self._em_split.get(chave)
+        if saida is None:
+            return False
+        if time.monotonic() - saida > NETSPLIT_MEMORIA:
+            del self._em_split[chave]
+            return False
+        return True  # Fica na lista: o mesmo nick volta a vários canais
+
+    # ============================================================================ #
+    # ---------------------------------- Entradas -------------------------------- #
+    # ============================================================================ #
+
+    def entrou(self, event):
+        canal, nick = event.target, event.source.nick
+        if self._regresso(event):
+            self.regressos += 1
+            logger.debug("%s voltou a %s depois de um netsplit; sem saudação.", nick, canal)
+            return
+
+        chave_canal = lower(canal)
+        pendente = self._pendentes.get(chave_canal)
+        if pendente is None:
+            pendente = self._pendentes[chave_canal] = (canal, [], [])
+            self._temporizadores[chave_canal] = asyncio.get_running_loop().call_later(
+                self.janela, self._despachar, chave_canal)
+        pendente[2].append(nick)  # Uma entrada real tem sempre alerta
+
+        # A saudação é que não se repete a quem entra e sai em ciclo
+        agora = time.monotonic()
+        chave = (chave_canal, lower(nick))
+        if agora - self._saudados.get(chave, float("-inf")) < SAUDADOS_MEMORIA:
+            self.repetidos += 1
+            logger.debug("%s já foi saudado em %s há pouco.", nick, canal)
+            return
+        self._saudados[chave] = agora
+        pendente[1].append(nick)
+
+    def _despachar(self, chave_canal):
+        self._temporizadores.pop(chave_canal, None)
+        canal, a_saudar, a_alertar = self._pendentes.pop(chave_canal, (None, [], []))
+        if not a_alertar:
+            return
+        if len(a_alertar) > 1:
+            logger.info("%d entradas em %s agrupadas num só alerta.", len(a_alertar), canal)
+        # Uma falha na saudação não pode calar o alerta (nem o contrário)
+        try:
+            if a_saudar:
+                self.saudar(canal, a_saudar)
+        except Exception:
+            logger.exception("Erro ao saudar as entradas em %s.", canal)
+        try:
+            self.alertar(canal, a_alertar)
+        except Exception:
+            logger.exception("Erro ao alertar as entradas em %s.", canal)
+        self._limpar()
+
+    def _limpar(self):
+        # Esquece splits e saudações antigos (chamado a cada despacho, não por entrada)
+        agora = time.monotonic()
+        if len(self._saudados) > 1000:
+            for chave in [k for k, t in self._saudados.items() if agora - t > SAUDADOS_MEMORIA]:
+                del self._saudados[chave]
+        if len(self._em_split) > 1000:
+            for chave in [k for k, t in self._em_split.items() if agora - t > NETSPLIT_MEMORIA]:
+                del self._em_split[chave]
+
+    def _on_disconnect(self, connection, event):
+        # As entradas por saudar eram da ligação perdida; quem já foi saudado continua lembrado
+        for temporizador in self._temporizadores.values():
+            temporizador.cancel()
+        self._temporizadores.clear()
+        self._pendentes.clear()
+        self._batches.clear()
+
+    def estatisticas(self):
+        return {"em_split": len(self._em_split), "saudados": len(self._saudados),
+                "regressos": self.regressos, "repetidos": self.repetidos}
@@ -1,57 +1,134 @@
-# ================================================================================ #
-#                                                                                  #
-# Ficheiro:      logger.py                                                         #
-# Autor:         NunchuckCoder                                                     #
-# Versão:        1.0                                                               #
-# Data:          Julho 2025                                                        #
-# Descrição:     Configurações de logging para o bot IRC. Define o formato e o     #
-#                destino das mensagens de log (ficheiro e consola).                #
-# Licença:       MIT License                                                       #
-#                                                                                  #
-# ================================================================================ #
-
-import logging
-
-# Cria um logger com o nome "BotLogger"
-logger = logging.getLogger("BotLogger")
-
-# Define o nível mínimo de mensagens a registar (DEBUG = mostra tudo)
-logger.setLevel(logging.DEBUG)
-
-# ================================================================================ #
-# ------------------------------- LOG PARA FICHEIRO ------------------------------ #
-# ================================================================================ #
-
-# Cria um manipulador para escrever logs num ficheiro (bot.log)
-# encoding='utf-8' garante suporte a caracteres especiais
-file_handler = logging.FileHandler("bot.log", encoding='utf-8')
-
-# Define que este manipulador regista todas as mensagens a partir de DEBUG
-file_handler.setLevel(logging.DEBUG)
-
-# Define o formato das mensagens de log:
-# Exemplo → 2025-07-23 14:35:12 - INFO - Ligado ao servidor
-file_format = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-file_handler.setFormatter(file_format)
-
-# ================================================================================ #
-# ------------------------------- LOG PARA CONSOLA ------------------------------- #
-# ================================================================================ #
-
-# Cria um manipulador para mostrar logs diretamente na consola/terminal
-console_handler = logging.StreamHandler()
-
-# Este manipulador só mostra mensagens a partir de INFO (ignora DEBUG)
-console_handler.setLevel(logging.INFO)
-
-# Usa o mesmo formato definido acima
-console_handler.setFormatter(file_format)
-
-# ================================================================================ #
-# -------------------------------- ATIVAR LOGGING -------------------------------- #
-# ================================================================================ #
-
-# Adiciona os dois manipuladores (ficheiro + consola) ao logger principal
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
-
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      logger.py                                                         #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.1                                                               #
+# Data:          Julho 2025                                                        #
+# Descrição:     Configurações de logging para o bot IRC. Define o formato e o     #
+#                destino das mensagens de log (ficheiro e consola). A escrita é    #
+#                feita por uma thread de fundo (fila), com rotação comprimida do   #
+#                ficheiro e níveis configuráveis por módulo.                       #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+
+from config import LOG_FICHEIRO, LOG_NIVEL, LOG_ASSINCRONO, LOG_NIVEIS
+from config import LOG_ROTACAO, LOG_TAMANHO_MAX, LOG_BACKUPS, LOG_COMPRIMIR
+
+# Cria um logger com o nome "BotLogger"
+logger = logging.getLogger("BotLogger")
+
+# Define o nível mínimo de mensagens a registar (DEBUG = mostra tudo)
+logger.setLevel(LOG_NIVEL)
+
+# ================================================================================ #
+# ------------------------------- LOG PARA FICHEIRO ------------------------------ #
+# ================================================================================ #
+
+def _comprimir(origem, destino):
+    # Rotação com compressão: o ficheiro antigo passa a bot.log.1.gz, bot.log.2.gz, ...
+    with open(origem, "rb") as entrada, gzip.open(destino, "wb") as saida:
+        shutil.copyfileobj(entrada, saida)
+    os.remove(origem)
+
+def _manipulador_ficheiro():
+    # Cria o manipulador do ficheiro de log conforme LOG_ROTACAO:
+    #   "tamanho" → roda ao chegar a LOG_TAMANHO_MAX MB
+    #   "diaria"  → roda à meia-noite
+    #   ""        → ficheiro único, sem rotação
+    # encoding='utf-8' garante suporte a caracteres especiais
+    if LOG_ROTACAO == "tamanho":
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FICHEIRO, maxBytes=int(LOG_TAMANHO_MAX * 1024 * 1024),
+            backupCount=LOG_BACKUPS, encoding='utf-8')
+    elif LOG_ROTACAO == "diaria":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FICHEIRO, when="midnight", backupCount=LOG_BACKUPS, encoding='utf-8')
+    else:
+        return logging.FileHandler(LOG_FICHEIRO, encoding='utf-8')
+
+    if LOG_COMPRIMIR:
+        handler.namer = lambda nome: nome + ".gz"
+        handler.rotator = _comprimir
+    return handler
+
+file_handler = _manipulador_ficheiro()
+
+# Define que este manipulador regista todas as mensagens a partir de DEBUG
+file_handler.setLevel(logging.DEBUG)
+
+# Define o formato das mensagens de log:
+# Exemplo → 2025-07-23 14:35:12 - INFO - Ligado ao servidor
+file_format = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+file_handler.setFormatter(file_format)
+
+# ================================================================================ #
+# ------------------------------- LOG PARA CONSOLA ------------------------------- #
+# ================================================================================ #
+
+# Cria um manipulador para mostrar logs diretamente na consola/terminal
+console_handler = logging.StreamHandler()
+
+# Este manipulador só mostra mensagens a partir de INFO (ignora DEBUG)
+console_handler.setLevel(logging.INFO)
+
+# Usa o mesmo formato definido acima
+console_handler.setFormatter(file_format)
+
+# ================================================================================ #
+# -------------------------------- ATIVAR LOGGING -------------------------------- #
+# ================================================================================ #
+
+class _ManipuladorFila(logging.handlers.QueueHandler):
+    # A fila fica no mesmo processo: o registo segue tal como está e a formatação
+    # da mensagem (%s) também passa para a thread de escrita.
+    def prepare(self, record):
+        return record
+
+if LOG_ASSINCRONO:
+    # Quem regista só põe o registo numa fila; uma thread de fundo escreve no
+    # ficheiro e na consola (incluindo a rotação e a compressão), fora do event loop.
+    _fila_log = queue.SimpleQueue()
+    logger.addHandler(_ManipuladorFila(_fila_log))
+    _ouvinte = logging.handlers.QueueListener(
+        _fila_log, file_handler, console_handler, respect_handler_level=True)
+    _ouvinte.start()
+    atexit.register(_ouvinte.stop)  # Escreve o que ficou na fila antes de sair
+else:
+    # Adiciona os dois manipuladores (ficheiro + consola) ao logger principal
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
+
+# ================================================================================ #
+# ----------------------------- NÍVEIS POR MÓDULO -------------------------------- #
+# ================================================================================ #
+
+# Os módulos usam loggers filhos (BotLogger.mensagens, BotLogger.crypto, ...) que
+# herdam o nível do principal, a não ser que LOG_NIVEIS defina outro, ex.:
+# LOG_NIVEIS=mensagens=WARNING desliga o registo de cada linha dos canais.
+for _modulo, _nivel in LOG_NIVEIS.items():
+    logger.getChild(_modulo).setLevel(_nivel)
+
+def obter_logger(modulo):
+    return logger.getChild(modulo)
+
+# ================================================================================ #
+# ------------------------------ LOG POR REDE IRC -------------------------------- #
+# ================================================================================ #
+
+class _AdaptadorRede(logging.LoggerAdapter):
+    # Acrescenta o nome da rede no início de cada mensagem: "[ptnet] Ligado..."
+    # (os argumentos de formatação %s continuam a ser aplicados só se o nível passar)
+    def process(self, msg, kwargs):
+        return f"[{self.extra['rede']}] {msg}", kwargs
+
+def logger_rede(nome, modulo=None):
+    return _AdaptadorRede(obter_logger(modulo) if modulo else logger, {"rede": nome})
@@ -0,0 +1,223 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      metrics.py                                                        #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Métricas internas do bot: histogramas de latência (handlers,      #
+#                comandos, fila de saída, gravação do seen, Telegram, Binance),    #
+#                contadores (linhas recebidas/enviadas, limites excedidos) e o     #
+#                atraso do event loop. Exporta em texto no formato Prometheus      #
+#                num endpoint HTTP local e alimenta o comando !stats.              #
+#                Com METRICAS=false as funções não fazem nada e os decoradores     #
+#                devolvem a função original, sem custo nos handlers.               #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import bisect
+import functools
+import inspect
+import time
+
+from logger import logger
+from config import METRICAS, METRICAS_HOST, METRICAS_PORTA
+
+ATIVAS = METRICAS
+
+# Limites superiores (segundos) das classes dos histogramas
+LIMITES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histograma:
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES) + 1)  # A última classe é +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(LIMITES, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q):
+        # Estimativa: limite superior da classe onde cai o quantil q (0–1).
+        if not self.total:
+            return 0.0
+        alvo = q * self.total
+        acumulado = 0
+        for i, n in enumerate(self.contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                return LIMITES[min(i, len(LIMITES) - 1)]
+        return LIMITES[-1]
+
+# (nome, etiquetas) → Histograma / valor do contador
+_histogramas = {}
+_contadores = {}
+
+# nome → função que devolve [(métrica, etiquetas, valor), ...] no momento da leitura.
+# Serve para valores que os módulos já contam (ex.: hits da cache do crypto).
+_coletores = {}
+
+def _chave(nome, etiquetas):
+    return nome, tuple(sorted(etiquetas.items()))
+
+# ================================================================================ #
+# ------------------------------- REGISTO DE VALORES ----------------------------- #
+# ================================================================================ #
+
+def observar(nome, valor, **etiquetas):
+    chave = _chave(nome, etiquetas)
+    hist = _histogramas.get(chave)
+    if hist is None:
+        hist = _histogramas[chave] = Histograma()
+    hist.observar(valor)
+
+def contar(nome, n=1, **etiquetas):
+    chave = _chave(nome, etiquetas)
+    _contadores[chave] = _contadores.get(chave, 0) + n
+
+def cronometrar(nome, **etiquetas):
+    """
+    Decorador que regista a duração de cada chamada (função normal ou async)
+    no histograma 'nome'. Com as métricas desligadas devolve a própria função.
+    """
+    def decorador(funcao):
+        if not ATIVAS:
+            return funcao
+        chave = _chave(nome, etiquetas)
+
+        def registar(inicio):
+            hist = _histogramas.get(chave)
+            if hist is None:
+                hist = _histogramas[chave] = Histograma()
+            hist.observar(time.perf_counter() - inicio)
+
+        if inspect.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def envolvida(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return await funcao(*args, **kwargs)
+                finally:
+                    registar(inicio)
+        else:
+            @functools.wraps(funcao)
+            def envolvida(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return funcao(*args, **kwargs)
+                finally:
+                    registar(inicio)
+        return envolvida
+    return decorador
+
+def registar_coletor(nome, funcao):
+    # Um coletor com o mesmo nome substitui o anterior (ex.: depois de um !reload).
+    _coletores[nome] = funcao
+
+def histograma(nome, **etiquetas):
+    return _histogramas.get(_chave(nome, etiquetas))
+
+def contador(nome, **etiquetas):
+    return _contadores.get(_chave(nome, etiquetas), 0)
+
+def contadores(nome):
+    # Todos os contadores de uma métrica: [(etiquetas, valor), ...]
+    return [(dict(etq), v) for (n, etq), v in _contadores.items() if n == nome]
+
+def histogramas(nome):
+    # Todos os histogramas de uma métrica: [(etiquetas, Histograma), ...]
+    return [(dict(etq), h) for (n, etq), h in _histogramas.items() if n == nome]
+
+if not ATIVAS:
+    # Desligadas: as chamadas espalhadas pelo código não guardam nada
+    def observar(nome, valor, **etiquetas):
+        pass
+
+    def contar(nome, n=1, **etiquetas):
+        pass
+
+# ================================================================================ #
+# ------------------------------ ATRASO DO EVENT LOOP ---------------------------- #
+# ================================================================================ #
+
+async def medir_atraso_loop(intervalo=0.5):
+    # Tarefa de fundo: quanto mais tarde que o pedido acorda um sleep(intervalo).
+    loop = asyncio.get_running_loop()
+    while True:
+        inicio = loop.time()
+        await asyncio.sleep(intervalo)
+        observar("loop_atraso_segundos", max(0.0, loop.time() - inicio - intervalo))
+
+# ================================================================================ #
+# ------------------------------ EXPORTAÇÃO PROMETHEUS --------------------------- #
+# ================================================================================ #
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas(etiquetas, extra=None):
+    pares = list(etiquetas) + ([extra] if extra else [])
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+def texto_prometheus():
+    linhas = []
+    tipos = set()
+
+    for (nome, etq), valor in sorted(_contadores.items()):
+        if nome not in tipos:
+            linhas.append(f"# TYPE {nome} counter")
+            tipos.add(nome)
+        linhas.append(f"{nome}{_etiquetas(etq)} {valor}")
+
+    for (nome, etq), hist in sorted(_histogramas.items()):
+        if nome not in tipos:
+            linhas.append(f"# TYPE {nome} histogram")
+            tipos.add(nome)
+        acumulado = 0
+        for limite, n in zip(LIMITES + ("+Inf",), hist.contagens):
+            acumulado += n
+            linhas.append(f"{nome}_bucket{_etiquetas(etq, ('le', limite))} {acumulado}")
+        linhas.append(f"{nome}_sum{_etiquetas(etq)} {hist.soma}")
+        linhas.append(f"{nome}_count{_etiquetas(etq)} {hist.total}")
+
+    for nome_coletor, funcao in list(_coletores.items()):
+        try:
+            for nome, etiquetas, valor in funcao():
+                if nome not in tipos:
+                    linhas.append(f"# TYPE {nome} gauge")
+                    tipos.add(nome)
+                linhas.append(f"{nome}{_etiquetas(sorted(etiquetas.items()))} {valor}")
+        except Exception:
+            logger.exception(f"Erro no coletor de métricas {nome_coletor}.")
+
+    return "\n".join(linhas) + "\n"
+
+async def _responder(reader, writer):
+    # HTTP mínimo: qualquer GET recebe o texto das métricas.
+    try:
+        await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        corpo = texto_prometheus().encode()
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                     + f"Content-Length: {len(corpo)}\r\nConnection: close\r\n\r\n".encode()
+                     + corpo)
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError):
+        pass
+    finally:
+        writer.close()
+
+async def servir(host=METRICAS_HOST, porta=METRICAS_PORTA):
+    # Arranca o endpoint das métricas (só quando ativas e com porta definida).
+    if not ATIVAS or not porta:
+        return None
+    servidor = await asyncio.start_server(_responder, host, porta)
+    logger.info(f"Métricas disponíveis em http://{host}:{porta}/metrics")
+    return servidor
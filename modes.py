@@ -0,0 +1,102 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      modes.py                                                          #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Empilhamento de MODE, KICK e JOIN segundo os limites anunciados   #
+#                pelo servidor no ISUPPORT (005): MODES (modos com parâmetro por   #
+#                linha), TARGMAX (alvos por comando) e o tamanho máximo da linha.  #
+#                Dez bans passam a ser quatro linhas "MODE #c +bbb ..." em vez de  #
+#                dez, e os kicks seguem numa só linha quando o servidor aceita.    #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+# Sem MODES no 005 o RFC 1459 garante 3 modos com parâmetro por linha
+MODOS_POR_DEFEITO = 3
+# Teto quando o servidor diz "sem limite" (MODES sem valor / TARGMAX vazio)
+MODOS_MAXIMO = 20
+
+# 512 bytes com CRLF, menos o prefixo ":nick!user@host " que o servidor acrescenta
+# ao reencaminhar a linha para o canal
+TAMANHO_LINHA = 400
+
+def limite_modos(features):
+    # Quantos modos com parâmetro cabem numa linha MODE.
+    valor = getattr(features, "modes", None)
+    if valor is True:
+        return MODOS_MAXIMO
+    if isinstance(valor, int) and valor > 0:
+        return min(valor, MODOS_MAXIMO)
+    return MODOS_POR_DEFEITO
+
+def limite_alvos(features, comando):
+    """
+    Alvos por linha para 'comando' segundo o TARGMAX (ex.: KICK:4). Um comando
+    que não aparece no TARGMAX aceita um só alvo; "KICK:" quer dizer sem limite.
+    """
+    targmax = getattr(features, "targmax", None)
+    if not isinstance(targmax, dict) or comando.upper() not in targmax:
+        return 1
+    valor = targmax[comando.upper()]
+    return MODOS_MAXIMO if valor is None else max(1, valor)
+
+def empilhar_modos(canal, alteracoes, max_modos=MODOS_POR_DEFEITO, tamanho=TAMANHO_LINHA):
+    """
+    'alteracoes' é uma lista de (sinal, modo, parâmetro), ex.: ("+", "b", "*!*@host").
+    Devolve as linhas MODE, cada uma com até 'max_modos' modos e sem passar de
+    'tamanho' bytes. A ordem das alterações é mantida.
+    """
+    linhas = []
+    letras, parametros, sinal_atual, ocupado = "", [], None, 0
+    base = len(f"MODE {canal} ".encode())
+
+    for sinal, modo, parametro in alteracoes:
+        extra = len(modo) + (len(sinal) if sinal != sinal_atual else 0) + len(parametro.encode()) + 1
+        if parametros and (len(parametros) >= max_modos or base + ocupado + extra > tamanho):
+            linhas.append(f"MODE {canal} {letras} {' '.join(parametros)}")
+            letras, parametros, sinal_atual, ocupado = "", [], None, 0
+            extra = len(modo) + len(sinal) + len(parametro.encode()) + 1
+        if sinal != sinal_atual:
+            letras += sinal
+            sinal_atual = sinal
+        letras += modo
+        parametros.append(parametro)
+        ocupado += extra
+
+    if parametros:
+        linhas.append(f"MODE {canal} {letras} {' '.join(parametros)}")
+    return linhas
+
+def empilhar_kicks(canal, nicks, motivo="", max_alvos=1, tamanho=TAMANHO_LINHA):
+    # KICK #canal a,b,c :motivo — até 'max_alvos' nicks por linha.
+    sufixo = f" :{motivo}" if motivo else ""
+    base = len(f"KICK {canal} {sufixo}".encode())
+    linhas, grupo, ocupado = [], [], 0
+    for nick in nicks:
+        extra = len(nick.encode()) + (1 if grupo else 0)
+        if grupo and (len(grupo) >= max_alvos or base + ocupado + extra > tamanho):
+            linhas.append(f"KICK {canal} {','.join(grupo)}{sufixo}")
+            grupo, ocupado = [], 0
+            extra = len(nick.encode())
+        grupo.append(nick)
+        ocupado += extra
+    if grupo:
+        linhas.append(f"KICK {canal} {','.join(grupo)}{sufixo}")
+    return linhas
+
+def empilhar_joins(canais, tamanho=TAMANHO_LINHA):
+    # JOIN #a,#b,#c — todos os canais em tão poucas linhas quanto o tamanho permite.
+    linhas, grupo, ocupado = [], [], len("JOIN ")
+    for canal in canais:
+        extra = len(canal.encode()) + (1 if grupo else 0)
+        if grupo and ocupado + extra > tamanho:
+            linhas.append("JOIN " + ",".join(grupo))
+            grupo, ocupado = [], len("JOIN ")
+            extra = len(canal.encode())
+        grupo.append(canal)
+        ocupado += extra
+    if grupo:
+        linhas.append("JOIN " + ",".join(grupo))
+    return linhas
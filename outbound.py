@@ -0,0 +1,170 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      outbound.py                                                       #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Escalonador de saída IRC com controlo de flood. Todas as linhas   #
+#                enviadas pelo bot passam por um token bucket ajustado aos         #
+#                limites do servidor, com faixas de prioridade (moderação antes    #
+#                de respostas, respostas antes de texto de ajuda) e rotação        #
+#                justa entre destinos dentro de cada faixa.                        #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import collections
+import time
+
+import metrics
+from logger import obter_logger
+from config import FLOOD_RAJADA, FLOOD_TAXA
+
+logger = obter_logger("saida")
+
+# Faixas de prioridade (número menor sai primeiro)
+PRIORIDADE_ALTA = 0    # MODE, KICK, INVITE, TOPIC, JOIN, identificação
+PRIORIDADE_NORMAL = 1  # Respostas a comandos
+PRIORIDADE_BAIXA = 2   # Texto longo ou dispensável (ajuda, boas-vindas)
+
+# Uma linha IRC tem no máximo 512 bytes com o CRLF (send_raw recusa mais que isso)
+LINHA_MAX_BYTES = 512
+
+def espaco_privmsg(alvo, prefixo=""):
+    # Bytes que sobram para o texto em "PRIVMSG <alvo> :<prefixo><texto>\r\n"
+    return LINHA_MAX_BYTES - len(f"PRIVMSG {alvo} :{prefixo}\r\n".encode("utf-8"))
+
+def partir_bytes(texto, limite):
+    """
+    Parte o texto em pedaços de no máximo 'limite' bytes em UTF-8, de
+    preferência num espaço e nunca a meio de um carácter.
+    """
+    pedacos, limite = [], max(limite, 4)  # Pelo menos um carácter por pedaço
+    while len(texto.encode("utf-8")) > limite:
+        corte = texto.encode("utf-8")[:limite].decode("utf-8", "ignore")
+        espaco = corte.rfind(" ")
+        if espaco > len(corte) // 2:
+            corte = corte[:espaco]
+        pedacos.append(corte.rstrip())
+        texto = texto[len(corte):].lstrip()
+    if texto:
+        pedacos.append(texto)
+    return pedacos
+
+def cortar_bytes(texto, limite):
+    # Corta o texto para caber em 'limite' bytes em UTF-8, com "…" no fim se cortou
+    if len(texto.encode("utf-8")) <= limite:
+        return texto
+    return texto.encode("utf-8")[:limite - 3].decode("utf-8", "ignore") + "…"
+
+class EscalonadorSaida:
+    """
+    Fila de saída com token bucket. 'enviar' é a função que escreve uma linha
+    crua no servidor (ex.: connection.send_raw).
+    """
+
+    def __init__(self, enviar, rajada=FLOOD_RAJADA, taxa=FLOOD_TAXA):
+        self._enviar = enviar
+        self.rajada = rajada
+        self.taxa = taxa
+        self._tokens = float(rajada)
+        self._atualizado = time.monotonic()
+
+        # Uma faixa por prioridade: destino → fila de (instante, linha).
+        # A ordem do OrderedDict é a vez de cada destino (round-robin).
+        self._faixas = [collections.OrderedDict() for _ in range(PRIORIDADE_BAIXA + 1)]
+        self._pendentes = 0
+        self._ha_trabalho = asyncio.Event()
+
+        # Estatísticas
+        self.enviadas = 0
+        self.atraso_total = 0.0
+        self.atraso_max = 0.0
+
+    # ============================================================================ #
+    # ------------------------------ Entrada na fila ----------------------------- #
+    # ============================================================================ #
+
+    def agendar(self, alvo, linha, prioridade=PRIORIDADE_NORMAL):
+        faixa = self._faixas[prioridade]
+        fila = faixa.get(alvo)
+        if fila is None:
+            fila = faixa[alvo] = collections.deque()
+        fila.append((time.monotonic(), linha))
+        self._pendentes += 1
+        self._ha_trabalho.set()
+
+    def limpar(self):
+        # Descarta tudo o que estava pendente (ex.: ligação perdida).
+        for faixa in self._faixas:
+            faixa.clear()
+        self._pendentes = 0
+        self._ha_trabalho.clear()
+
+    def _proxima(self):
+        # Primeiro destino da faixa mais prioritária; depois passa para o fim da vez.
+        for faixa in self._faixas:
+            if faixa:
+                alvo, fila = next(iter(faixa.items()))
+                item = fila.popleft()
+                if fila:
+                    faixa.move_to_end(alvo)
+                else:
+                    del faixa[alvo]
+                self._pendentes -= 1
+                return item
+        return None
+
+    # ============================================================================ #
+    # ------------------------------- Token bucket ------------------------------- #
+    # ============================================================================ #
+
+    async def _esperar_token(self):
+        while True:
+            agora = time.monotonic()
+            self._tokens = min(self.rajada, self._tokens + (agora - self._atualizado) * self.taxa)
+            self._atualizado = agora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.taxa)
+
+    # ============================================================================ #
+    # ------------------------- Tarefa de envio em fundo ------------------------- #
+    # ============================================================================ #
+
+    async def processar(self):
+        while True:
+            await self._ha_trabalho.wait()
+            # O token é obtido antes de escolher a linha: se entretanto chegar
+            # algo mais prioritário, é isso que sai.
+            await self._esperar_token()
+            item = self._proxima()
+            if item is None:
+                self._ha_trabalho.clear()
+                self._tokens = min(self.rajada, self._tokens + 1)  # Token não usado
+                continue
+
+            instante, linha = item
+            atraso = time.monotonic() - instante
+            try:
+                self._enviar(linha)
+            except Exception as e:
+                logger.error(f"Erro ao enviar linha para o servidor: {e}")
+                continue
+
+            self.enviadas += 1
+            metrics.contar("irc_linhas_enviadas_total")
+            metrics.observar("irc_saida_atraso_segundos", atraso)
+            self.atraso_total += atraso
+            self.atraso_max = max(self.atraso_max, atraso)
+
+    def estatisticas(self):
+        return {
+            "pendentes": self._pendentes,
+            "por_faixa": [sum(len(f) for f in faixa.values()) for faixa in self._faixas],
+            "enviadas": self.enviadas,
+            "atraso_medio": self.atraso_total / self.enviadas if self.enviadas else 0.0,
+            "atraso_max": self.atraso_max,
+        }
@@ -1,26 +1,48 @@
-# ================================================================================ #
-#                                                                                  #
-# Ficheiro:      admin.py                                                          #
-# Autor:         NunchuckCoder                                                     #
-# Versão:        1.0                                                               #
-# Data:          Julho 2025                                                        #
-# Descrição:     Gestão de administradores do bot IRC. Fornece funções para        #
-#                verificar se um determinado nick possui permissões de admin,      #
-#                com base na lista definida em config.py.                          #
-# Licença:       MIT License                                                       #
-#                                                                                  #
-# ================================================================================ #
-
-from config import ADMINS  # Importa a lista de administradores definida no config.py
-
-# Cria um conjunto com todos os nicks de administradores em minúsculas
-# Isto permite que a verificação seja insensível a maiúsculas/minúsculas
-# e torna a pesquisa mais rápida do que percorrer uma lista.
-ADMINS_LOWER = {admin.lower() for admin in ADMINS}
-
-# Função que verifica se um nick é administrador
-# Recebe como argumento o nick (string) e retorna True se estiver na lista,
-# caso contrário retorna False.
-# Exemplo: is_admin("nickname") → True
-def is_admin(nick: str) -> bool:
-    return nick.lower() in ADMINS_LOWER
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      admin.py                                                          #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.1                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Gestão de administradores do bot IRC. Fornece funções para        #
+#                verificar se um determinado nick possui permissões de admin,      #
+#                com base na lista definida em config.py. Com ADMINS_POR_CONTA o   #
+#                nick tem de estar identificado na conta com o mesmo nome (ver     #
+#                accounts.py), para que ninguém ganhe poderes só por usar o nick.  #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+from config import ADMINS, ADMINS_POR_CONTA  # Lista de administradores e modo de verificação
+
+# Cria um conjunto com todos os nicks de administradores em minúsculas
+# Isto permite que a verificação seja insensível a maiúsculas/minúsculas
+# e torna a pesquisa mais rápida do que percorrer uma lista.
+ADMINS_LOWER = {admin.lower() for admin in ADMINS}
+
+# Função que verifica se um nick é administrador
+# Recebe como argumento o nick (string) e retorna True se estiver na lista,
+# caso contrário retorna False.
+# Exemplo: is_admin("nickname") → True
+# Com 'contas' (TabelaContas) e ADMINS_POR_CONTA, só consulta a cache: um nick
+# cuja conta ainda não é conhecida não é admin (usar verificar_admin).
+def is_admin(nick: str, contas=None) -> bool:
+    if contas is None or not ADMINS_POR_CONTA:
+        return nick.lower() in ADMINS_LOWER
+    conhecida, conta = contas.conta(nick)
+    return conhecida and _mesma_conta(nick, conta)
+
+# O nick tem de ser de um admin e estar identificado na conta com esse nome
+def _mesma_conta(nick: str, conta) -> bool:
+    return conta is not None and conta.lower() == nick.lower() and nick.lower() in ADMINS_LOWER
+
+# Verificação completa para os comandos de admin: usa a cache de contas e, se o
+# nick ainda não for conhecido, pergunta ao NickServ (uma vez, fica em cache).
+async def verificar_admin(bot, nick: str) -> bool:
+    contas = getattr(bot, "contas", None)
+    if contas is None or not ADMINS_POR_CONTA:
+        return is_admin(nick)
+    if nick.lower() not in ADMINS_LOWER:
+        return False  # Nick fora da lista: nem vale a pena perguntar
+    conta = await contas.verificar(nick)
+    return _mesma_conta(nick, conta)
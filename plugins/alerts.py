@@ -0,0 +1,369 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      alerts.py                                                         #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Alertas de preço das criptomoedas (!alert btc > 60000). Os        #
+#                alertas de cada par ficam em listas ordenadas pelo limite, uma    #
+#                por sentido: a cada preço novo, bisect encontra de uma vez os     #
+#                alertas ultrapassados, sem percorrer os outros. Os preços de      #
+#                todos os pares com alertas vêm num só pedido à Binance por        #
+#                intervalo. Os alertas ficam em SQLite e o aviso sai no canal e    #
+#                no Telegram.                                                      #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import atexit
+import bisect
+import html
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+
+import aiohttp
+from irc.strings import lower
+
+import metrics
+from logger import obter_logger
+from config import ALERTAS_INTERVALO, ALERTAS_MAX_NICK, ALERTAS_MAX, ALERTAS_DB
+from plugins import crypto, telegram
+from plugins.registry import comando
+
+logger = obter_logger("alertas")
+
+# Caminho para a base de dados SQLite
+DB_PATH = ALERTAS_DB
+
+# Nicks mostrados num aviso antes de "e mais N"
+MAX_NICKS_AVISO = 10
+
+@dataclass(frozen=True)
+class Alerta:
+    id: int
+    rede: str
+    canal: str       # Onde foi criado e para onde vai o aviso (canal, ou nick em privado)
+    nick: str
+    base: str        # Moeda, ex.: "BTC"
+    cotacao: str     # "EUR" ou "USDT"
+    operador: str    # ">" (sobe acima do limite) ou "<" (desce abaixo)
+    limite: float
+
+    @property
+    def par(self):
+        return (self.base, self.cotacao)
+
+# O estado lê-se de globals() para sobreviver a um !reload do plugin.
+# id → Alerta
+_alertas = globals().get("_alertas", {})
+
+# Par → (limites ordenados, ids pela mesma ordem), um dict por sentido. Um preço p
+# dispara em _acima os limites < p (o início da lista) e em _abaixo os > p (o fim).
+_acima = globals().get("_acima", {})
+_abaixo = globals().get("_abaixo", {})
+
+# (rede, nick em minúsculas) → ids dos alertas desse nick
+_por_nick = globals().get("_por_nick", {})
+
+_bots = globals().get("_bots", {})  # rede → bot, para os avisos (preenchido por vigiar)
+_conn = globals().get("_conn", None)
+_por_apagar = globals().get("_por_apagar", [])  # Alertas já avisados que a base de dados não apagou
+disparados = globals().get("disparados", 0)  # Alertas disparados desde o arranque
+
+metrics.registar_coletor("alertas", lambda: [
+    ("alertas_ativos", {}, len(_alertas)),
+    ("alertas_pares", {}, len(_acima.keys() | _abaixo.keys())),
+    ("alertas_disparados", {}, disparados)])
+
+def _ligacao():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+        _conn = sqlite3.connect(DB_PATH)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS alertas (
+                id INTEGER PRIMARY KEY,
+                rede TEXT NOT NULL,
+                canal TEXT NOT NULL,
+                nick TEXT NOT NULL,
+                base TEXT NOT NULL,
+                cotacao TEXT NOT NULL,
+                operador TEXT NOT NULL,
+                limite REAL NOT NULL,
+                criado REAL NOT NULL
+            )
+        """)
+        _conn.commit()
+    return _conn
+
+def fechar():
+    # Fecha a ligação (usado no encerramento do bot), depois de apagar os alertas já avisados.
+    global _conn
+    if _conn is not None:
+        _apagar_pendentes()
+        _conn.close()
+        _conn = None
+
+if not globals().get("_atexit_registado"):
+    atexit.register(fechar)
+    _atexit_registado = True
+
+# ================================================================================ #
+# ------------------------------ ÍNDICE ORDENADO --------------------------------- #
+# ================================================================================ #
+
+def _indexar(alerta):
+    lado = _acima if alerta.operador == ">" else _abaixo
+    limites, ids = lado.setdefault(alerta.par, ([], []))
+    i = bisect.bisect_right(limites, alerta.limite)
+    limites.insert(i, alerta.limite)
+    ids.insert(i, alerta.id)
+    _alertas[alerta.id] = alerta
+    _por_nick.setdefault((alerta.rede, lower(alerta.nick)), set()).add(alerta.id)
+
+def _desindexar(alerta):
+    lado = _acima if alerta.operador == ">" else _abaixo
+    limites, ids = lado[alerta.par]
+    i = bisect.bisect_left(limites, alerta.limite)
+    while ids[i] != alerta.id:  # Limites iguais: procura o id entre eles
+        i += 1
+    del limites[i], ids[i]
+    if not limites:
+        del lado[alerta.par]
+    _esquecer(alerta)
+
+def _esquecer(alerta):
+    del _alertas[alerta.id]
+    chave = (alerta.rede, lower(alerta.nick))
+    _por_nick[chave].discard(alerta.id)
+    if not _por_nick[chave]:
+        del _por_nick[chave]
+
+def avaliar(par, preco):
+    """
+    Tira do índice e devolve os alertas do par que o preço ultrapassou. Custa
+    duas pesquisas binárias mais os alertas disparados, seja qual for o número
+    de alertas do par.
+    """
+    ids_disparados = []
+    acima = _acima.get(par)
+    if acima is not None:
+        limites, ids = acima
+        n = bisect.bisect_left(limites, preco)  # Limites < preço
+        if n:
+            ids_disparados += ids[:n]
+            del limites[:n], ids[:n]
+            if not limites:
+                del _acima[par]
+    abaixo = _abaixo.get(par)
+    if abaixo is not None:
+        limites, ids = abaixo
+        n = bisect.bisect_right(limites, preco)  # Limites > preço a partir daqui
+        if n < len(limites):
+            ids_disparados += ids[n:]
+            del limites[n:], ids[n:]
+            if not limites:
+                del _abaixo[par]
+    resultado = [_alertas[i] for i in ids_disparados]
+    for alerta in resultado:
+        _esquecer(alerta)
+    return resultado
+
+def pares():
+    # Pares com pelo menos um alerta (os únicos a consultar na Binance)
+    return _acima.keys() | _abaixo.keys()
+
+# ================================================================================ #
+# --------------------------------- PERSISTÊNCIA --------------------------------- #
+# ================================================================================ #
+
+def carregar():
+    # Volta a montar o índice a partir da base de dados (arranque).
+    _alertas.clear()
+    _acima.clear()
+    _abaixo.clear()
+    _por_nick.clear()
+    linhas = _ligacao().execute(
+        "SELECT id, rede, canal, nick, base, cotacao, operador, limite FROM alertas ORDER BY limite")
+    for linha in linhas:
+        _indexar(Alerta(*linha))
+    if _alertas:
+        logger.info(f"{len(_alertas)} alertas de preço carregados ({len(pares())} pares).")
+
+def adicionar(rede, canal, nick, base, cotacao, operador, limite):
+    conn = _ligacao()
+    cursor = conn.execute(
+        "INSERT INTO alertas (rede, canal, nick, base, cotacao, operador, limite, criado) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (rede, canal, nick, base, cotacao, operador, limite, time.time()))
+    conn.commit()
+    alerta = Alerta(cursor.lastrowid, rede, canal, nick, base, cotacao, operador, limite)
+    _indexar(alerta)
+    return alerta
+
+def _apagar(alertas):
+    conn = _ligacao()
+    conn.executemany("DELETE FROM alertas WHERE id = ?", [(alerta.id,) for alerta in alertas])
+    conn.commit()
+
+def remover(alertas):
+    for alerta in alertas:
+        _desindexar(alerta)
+    _apagar(alertas)
+
+def do_nick(rede, nick):
+    return sorted((_alertas[i] for i in _por_nick.get((rede, lower(nick)), ())), key=lambda a: a.id)
+
+# ================================================================================ #
+# ----------------------------- CONSULTA E AVISOS -------------------------------- #
+# ================================================================================ #
+
+async def vigiar(bots, intervalo=ALERTAS_INTERVALO):
+    # Tarefa de fundo: a cada intervalo, um pedido com os preços de todos os pares com alertas.
+    _bots.clear()
+    _bots.update((bot.rede.nome, bot) for bot in bots)
+    carregar()
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await verificar()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"Falha ao consultar os preços dos alertas: {e}")
+        except Exception:
+            logger.exception("Erro ao verificar os alertas de preço.")
+
+async def verificar():
+    global disparados
+    _apagar_pendentes()
+    if not _alertas:
+        return
+    precos = await crypto.precos(pares())
+
+    inicio = time.perf_counter()
+    lista = []
+    for par, preco in precos.items():
+        lista += avaliar(par, preco)
+    metrics.observar("alertas_avaliacao_segundos", time.perf_counter() - inicio)
+    if not lista:
+        return
+
+    disparados += len(lista)
+    metrics.contar("alertas_disparados_total", len(lista))
+    # Primeiro o aviso: já saíram do índice, e uma falha no SQLite não os pode calar
+    _avisar(lista, precos)
+    _por_apagar.extend(lista)
+    _apagar_pendentes()
+
+def _apagar_pendentes():
+    # Apaga os alertas avisados; se a base de dados falhar, tenta na próxima verificação.
+    if not _por_apagar:
+        return
+    try:
+        _apagar(_por_apagar)
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao apagar {len(_por_apagar)} alertas disparados (nova tentativa depois): {e}")
+        return
+    _por_apagar.clear()
+
+def _avisar(lista, precos):
+    # Um aviso por canal e par, com todos os nicks cujo alerta disparou.
+    grupos = {}
+    for alerta in lista:
+        grupos.setdefault((alerta.rede, alerta.canal, alerta.par), []).append(alerta)
+
+    for (rede, canal, par), alertas in grupos.items():
+        nicks = [f"{a.nick} ({a.operador} {_numero(a.limite)})" for a in alertas[:MAX_NICKS_AVISO]]
+        if len(alertas) > MAX_NICKS_AVISO:
+            nicks.append(f"e mais {len(alertas) - MAX_NICKS_AVISO}")
+        linha = f"🔔 {par[0]} a {_numero(precos[par])} {_moeda(par[1])}: {', '.join(nicks)}"
+
+        bot = _bots.get(rede)
+        if bot is None:
+            continue  # Rede que já não está na configuração
+        bot.message(canal, linha)
+        chat_id = telegram.chat_da_ponte(rede, canal)
+        if chat_id is not None:
+            telegram.enviar_telegram(html.escape(linha), chat_id)
+        elif canal in bot.rede.canais_com_alertas:
+            bot.alerta(html.escape(f"{canal}: {linha}"))
+
+def _moeda(cotacao):
+    return "USD" if cotacao == "USDT" else cotacao
+
+def _numero(valor):
+    # 60000.0 → "60000", 0.00001234 → "0.00001234"
+    return f"{valor:.8f}".rstrip("0").rstrip(".")
+
+# ================================================================================ #
+# ----------------------------------- COMANDOS ----------------------------------- #
+# ================================================================================ #
+
+_ALERTA = re.compile(r"^([a-z0-9]+)\s*([<>])\s*([0-9]+(?:[.,][0-9]+)?)$", re.IGNORECASE)
+
+@comando("!alert", "!alerta", uso="!alert <moeda> <>|<> <preço> | !alert | !alert apagar <id|todos>",
+         descricao="Avisa quando uma criptomoeda passa um preço (sem argumentos: os teus alertas).")
+async def cmd_alert(bot, source, args, canal):
+    rede = bot.rede.nome
+    if not args:
+        alertas = do_nick(rede, source)
+        if not alertas:
+            bot.message(canal, "🔔 Não tens alertas. Ex.: !alert btc > 60000")
+            return
+        bot.message(canal, "🔔 Os teus alertas: " + ", ".join(
+            f"#{a.id} {a.base} {a.operador} {_numero(a.limite)} {_moeda(a.cotacao)}" for a in alertas))
+        return
+
+    if args[0].lower() == "apagar":
+        _cmd_apagar(bot, source, args[1:], canal)
+        return
+
+    m = _ALERTA.match(" ".join(args))
+    if m is None:
+        bot.message(canal, "ℹ️ Uso correto: !alert <moeda> <>|<> <preço>, ex.: !alert eth < 2000")
+        return
+    base, operador, limite = m.group(1).upper(), m.group(2), float(m.group(3).replace(",", "."))
+
+    if len(_por_nick.get((rede, lower(source)), ())) >= ALERTAS_MAX_NICK:
+        bot.message(canal, f"⚠️ Já tens {ALERTAS_MAX_NICK} alertas. Apaga um com !alert apagar <id>.")
+        return
+    if len(_alertas) >= ALERTAS_MAX:
+        bot.message(canal, "⚠️ Limite de alertas do bot atingido. Tenta mais tarde.")
+        return
+
+    # O preço atual diz qual o par (EUR ou USDT) e se o alerta já não estaria ultrapassado
+    try:
+        atual = await crypto.preco_atual(base)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        bot.message(canal, "❌ Não foi possível obter o preço na Binance. Tente novamente mais tarde.")
+        return
+    if atual is None:
+        bot.message(canal, f"⚠️ Moeda '{base}' não encontrada.")
+        return
+    cotacao, preco = atual
+    if (operador == ">" and preco > limite) or (operador == "<" and preco < limite):
+        sentido = "acima" if operador == ">" else "abaixo"
+        bot.message(canal, f"⚠️ {base} já está {sentido} de {_numero(limite)} {_moeda(cotacao)} "
+                           f"(agora {_numero(preco)}).")
+        return
+
+    alerta = adicionar(rede, canal, source, base, cotacao, operador, limite)
+    bot.message(canal, f"🔔 Alerta #{alerta.id}: {base} {operador} {_numero(limite)} {_moeda(cotacao)} "
+                       f"(agora {_numero(preco)}).")
+
+def _cmd_apagar(bot, source, args, canal):
+    alertas = do_nick(bot.rede.nome, source)
+    if args and args[0].lower() == "todos":
+        escolhidos = alertas
+    else:
+        ids = {arg.lstrip("#") for arg in args}
+        escolhidos = [a for a in alertas if str(a.id) in ids]
+    if not escolhidos:
+        bot.message(canal, "ℹ️ Uso correto: !alert apagar <id|todos> (os ids estão em !alert)")
+        return
+    remover(escolhidos)
+    bot.message(canal, f"🗑️ {len(escolhidos)} alerta(s) apagado(s).")
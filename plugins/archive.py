@@ -0,0 +1,429 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      archive.py                                                        #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Arquivo das mensagens dos canais que o pedem (ARQUIVO_CANAIS).    #
+#                As mensagens juntam-se em memória e são gravadas em lote em       #
+#                ficheiros diários comprimidos (um por canal e por dia) e num      #
+#                índice SQLite FTS5, numa thread própria para não parar o event    #
+#                loop. Comandos !grep, !last e !mais (resultados paginados) e      #
+#                !arquivo para a retenção e a reconstrução do índice.              #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import atexit
+import functools
+import gzip
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from irc.client import is_channel
+from irc.strings import lower
+
+import metrics
+from logger import obter_logger
+from config import (ARQUIVO_CANAIS, ARQUIVO_PASTA, ARQUIVO_FLUSH_INTERVALO, ARQUIVO_FLUSH_LIMITE,
+                    ARQUIVO_RETENCAO_DIAS, ARQUIVO_POR_PAGINA)
+from outbound import PRIORIDADE_BAIXA, espaco_privmsg, cortar_bytes  # Resultados depois das respostas
+from plugins import admin  # Pesquisar outro canal exige estar lá ou ser admin
+from plugins.registry import comando
+
+logger = obter_logger("arquivo")
+
+# Índice de pesquisa (o texto das mensagens está também nos ficheiros .log.gz)
+DB_PATH = os.path.join(ARQUIVO_PASTA, "indice.db")
+
+# Linhas inseridas por transação ao reconstruir o índice
+LOTE_INDICE = 10000
+
+# Linhas apagadas por transação na retenção
+LOTE_LIMPEZA = 5000
+
+# O estado lê-se de globals() para sobreviver a um !reload do plugin.
+# Mensagens por gravar: (instante, rede, canal, nick, texto)
+_pendentes = globals().get("_pendentes", [])
+
+# Última pesquisa de cada utilizador para o !mais: (rede, nick, destino) → (tipo, argumentos, último id)
+_paginas = globals().get("_paginas", {})
+
+# Uma só thread faz toda a escrita e leitura do arquivo, por ordem de chegada
+_executor = globals().get("_executor", None)
+
+# Ligação ao índice (só usada dentro da thread do arquivo)
+_conn = globals().get("_conn", None)
+
+# Mensagens gravadas desde o arranque
+_gravadas = globals().get("_gravadas", 0)
+
+@functools.lru_cache(maxsize=1024)
+def _nome(texto):
+    # Nome de rede/canal usado nas pastas e no índice: "#Canal/x" → "#canal_x"
+    return re.sub(r"[^\w#&+!.-]", "_", lower(texto)).lstrip(".") or "_"
+
+def arquivado(canal):
+    return "*" in ARQUIVO_CANAIS or lower(canal) in ARQUIVO_CANAIS
+
+def _thread():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arquivo")
+    return _executor
+
+async def _na_thread(funcao, *args):
+    # Corre 'funcao' na thread do arquivo, depois das gravações já pedidas.
+    return await asyncio.wrap_future(_thread().submit(funcao, *args))
+
+# ================================================================================ #
+# ------------------------------------ ÍNDICE ------------------------------------ #
+# ================================================================================ #
+
+def _ligacao():
+    # Abre (uma única vez) o índice em modo WAL; chamado apenas na thread do arquivo.
+    global _conn
+    if _conn is None:
+        os.makedirs(ARQUIVO_PASTA, exist_ok=True)
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _criar_tabelas(_conn)
+    return _conn
+
+def _criar_tabelas(conn):
+    with conn:
+        conn.execute("""CREATE TABLE IF NOT EXISTS mensagens (
+                            id INTEGER PRIMARY KEY,
+                            instante REAL NOT NULL,
+                            rede TEXT NOT NULL,
+                            canal TEXT NOT NULL,
+                            nick TEXT NOT NULL,
+                            chave_nick TEXT NOT NULL,
+                            texto TEXT NOT NULL
+                        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS mensagens_nick ON mensagens (rede, canal, chave_nick, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS mensagens_instante ON mensagens (instante)")
+        # Índice FTS5 sem cópia do texto (content=mensagens), mantido pelos triggers
+        conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS busca USING fts5(
+                            texto, content='mensagens', content_rowid='id',
+                            tokenize='unicode61 remove_diacritics 2')""")
+        conn.execute("""CREATE TRIGGER IF NOT EXISTS mensagens_ai AFTER INSERT ON mensagens BEGIN
+                            INSERT INTO busca (rowid, texto) VALUES (new.id, new.texto);
+                        END""")
+        conn.execute("""CREATE TRIGGER IF NOT EXISTS mensagens_ad AFTER DELETE ON mensagens BEGIN
+                            INSERT INTO busca (busca, rowid, texto) VALUES ('delete', old.id, old.texto);
+                        END""")
+
+def _indexar(conn, linhas):
+    # linhas: (instante, rede, canal, nick, texto)
+    conn.executemany(
+        "INSERT INTO mensagens (instante, rede, canal, nick, chave_nick, texto) VALUES (?, ?, ?, ?, ?, ?)",
+        [(t, rede, canal, nick, lower(nick), texto) for t, rede, canal, nick, texto in linhas])
+
+# ================================================================================ #
+# ------------------------------ GRAVAÇÃO EM LOTE -------------------------------- #
+# ================================================================================ #
+
+def arquivar(rede, canal, nick, mensagem):
+    # Chamado pelo on_pubmsg: só guarda em memória (o disco fica para a thread).
+    if not ARQUIVO_CANAIS or not arquivado(canal):
+        return
+    _pendentes.append((time.time(), _nome(rede), _nome(canal), nick, mensagem))
+    if len(_pendentes) >= ARQUIVO_FLUSH_LIMITE:
+        flush()
+
+def flush():
+    # Entrega as mensagens pendentes à thread do arquivo; devolve o futuro da gravação.
+    if not _pendentes:
+        return None
+    lote = _pendentes[:]
+    _pendentes.clear()
+    return _thread().submit(_gravar, lote)
+
+def _ficheiro(rede, canal, instante):
+    dia = time.strftime("%Y-%m-%d", time.localtime(instante))
+    return os.path.join(ARQUIVO_PASTA, rede, canal, f"{dia}.log.gz")
+
+def _gravar(lote):
+    """
+    Acrescenta o lote aos ficheiros diários (um membro gzip por ficheiro e por
+    lote) e ao índice, numa só transação. Corre na thread do arquivo.
+    """
+    global _gravadas
+    inicio = time.perf_counter()
+    ficheiros = {}
+    for linha in lote:
+        ficheiros.setdefault(_ficheiro(linha[1], linha[2], linha[0]), []).append(linha)
+    for caminho, linhas in ficheiros.items():
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with gzip.open(caminho, "ab", compresslevel=6) as f:
+                f.write("".join(f"{t:.3f}\t{nick}\t{texto}\n"
+                                for t, _, _, nick, texto in linhas).encode("utf-8", "replace"))
+        except OSError as e:
+            logger.error(f"Erro ao gravar {len(linhas)} mensagens em {caminho}: {e}")
+    try:
+        conn = _ligacao()
+        with conn:
+            _indexar(conn, lote)
+    except sqlite3.Error as e:
+        # As mensagens já estão nos ficheiros: o !arquivo reindexar recupera-as
+        logger.error(f"Erro ao indexar {len(lote)} mensagens: {e}")
+    _gravadas += len(lote)
+    metrics.observar("arquivo_gravacao_segundos", time.perf_counter() - inicio)
+
+async def flush_periodico(intervalo=ARQUIVO_FLUSH_INTERVALO):
+    # Tarefa de fundo que grava as mensagens pendentes a cada 'intervalo' segundos.
+    while True:
+        await asyncio.sleep(intervalo)
+        flush()
+
+def fechar():
+    # Grava o que falta, espera pela thread e fecha o índice (encerramento do bot).
+    global _executor, _conn
+    flush()
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+
+if not globals().get("_atexit_registado"):
+    atexit.register(fechar)
+    _atexit_registado = True
+
+metrics.registar_coletor("arquivo", lambda: [
+    ("arquivo_pendentes", {}, len(_pendentes)),
+    ("arquivo_mensagens_gravadas", {}, _gravadas),
+])
+
+# ================================================================================ #
+# ------------------------- RETENÇÃO E RECONSTRUÇÃO ------------------------------ #
+# ================================================================================ #
+
+def _segmentos():
+    # [(caminho, rede, canal, "AAAA-MM-DD")] de todos os ficheiros diários, por data
+    segmentos = []
+    if not os.path.isdir(ARQUIVO_PASTA):
+        return segmentos
+    for rede in os.listdir(ARQUIVO_PASTA):
+        pasta_rede = os.path.join(ARQUIVO_PASTA, rede)
+        if not os.path.isdir(pasta_rede):
+            continue
+        for canal in os.listdir(pasta_rede):
+            pasta_canal = os.path.join(pasta_rede, canal)
+            for nome in os.listdir(pasta_canal) if os.path.isdir(pasta_canal) else ():
+                if nome.endswith(".log.gz"):
+                    segmentos.append((os.path.join(pasta_canal, nome), rede, canal, nome[:-7]))
+    return sorted(segmentos, key=lambda s: s[3])
+
+def _ler_segmento(caminho, rede, canal):
+    # Linhas de um ficheiro diário; um fim cortado (queda a meio de uma gravação) é ignorado.
+    linhas = []
+    try:
+        with gzip.open(caminho, "rt", encoding="utf-8", errors="replace") as f:
+            for linha in f:
+                partes = linha.rstrip("\n").split("\t", 2)
+                if len(partes) == 3:
+                    try:
+                        linhas.append((float(partes[0]), rede, canal, partes[1], partes[2]))
+                    except ValueError:
+                        continue
+    except (OSError, EOFError) as e:
+        logger.warning(f"Ficheiro {caminho} lido até {len(linhas)} linhas: {e}")
+    return linhas
+
+def _limpar(dias):
+    # Apaga os ficheiros com mais de 'dias' dias e as mensagens do índice anteriores.
+    limite = time.time() - dias * 86400
+    dia_limite = time.strftime("%Y-%m-%d", time.localtime(limite))
+    ficheiros = 0
+    for caminho, _, _, dia in _segmentos():
+        if dia < dia_limite:
+            try:
+                os.remove(caminho)
+                ficheiros += 1
+            except OSError as e:
+                logger.error(f"Erro ao apagar {caminho}: {e}")
+
+    conn = _ligacao()
+    apagadas = 0
+    while True:
+        with conn:
+            cursor = conn.execute("DELETE FROM mensagens WHERE id IN "
+                                  "(SELECT id FROM mensagens WHERE instante < ? LIMIT ?)",
+                                  (limite, LOTE_LIMPEZA))
+        apagadas += cursor.rowcount
+        if cursor.rowcount < LOTE_LIMPEZA:
+            break
+    if apagadas:
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    logger.info(f"Limpeza do arquivo: {ficheiros} ficheiros e {apagadas} mensagens indexadas apagados.")
+    return ficheiros, apagadas
+
+def _reindexar():
+    # Reconstrói o índice a partir dos ficheiros diários (ex.: depois de um erro de escrita).
+    conn = _ligacao()
+    with conn:
+        for nome in ("mensagens_ai", "mensagens_ad"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {nome}")
+        conn.execute("DROP TABLE IF EXISTS busca")
+        conn.execute("DROP TABLE IF EXISTS mensagens")
+    _criar_tabelas(conn)
+    total = 0
+    for caminho, rede, canal, _ in _segmentos():
+        linhas = _ler_segmento(caminho, rede, canal)
+        for i in range(0, len(linhas), LOTE_INDICE):
+            with conn:
+                _indexar(conn, linhas[i:i + LOTE_INDICE])
+        total += len(linhas)
+    with conn:
+        conn.execute("INSERT INTO busca (busca) VALUES ('optimize')")
+    conn.execute("PRAGMA incremental_vacuum").fetchall()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    logger.info(f"Índice do arquivo reconstruído: {total} mensagens.")
+    return total
+
+async def limpar(dias=ARQUIVO_RETENCAO_DIAS):
+    flush()
+    return await _na_thread(_limpar, dias)
+
+async def reindexar():
+    flush()
+    return await _na_thread(_reindexar)
+
+def _estatisticas():
+    conn = _ligacao()
+    total = conn.execute("SELECT count(*) FROM mensagens").fetchone()[0]
+    tamanho = sum(os.path.getsize(caminho) for caminho, _, _, _ in _segmentos())
+    return total, tamanho, os.path.getsize(DB_PATH)
+
+# ================================================================================ #
+# ------------------------------------ CONSULTAS --------------------------------- #
+# ================================================================================ #
+
+def _expressao(texto):
+    # Cada palavra vira uma frase FTS5 entre aspas: o texto do utilizador nunca é sintaxe
+    return " ".join('"' + palavra.replace('"', '""') + '"' for palavra in texto.split())
+
+def _grep(rede, canal, texto, antes, limite):
+    # Mensagens com todas as palavras de 'texto', da mais recente para a mais antiga.
+    return _ligacao().execute(
+        "SELECT m.id, m.instante, m.nick, m.texto FROM busca JOIN mensagens m ON m.id = busca.rowid "
+        "WHERE busca MATCH ? AND busca.rowid < ? AND m.rede = ? AND m.canal = ? "
+        "ORDER BY busca.rowid DESC LIMIT ?",
+        (_expressao(texto), antes, rede, canal, limite)).fetchall()
+
+def _last(rede, canal, nick, antes, limite):
+    # Últimas mensagens de 'nick' no canal (percorre o índice mensagens_nick).
+    return _ligacao().execute(
+        "SELECT id, instante, nick, texto FROM mensagens "
+        "WHERE rede = ? AND canal = ? AND chave_nick = ? AND id < ? ORDER BY id DESC LIMIT ?",
+        (rede, canal, lower(nick), antes, limite)).fetchall()
+
+_CONSULTAS = {"grep": _grep, "last": _last}
+
+def _formatar(canal, instante, nick, texto):
+    # A mensagem é cortada para a linha inteira caber nos 512 bytes do IRC
+    prefixo = f"[{time.strftime('%Y-%m-%d %H:%M', time.localtime(instante))}] <{nick}> "
+    return prefixo + cortar_bytes(texto, espaco_privmsg(canal, prefixo))
+
+async def _pagina(bot, source, canal, tipo, argumentos, antes):
+    # Envia uma página de resultados e guarda onde continuar com o !mais.
+    chave = (bot.rede.nome, lower(source), canal)
+    flush()  # O que ainda está em memória também aparece
+    linhas = await _na_thread(_CONSULTAS[tipo], *argumentos, antes, ARQUIVO_POR_PAGINA + 1)
+    if not linhas:
+        _paginas.pop(chave, None)
+        bot.message(canal, "🔎 Sem resultados." if antes == float("inf") else "🔎 Não há mais resultados.")
+        return
+    mais = len(linhas) > ARQUIVO_POR_PAGINA
+    linhas = linhas[:ARQUIVO_POR_PAGINA]
+    for _, instante, nick, texto in linhas:
+        bot.message(canal, _formatar(canal, instante, nick, texto), PRIORIDADE_BAIXA)
+    if mais:
+        _paginas[chave] = (tipo, argumentos, linhas[-1][0])
+        bot.message(canal, "➕ Há mais resultados: !mais", PRIORIDADE_BAIXA)
+    else:
+        _paginas.pop(chave, None)
+    if len(_paginas) > 1000:
+        _paginas.pop(next(iter(_paginas)))
+
+def _canal_alvo(args, canal):
+    # Num canal pesquisa-se esse canal; em privado o primeiro argumento tem de ser o canal.
+    if args and is_channel(args[0]):
+        return args[0], args[1:]
+    return (canal, args) if is_channel(canal) else (None, args)
+
+async def _consultar(bot, source, args, canal, tipo, uso):
+    alvo, resto = _canal_alvo(args, canal)
+    if alvo is None or not resto:
+        bot.message(canal, f"ℹ️ Uso correto: {uso}")
+        return
+    if not arquivado(alvo):
+        bot.message(canal, f"ℹ️ O canal {alvo} não é arquivado.")
+        return
+    # Pesquisar outro canal (ex.: em privado) só para quem lá está, ou para admins
+    estado = getattr(bot, "estado", None)
+    if lower(alvo) != lower(canal) and not (estado is not None and estado.no_canal(alvo, source)) \
+            and not await admin.verificar_admin(bot, source):
+        bot.message(canal, f"🚫 Só quem está em {alvo} pode pesquisar o arquivo desse canal.")
+        return
+    argumentos = (_nome(bot.rede.nome), _nome(alvo), " ".join(resto) if tipo == "grep" else resto[0])
+    await _pagina(bot, source, canal, tipo, argumentos, float("inf"))
+
+# Pesquisa de texto no arquivo do canal
+@comando("!grep", min_args=1, uso="!grep [#canal] <texto>", cooldown=5,
+         descricao="Procura mensagens com o texto no arquivo do canal.")
+async def cmd_grep(bot, source, args, canal):
+    await _consultar(bot, source, args, canal, "grep", "!grep [#canal] <texto>")
+
+# Últimas mensagens de um nick
+@comando("!last", min_args=1, uso="!last [#canal] <nick>", cooldown=5,
+         descricao="Mostra as últimas mensagens de um nick no canal.")
+async def cmd_last(bot, source, args, canal):
+    await _consultar(bot, source, args, canal, "last", "!last [#canal] <nick>")
+
+# Página seguinte do último !grep/!last
+@comando("!mais", uso="!mais", cooldown=5, descricao="Mostra a página seguinte do !grep ou do !last.")
+async def cmd_mais(bot, source, args, canal):
+    pagina = _paginas.get((bot.rede.nome, lower(source), canal))
+    if pagina is None:
+        bot.message(canal, "ℹ️ Nenhuma pesquisa em curso. Use !grep ou !last.")
+        return
+    await _pagina(bot, source, canal, *pagina)
+
+# Estado, retenção e reconstrução do índice
+@comando("!arquivo", admin=True, uso="!arquivo [limpar [dias]|reindexar]", tempo_limite=3600,
+         descricao="Estado do arquivo, retenção e reconstrução do índice.")
+async def cmd_arquivo(bot, source, args, canal):
+    acao = args[0].lower() if args else ""
+    if acao == "limpar":
+        try:
+            dias = float(args[1]) if len(args) > 1 else ARQUIVO_RETENCAO_DIAS
+        except ValueError:
+            bot.message(canal, "ℹ️ Uso correto: !arquivo limpar [dias]")
+            return
+        if dias <= 0:
+            bot.message(canal, "ℹ️ Retenção desligada (ARQUIVO_RETENCAO_DIAS=0).")
+            return
+        ficheiros, apagadas = await limpar(dias)
+        bot.message(canal, f"🧹 Arquivo limpo: {ficheiros} ficheiros e {apagadas} mensagens com mais de {dias:g} dias.")
+    elif acao == "reindexar":
+        bot.message(canal, "⏳ A reconstruir o índice do arquivo...")
+        inicio = time.monotonic()
+        total = await reindexar()
+        bot.message(canal, f"✅ Índice reconstruído: {total} mensagens em {time.monotonic() - inicio:.1f}s.")
+    else:
+        total, ficheiros, indice = await _na_thread(_estatisticas)
+        canais = "todos" if "*" in ARQUIVO_CANAIS else (", ".join(ARQUIVO_CANAIS) or "nenhum")
+        bot.message(canal, f"🗄️ Arquivo ({canais}): {total} mensagens, ficheiros {ficheiros / 2 ** 20:.1f} MB, "
+                           f"índice {indice / 2 ** 20:.1f} MB, {len(_pendentes)} por gravar.")
@@ -2,179 +2,292 @@
 #                                                                                  #
 # Ficheiro:      commands.py                                                       #
 # Autor:         NunchuckCoder                                                     #
-# Versão:        1.0                                                               #
+# Versão:        1.1                                                               #
 # Data:          Julho 2025                                                        #
 # Descrição:     Implementação e gestão dos comandos do bot IRC. Inclui comandos   #
 #                administrativos (op, deop, kick, ban, etc.) e comandos gerais     #
-#                (!seen, !crypto, !ajuda). Faz a ligação com outros módulos como   #
-#                admin.py, seen.py e crypto.py.                                    #
+#                (!status, !ajuda). O despacho usa o registo de comandos           #
+#                (registry.py): outros plugins (seen.py, crypto.py, ...) registam  #
+#                os seus próprios comandos sem alterar este ficheiro.              #
 # Licença:       MIT License                                                       #
 #                                                                                  #
 # ================================================================================ #
 
-from plugins.admin import is_admin  # Verifica se um utilizador tem permissões de administrador
-from plugins import seen  # Plugin que regista e consulta a última vez que um utilizador foi visto
-from plugins.crypto import get_crypto_price  # Função para obter o preço de criptomoedas
+import time
 
-seen.init_db()  # Garante que a base de dados está inicializada
+from plugins import admin  # Verifica se um utilizador tem permissões de administrador
+from plugins.registry import comando, obter, linhas_ajuda, recarregar_plugin  # Registo de comandos
+from outbound import PRIORIDADE_BAIXA  # Texto longo sai depois das respostas normais
+from config import AGRUPAR_JANELA, ENTRADA_TEMPO_LIMITE
+import metrics
+from logger import obter_logger
+
+logger = obter_logger("comandos")
+
+# Último uso de cada comando com cooldown: (nick, comando) → instante
+# (o estado lê-se de globals() para sobreviver a um !reload do plugin)
+_ultimo_uso = globals().get("_ultimo_uso", {})
+
+# Pedidos agrupados: (rede, origem, destino, comando, argumentos) → instante até ao qual um
+# pedido igual não volta a correr (AGRUPAR_JANELA depois da resposta; enquanto o
+# pedido espera ou corre, o tempo limite dele mais a janela)
+_agrupados = globals().get("_agrupados", {})
+
+# Respostas poupadas pelo agrupamento desde o arranque
+_poupadas = globals().get("_poupadas", 0)
+
+# Põe o comando na fila de entrada do bot (por destino, com prioridade e tempo limite)
+def despachar(bot, source, comando, args, target):
+    cmd = obter(comando)
+    if cmd is None:
+        # Só gera a resposta de erro: é o primeiro a sair se a fila encher
+        return bot.entrada.submeter(target, lambda: executar_comando(bot, source, comando, args, target),
+                                    PRIORIDADE_BAIXA, comando, ao_esgotar=bot.comando_esgotado)
+
+    fabrica = lambda: executar_comando(bot, source, comando, args, target)
+    chave = None
+    if cmd.agrupar and AGRUPAR_JANELA > 0:
+        chave = (bot.rede.nome, getattr(bot, "origem", ""), target.lower(), cmd.nome, " ".join(args).lower())
+        if _ja_pedido(chave, cmd):
+            return True
+        fabrica = lambda: _executar_agrupado(chave, bot, source, comando, args, target)
+    # O aviso de cancelamento vai para quem pediu (ex.: o chat do Telegram, não o canal)
+    aceite = bot.entrada.submeter(target, fabrica, cmd.prioridade, comando, cmd.tempo_limite,
+                                  ao_esgotar=bot.comando_esgotado)
+    if not aceite and chave is not None:
+        _agrupados.pop(chave, None)  # Descartado: o próximo pedido igual volta a correr
+    return aceite
+
+def _ja_pedido(chave, cmd):
+    # True se o mesmo pedido já está na fila, a correr ou respondido há menos de AGRUPAR_JANELA.
+    global _poupadas
+    agora = time.monotonic()
+    if agora < _agrupados.get(chave, 0):
+        _poupadas += 1
+        metrics.contar("irc_respostas_poupadas_total", comando=cmd.nome)
+        logger.debug("%s %s em %s agrupado com um pedido igual.", cmd.nome, chave[4], chave[2])
+        return True
+    # Sem tempo limite (<= 0) só se agrupa durante a janela; o fim do comando renova-a
+    _agrupados[chave] = agora + max(0, cmd.tempo_limite or ENTRADA_TEMPO_LIMITE) + AGRUPAR_JANELA
+    if len(_agrupados) > 1000:
+        for antiga in [k for k, t in _agrupados.items() if t < agora]:
+            del _agrupados[antiga]
+    return False
+
+async def _executar_agrupado(chave, bot, source, comando, args, target):
+    try:
+        await executar_comando(bot, source, comando, args, target)
+    finally:
+        # A janela conta a partir da resposta (ou do cancelamento)
+        _agrupados[chave] = time.monotonic() + AGRUPAR_JANELA
 
 # Função principal que executa o comando com base na mensagem recebida
 async def executar_comando(bot, source, comando, args, target):
     canal = target   # O destino da mensagem (canal ou utilizador)
 
-    def sem_permissao():
+    cmd = obter(comando)
+    if cmd is None:
+        bot.message(canal, "❓ Comando desconhecido. Use !ajuda.")
+        return
+
+    # Verificações feitas antes de chamar o handler
+    if cmd.admin and not await admin.verificar_admin(bot, source):
         bot.message(canal, "🚫 Sem permissão para executar este comando.")
+        return
+    if len(args) < cmd.min_args:
+        bot.message(canal, f"ℹ️ Uso correto: {cmd.uso}")
+        return
+    if cmd.cooldown and _em_cooldown(source, cmd):
+        logger.debug("%s em cooldown para %s.", source, cmd.nome)
+        return
+
+    if not metrics.ATIVAS:
+        await cmd.handler(bot, source, args, canal)
+        return
+    inicio = time.perf_counter()
+    try:
+        await cmd.handler(bot, source, args, canal)
+    finally:
+        metrics.observar("irc_comando_segundos", time.perf_counter() - inicio, comando=cmd.nome)
+
+def _em_cooldown(source, cmd):
+    agora = time.monotonic()
+    chave = (source.lower(), cmd.nome)
+    if agora - _ultimo_uso.get(chave, float("-inf")) < cmd.cooldown:
+        return True
+    _ultimo_uso[chave] = agora
+    if len(_ultimo_uso) > 5000:
+        # Limpa os registos cujo cooldown já passou (nenhum cooldown é maior que 1h)
+        for antiga in [k for k, t in _ultimo_uso.items() if agora - t > 3600]:
+            del _ultimo_uso[antiga]
+    return False
+
+# ================================================================================ #
+# ---------------------------- COMANDOS DE MODERAÇÃO ----------------------------- #
+# ================================================================================ #
+
+def _nicks(args):
+    # "a,b c" → ["a", "b", "c"], sem repetidos (ignorando maiúsculas)
+    vistos, nicks = set(), []
+    for arg in args:
+        for nick in arg.split(","):
+            if nick and nick.lower() not in vistos:
+                vistos.add(nick.lower())
+                nicks.append(nick)
+    return nicks
+
+def _presentes(bot, canal, nicks):
+    # Quando a lista do canal é conhecida, tira (e avisa numa só linha) quem não está lá.
+    if not bot.estado.conhecido(canal):
+        return nicks
+    ausentes = [nick for nick in nicks if not bot.estado.no_canal(canal, nick)]
+    if len(ausentes) == 1:
+        bot.message(canal, f"⚠️ {ausentes[0]} não está em {canal}.")
+    elif ausentes:
+        bot.message(canal, f"⚠️ Não estão em {canal}: {', '.join(ausentes)}.")
+    return [nick for nick in nicks if nick not in ausentes]
+
+async def _modo_membro(bot, canal, sinal, modo, nicks):
+    # +o/-o/+v/-v só sai para o servidor para quem está no canal e muda de modo,
+    # tudo empilhado em linhas "MODE #canal +ooo a b c"
+    conhecido = bot.estado.conhecido(canal)
+    alteracoes = [(sinal, modo, nick) for nick in _presentes(bot, canal, nicks)
+                  if not conhecido or (modo in bot.estado.modos(canal, nick)) != (sinal == "+")]
+    if alteracoes:
+        await bot.set_modes(canal, alteracoes)
+
+# Dá op a um ou mais utilizadores
+@comando("!op", "!up", admin=True, uso="!op [nick ...]", descricao="Dá op a um ou mais utilizadores.")
+async def cmd_op(bot, source, args, canal):
+    await _modo_membro(bot, canal, '+', 'o', _nicks(args) or [source])
+
+# Remove op
+@comando("!deop", "!down", admin=True, uso="!deop [nick ...]", descricao="Remove op de um ou mais utilizadores.")
+async def cmd_deop(bot, source, args, canal):
+    await _modo_membro(bot, canal, '-', 'o', _nicks(args) or [source])
+
+# Dá voice
+@comando("!voice", admin=True, min_args=1, uso="!voice <nick ...>", descricao="Dá voz a um ou mais utilizadores.")
+async def cmd_voice(bot, source, args, canal):
+    await _modo_membro(bot, canal, '+', 'v', _nicks(args))
+
+# Remove voice
+@comando("!devoice", admin=True, min_args=1, uso="!devoice <nick ...>",
+         descricao="Remove a voz de um ou mais utilizadores.")
+async def cmd_devoice(bot, source, args, canal):
+    await _modo_membro(bot, canal, '-', 'v', _nicks(args))
+
+# Expulsa um ou mais utilizadores (separados por vírgulas) com motivo
+@comando("!kick", "!k", admin=True, min_args=2, uso="!kick <nick[,nick...]> <motivo>",
+         descricao="Expulsa um ou mais utilizadores com motivo.")
+async def cmd_kick(bot, source, args, canal):
+    nicks, motivo = _presentes(bot, canal, _nicks(args[:1])), ' '.join(args[1:])
+    if nicks:
+        await bot.kick(canal, nicks, motivo)
+
+# Bane e expulsa (o ban usa o host do utilizador: *!*@host)
+@comando("!ban", admin=True, min_args=2, uso="!ban <nick[,nick...]> <motivo>",
+         descricao="Bane (*!*@host) e expulsa um ou mais utilizadores.")
+async def cmd_ban(bot, source, args, canal):
+    nicks, motivo = _nicks(args[:1]), ' '.join(args[1:])
+    # Vários nicks do mesmo host dão um só ban
+    por_nick = {nick: bot.estado.mascara_ban(nick) for nick in nicks}
+    mascaras = list(dict.fromkeys(por_nick.values()))
+    await bot.set_modes(canal, [('+', 'b', mascara) for mascara in mascaras])
+    for nick, mascara in por_nick.items():
+        bot.estado.registar_ban(canal, nick, mascara)  # O !unban encontra-a depois do kick
+    if bot.estado.conhecido(canal):
+        nicks = [nick for nick in nicks if bot.estado.no_canal(canal, nick)]
+    if nicks:
+        await bot.kick(canal, nicks, motivo)
+
+# Ban + kick (atalho)
+@comando("!kb", admin=True, min_args=2, uso="!kb <nick[,nick...]> <motivo>", descricao="Atalho para ban + kick.")
+async def cmd_kb(bot, source, args, canal):
+    await cmd_ban(bot, source, args, canal)
+
+# Remove os bans que apanham os utilizadores
+@comando("!unban", admin=True, min_args=1, uso="!unban <nick ...>", descricao="Remove bans.")
+async def cmd_unban(bot, source, args, canal):
+    mascaras, desconhecidos = {}, []
+    for nick in _nicks(args):
+        bans = bot.estado.bans_de(canal, nick)
+        if not bans:
+            desconhecidos.append(nick)  # Uma máscara adivinhada não levantaria o ban verdadeiro
+        for mascara in bans:
+            mascaras[mascara] = None
+    if desconhecidos:
+        bot.message(canal, f"⚠️ Nenhum ban conhecido em {canal} apanha: {', '.join(desconhecidos)}. "
+                           f"Usa /mode {canal} -b <máscara>.")
+    if mascaras:
+        await bot.set_modes(canal, [('-', 'b', mascara) for mascara in mascaras])
+
+# Envia convite para o canal
+@comando("!invite", admin=True, min_args=1, uso="!invite <nick>",
+         descricao="Envia um convite para o canal.")
+async def cmd_invite(bot, source, args, canal):
+    await bot.invite(args[0], canal)
+
+# Altera o tópico do canal
+@comando("!topic", admin=True, min_args=1, uso="!topic <novo tópico>",
+         descricao="Altera o tópico do canal.")
+async def cmd_topic(bot, source, args, canal):
+    await bot.set_topic(canal, ' '.join(args))
+
+# ================================================================================ #
+# ------------------------------- COMANDOS GERAIS -------------------------------- #
+# ================================================================================ #
+
+# Verifica se o utilizador é admin
+@comando("!status", uso="!status [nick]", descricao="Mostra se o nick é admin ou não.")
+async def cmd_status(bot, source, args, canal):
+    nick = args[0] if args else source
+    nivel = "Administrador" if await admin.verificar_admin(bot, nick) else "Usuário comum"
+    bot.message(canal, f"Status de {nick}: {nivel}")
+
+# Lista de comandos disponíveis, gerada a partir do registo
+@comando("!ajuda", uso="!ajuda", descricao="Mostra esta lista de comandos.", cooldown=30,
+         prioridade=PRIORIDADE_BAIXA, agrupar=True)
+async def cmd_ajuda(bot, source, args, canal):
+    for linha in linhas_ajuda():
+        bot.message(canal, linha, PRIORIDADE_BAIXA)
+
+# Estado das filas de saída (controlo de flood) e de entrada (comandos)
+@comando("!fila", admin=True, uso="!fila", descricao="Mostra o estado das filas de saída e de entrada.")
+async def cmd_fila(bot, source, args, canal):
+    est = bot.saida.estatisticas()
+    bot.message(canal, f"📤 Fila: {est['pendentes']} pendentes {est['por_faixa']} | "
+                       f"{est['enviadas']} enviadas | atraso médio {est['atraso_medio']:.2f}s, "
+                       f"máx {est['atraso_max']:.2f}s")
+    est = bot.entrada.estatisticas()
+    bot.message(canal, f"📥 Comandos: {est['pendentes']} à espera (maior fila {est['maior_fila']}), "
+                       f"{est['em_execucao']} a correr | {est['executados']} executados, "
+                       f"{est['esgotados']} cancelados por tempo, descartados {est['descartados']} | "
+                       f"{_poupadas} respostas poupadas (pedidos iguais agrupados)")
+
+# Comando para o bot entrar num canal
+@comando("!join", admin=True, min_args=1, uso="!join <#canal>", descricao="O bot entra num canal.")
+async def cmd_join(bot, source, args, canal):
+    novo_canal = args[0]
+    bot.join(novo_canal)
+    bot.message(canal, f"✅ A entrar em {novo_canal}")
+
+# Comando para o bot sair de um canal
+@comando("!part", admin=True, min_args=1, uso="!part <#canal>", descricao="O bot sai de um canal.")
+async def cmd_part(bot, source, args, canal):
+    sair_canal = args[0]
+    bot.part(sair_canal)
+    bot.message(canal, f"👋 A sair de {sair_canal}")
 
-    def uso_comando(correto):
-        bot.message(canal, f"ℹ️ Uso correto: {correto}")
-
-    # Usa pattern matching (Python 3.10+) para identificar comandos
-    match comando:
-        
-        # Dá op a um utilizador
-        case '!op' | '!up':
-            if is_admin(source):
-                nick = args[0] if args else source
-                await bot.set_mode(canal, '+o', nick)
-            else:
-                sem_permissao()
-
-        # Remove op
-        case '!deop' | '!down':
-            if is_admin(source):
-                nick = args[0] if args else source
-                await bot.set_mode(canal, '-o', nick)
-            else:
-                sem_permissao()
-
-        # Dá voice
-        case '!voice':
-            if is_admin(source) and args:
-                await bot.set_mode(canal, '+v', args[0])
-            else:
-                uso_comando("!voice <nick>")
-
-        # Remove voice
-        case '!devoice':
-            if is_admin(source) and args:
-                await bot.set_mode(canal, '-v', args[0])
-            else:
-                uso_comando("!devoice <nick>")
-
-        # Expulsa um utilizador com motivo
-        case '!kick' | '!k':
-            if is_admin(source) and len(args) >= 2:
-                nick, motivo = args[0], ' '.join(args[1:])
-                await bot.kick(canal, nick, motivo)
-            else:
-                uso_comando("!kick <nick> <motivo>")
-
-        # Bane e expulsa
-        case '!ban':
-            if is_admin(source) and len(args) >= 2:
-                nick, motivo = args[0], ' '.join(args[1:])
-                await bot.set_mode(canal, '+b', f'{nick}!*@*')
-                await bot.kick(canal, nick, motivo)
-            else:
-                uso_comando("!ban <nick> <motivo>")
-
-        # Ban + kick (atalho)
-        case '!kb':
-            if is_admin(source) and len(args) >= 2:
-                nick, motivo = args[0], ' '.join(args[1:])
-                await bot.set_mode(canal, '+b', f'{nick}!*@*')
-                await bot.kick(canal, nick, motivo)
-            else:
-                uso_comando("!kb <nick> <motivo>")
-
-        # Remove ban
-        case '!unban':
-            if is_admin(source) and args:
-                await bot.set_mode(canal, '-b', f'{args[0]}!*@*')
-            else:
-                uso_comando("!unban <nick>")
-
-        # Envia convite para o canal
-        case '!invite':
-            if is_admin(source) and args:
-                await bot.invite(args[0], canal)
-            else:
-                uso_comando("!invite <nick>")
-
-        # Altera o tópico do canal
-        case '!topic':
-            if is_admin(source) and args:
-                await bot.set_topic(canal, ' '.join(args))
-            else:
-                uso_comando("!topic <novo tópico>")
-
-        # Verifica se o utilizador é admin
-        case '!status':
-            nick = args[0] if args else source
-            nivel = "Administrador" if is_admin(nick) else "Usuário comum"
-            bot.message(canal, f"Status de {nick}: {nivel}")
-
-        # Consulta quando foi a última vez que um nick foi visto
-        case '!seen':
-            if args:
-                ultima_vez = seen.get_seen(args[0])
-                bot.message(canal, ultima_vez)
-            else:
-                bot.message(canal, "ℹ️ Uso correto: !seen <nick>")
-
-        # Consulta o preço de uma criptomoeda
-        case '!crypto':
-            if args:
-                resultado = await get_crypto_price(args[0])
-                bot.message(canal, resultado)
-            else:
-                uso_comando("!crypto <símbolo>")
-
-        # Lista de comandos disponíveis com descrição detalhada
-        case '!ajuda':
-            ajuda = [
-                ("🤖 Comandos disponíveis:",""),
-                ("!op [nick]", "Dá op a um utilizador (admin apenas)."),
-                ("!deop [nick]", "Remove op de um utilizador (admin apenas)."),
-                ("!voice <nick>", "Dá voz a um utilizador (admin apenas)."),
-                ("!devoice <nick>", "Remove a voz de um utilizador (admin apenas)."),
-                ("!kick <nick> <motivo>", "Expulsa um utilizador com motivo (admin apenas)."),
-                ("!ban <nick> <motivo>", "Bane e expulsa um utilizador (admin apenas)."),
-                ("!kb <nick> <motivo>", "Atalho para ban + kick (admin apenas)."),
-                ("!unban <nick>", "Remove um ban (admin apenas)."),
-                ("!invite <nick>", "Envia um convite para o canal (admin apenas)."),
-                ("!topic <novo tópico>", "Altera o tópico do canal (admin apenas)."),
-                ("!status [nick]", "Mostra se o nick é admin ou não."),
-                ("!seen <nick>", "Informa a última vez que o nick foi visto."),
-                ("!crypto <símbolo>", "Mostra o preço atual de uma criptomoeda.")
-            ]
-            for comando, descricao in ajuda:
-                bot.message(canal, f"{comando} – {descricao}")
-         
-        # Comando para o bot entrar num canal
-        case '!join':
-            if is_admin(source):
-                if args:
-                    novo_canal = args[0]
-                    bot.connection.join(novo_canal)
-                    bot.message(canal, f"✅ A entrar em {novo_canal}")
-                else:
-                    uso_comando("!join <#canal>")
-            else:
-                sem_permissao()
-
-        # Comando para o bot sair de um canal
-        case '!part':
-            if is_admin(source):
-                if args:
-                    sair_canal = args[0]
-                    bot.connection.part(sair_canal)
-                    bot.message(canal, f"👋 A sair de {sair_canal}")
-                else:
-                    uso_comando("!part <#canal>")
-            else:
-                sem_permissao()
-                
-        # Comando desconhecido
-        case _:
-            bot.message(canal, "❓ Comando desconhecido. Use !ajuda.")
+# Recarrega um plugin sem desligar o bot
+@comando("!reload", admin=True, min_args=1, uso="!reload <plugin>",
+         descricao="Recarrega um plugin sem perder a ligação.")
+async def cmd_reload(bot, source, args, canal):
+    nome = args[0]
+    try:
+        total = recarregar_plugin(nome)
+    except Exception as e:
+        logger.exception(f"Erro ao recarregar o plugin {nome}.")
+        bot.message(canal, f"❌ Erro ao recarregar {nome}: {type(e).__name__}: {e}")
+        return
+    bot.message(canal, f"♻️ Plugin {nome} recarregado ({total} comandos).")
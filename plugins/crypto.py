@@ -2,39 +2,303 @@
 #                                                                                  #
 # Ficheiro:      crypto.py                                                         #
 # Autor:         NunchuckCoder                                                     #
-# Versão:        1.0                                                               #
+# Versão:        1.1                                                               #
 # Data:          Julho 2025                                                        #
 # Descrição:     Módulo para consulta de preços de criptomoedas em tempo real,     #
 #                utilizando a API pública da Binance. Dá suporte a pares EUR e     #
 #                USD (via USDT). Retorna mensagens formatadas para o bot IRC.      #
+#                Usa uma sessão HTTP partilhada, cache com TTL (incluindo cache    #
+#                negativa) e junta pedidos simultâneos ao mesmo par num só.        #
+#                Mantém um índice local dos pares da Binance para saber logo qual  #
+#                o par a consultar e sugerir correções para símbolos errados.      #
+#                Vários preços podem ser pedidos de uma vez (alertas, alerts.py).  #
 # Licença:       MIT License                                                       #
 #                                                                                  #
 # ================================================================================ #
 
 import aiohttp     # Biblioteca assíncrona para requests HTTP
 import asyncio     # Usada para gestão de timeouts e exceções assíncronas
+import bisect
+import json
+import os
+import time
+
+import metrics
+from logger import obter_logger
+from config import CRYPTO_TTL, CRYPTO_TTL_NEGATIVO, CRYPTO_CACHE_MAX
+from config import BINANCE_API_URL, CRYPTO_INDICE_INTERVALO
+from plugins.registry import comando
+
+logger = obter_logger("crypto")
+
+# Endpoint base da API pública da Binance
+BINANCE_URL = BINANCE_API_URL
+
+# Cópia local do índice de pares, para arrancar sem esperar pela Binance
+INDICE_PATH = "db/symbols.json"
+
+# Cotações consultadas, por ordem de preferência
+COTACOES = ("EUR", "USDT")
+
+# Pares pedidos pelo nome num pedido de vários preços; acima disto pede-se a lista completa
+MAX_PARES_LOTE = 100
+
+# O estado lê-se de globals() para sobreviver a um !reload do plugin
+_sessao = globals().get("_sessao", None)  # aiohttp.ClientSession partilhada por todos os pedidos
+_cache = globals().get("_cache", {})  # (símbolo, cotação) → (expira_em, preço ou None se o par não existe)
+_em_voo = globals().get("_em_voo", {})  # (símbolo, cotação) → tarefa do pedido em curso
+
+# Contadores da cache
+hits = globals().get("hits", 0)
+misses = globals().get("misses", 0)
+partilhados = globals().get("partilhados", 0)  # Pedidos que aproveitaram um pedido já em curso
+
+def _obter_sessao():
+    # Cria a sessão uma única vez: as ligações TLS ficam no pool e são reutilizadas.
+    global _sessao
+    if _sessao is None or _sessao.closed:
+        _sessao = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+    return _sessao
+
+async def fechar_sessao():
+    # Fecha a sessão HTTP (usado no encerramento do bot).
+    global _sessao
+    if _sessao is not None:
+        await _sessao.close()
+        _sessao = None
+
+def estatisticas():
+    return {"hits": hits, "misses": misses, "partilhados": partilhados,
+            "entradas": len(_cache), "em_voo": len(_em_voo)}
+
+def _metricas():
+    # Lido pelo endpoint de métricas: os contadores já existem neste módulo.
+    return [("crypto_cache_hits", {}, hits), ("crypto_cache_misses", {}, misses),
+            ("crypto_pedidos_partilhados", {}, partilhados), ("crypto_cache_entradas", {}, len(_cache))]
+
+metrics.registar_coletor("crypto", _metricas)
+
+# ================================================================================ #
+# ------------------------------ CACHE E SINGLE-FLIGHT --------------------------- #
+# ================================================================================ #
+
+def _guardar(chave, preco):
+    if len(_cache) >= CRYPTO_CACHE_MAX:
+        # Remove primeiro as entradas expiradas; se não chegar, as mais antigas
+        agora = time.monotonic()
+        for antiga in [k for k, (expira, _) in _cache.items() if expira <= agora]:
+            del _cache[antiga]
+        while len(_cache) >= CRYPTO_CACHE_MAX:
+            del _cache[next(iter(_cache))]
+    ttl = CRYPTO_TTL if preco is not None else CRYPTO_TTL_NEGATIVO
+    _cache[chave] = (time.monotonic() + ttl, preco)
+
+async def _pedir_preco(symbol, quote):
+    # Pedido real à Binance; o preço, ou "não existe" (-1121), fica em cache.
+    url = f"{BINANCE_URL}/ticker/price"
+    inicio = time.perf_counter()
+    async with _obter_sessao().get(url, params={"symbol": symbol + quote}) as res:
+        if res.status == 400:
+            data = await res.json(content_type=None)
+            if data.get("code") == -1121:
+                # Par inexistente: só este resultado vai para a cache negativa
+                _guardar((symbol, quote), None)
+                return None
+        # 429/418/5xx e outros erros são passageiros: exceção e nada em cache
+        res.raise_for_status()
+        data = await res.json(content_type=None)
+    metrics.observar("binance_pedido_segundos", time.perf_counter() - inicio)
+    preco = float(data['price'])
+    _guardar((symbol, quote), preco)
+    return preco
+
+async def precos(pares):
+    """
+    Preços de vários pares (base, cotação) num só pedido à Binance: os pares
+    pedidos pelo nome até MAX_PARES_LOTE, ou a lista completa de preços acima
+    disso. Devolve {(base, cotação): preço}, sem os pares que não vierem na
+    resposta, e atualiza a cache do !crypto com o que recebeu.
+    """
+    simbolos = {base + cotacao: (base, cotacao) for base, cotacao in pares}
+    parametros = None
+    if len(simbolos) <= MAX_PARES_LOTE:
+        parametros = {"symbols": json.dumps(sorted(simbolos), separators=(",", ":"))}
+    dados = await _pedir_precos(parametros)
+    if dados is None:
+        # Um dos pares saiu da Binance (o pedido em lote falha todo): lista completa
+        dados = await _pedir_precos(None)
+
+    resultado = {}
+    for item in dados or ():
+        par = simbolos.get(item.get("symbol"))
+        if par is not None:
+            resultado[par] = float(item["price"])
+            _guardar(par, resultado[par])
+    return resultado
+
+async def _pedir_precos(parametros):
+    # GET /ticker/price com symbols=[...] (ou sem parâmetros: todos os pares); None se 400.
+    inicio = time.perf_counter()
+    async with _obter_sessao().get(f"{BINANCE_URL}/ticker/price", params=parametros) as res:
+        if res.status == 400 and parametros:
+            return None
+        res.raise_for_status()
+        dados = await res.json(content_type=None)
+    metrics.observar("binance_pedido_segundos", time.perf_counter() - inicio)
+    return dados
+
+async def _preco_par(symbol, quote):
+    """
+    Devolve o preço do par (ou None se não existir). Usa a cache quando válida
+    e, se já houver um pedido em curso para o mesmo par, espera por esse.
+    """
+    global hits, misses, partilhados
+    chave = (symbol, quote)
+
+    entrada = _cache.get(chave)
+    if entrada is not None and entrada[0] > time.monotonic():
+        hits += 1
+        return entrada[1]
+    misses += 1
+
+    tarefa = _em_voo.get(chave)
+    if tarefa is None:
+        tarefa = asyncio.ensure_future(_pedir_preco(symbol, quote))
+        _em_voo[chave] = tarefa
+        tarefa.add_done_callback(lambda _: _em_voo.pop(chave, None))
+    else:
+        partilhados += 1
+    # shield: se quem pediu for cancelado, o pedido partilhado continua para os outros
+    return await asyncio.shield(tarefa)
+
+# ================================================================================ #
+# ------------------------ ÍNDICE LOCAL DE PARES DA BINANCE ---------------------- #
+# ================================================================================ #
+
+_indice = globals().get("_indice", {})  # ativo base → {cotação: símbolo do par}, ex.: "BTC" → {"EUR": "BTCEUR"}
+_bases = globals().get("_bases", [])  # ativos base ordenados (pesquisa por prefixo com bisect)
+_por_tamanho = globals().get("_por_tamanho", {})  # tamanho do nome → ativos base (candidatos por distância de edição)
+
+def _construir_indice(pares):
+    # pares: lista de (símbolo, base, cotação). Devolve as três estruturas do índice.
+    indice = {}
+    for simbolo, base, cotacao in pares:
+        indice.setdefault(base, {})[cotacao] = simbolo
+    bases = sorted(indice)
+    por_tamanho = {}
+    for base in bases:
+        por_tamanho.setdefault(len(base), []).append(base)
+    return indice, bases, por_tamanho
+
+def _instalar_indice(pares):
+    global _indice, _bases, _por_tamanho
+    _indice, _bases, _por_tamanho = _construir_indice(pares)
+
+def _extrair_pares(dados):
+    # Lê a resposta de /exchangeInfo e fica só com os pares ativos.
+    info = json.loads(dados)
+    return [
+        (s["symbol"], s["baseAsset"], s["quoteAsset"])
+        for s in info.get("symbols", [])
+        if s.get("status") == "TRADING"
+    ]
+
+def carregar_snapshot():
+    # Arranque rápido: usa a última cópia do índice gravada em disco.
+    try:
+        with open(INDICE_PATH, encoding="utf-8") as f:
+            _instalar_indice([tuple(par) for par in json.load(f)["pares"]])
+        logger.info(f"Índice de pares carregado do disco ({len(_indice)} moedas).")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Snapshot do índice de pares inválido: {e}")
+
+def _gravar_snapshot(pares):
+    os.makedirs(os.path.dirname(INDICE_PATH), exist_ok=True)
+    temporario = INDICE_PATH + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"atualizado": time.time(), "pares": pares}, f)
+    os.replace(temporario, INDICE_PATH)
+
+async def atualizar_indice():
+    # Descarrega a lista de pares da Binance e substitui o índice em memória.
+    url = f"{BINANCE_URL}/exchangeInfo"
+    async with _obter_sessao().get(url, params={"permissions": "SPOT"}) as res:
+        res.raise_for_status()
+        dados = await res.read()
+    # A resposta tem vários MB: o parse e a gravação correm fora do event loop
+    pares = await asyncio.to_thread(_extrair_pares, dados)
+    await asyncio.to_thread(_gravar_snapshot, pares)
+    _instalar_indice(pares)
+    logger.info(f"Índice de pares atualizado ({len(_indice)} moedas).")
+
+async def manter_indice(intervalo=CRYPTO_INDICE_INTERVALO):
+    # Tarefa de fundo: carrega o snapshot e atualiza o índice periodicamente.
+    carregar_snapshot()
+    while True:
+        try:
+            await atualizar_indice()
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar o índice de pares da Binance: {e}")
+        await asyncio.sleep(intervalo)
+
+def _distancia(a, b, limite=2):
+    # Distância de Levenshtein; desiste cedo quando passa do limite.
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(atual) > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+def sugestoes(symbol, maximo=3):
+    """
+    Sugere moedas parecidas com um símbolo desconhecido: primeiro as que
+    começam pelo mesmo prefixo, depois as que estão a 1–2 edições.
+    """
+    encontradas = []
+    inicio = bisect.bisect_left(_bases, symbol)
+    for base in _bases[inicio:inicio + maximo]:
+        if base.startswith(symbol):
+            encontradas.append(base)
+
+    candidatos = []
+    for tamanho in range(len(symbol) - 2, len(symbol) + 3):
+        for base in _por_tamanho.get(tamanho, ()):
+            d = _distancia(symbol, base)
+            if d <= 2 and base not in encontradas:
+                candidatos.append((d, base))
+    encontradas.extend(base for _, base in sorted(candidatos))
+    return encontradas[:maximo]
+
+# ================================================================================ #
+# ------------------------- CONSULTA DO PREÇO DE UMA MOEDA ----------------------- #
+# ================================================================================ #
 
 # Função assíncrona para obter o preço de uma criptomoeda
 # symbol -> ticker da moeda (ex: BTC, ETH)
 async def get_crypto_price(symbol):
+    symbol = symbol.upper()
     try:
-        async with aiohttp.ClientSession() as session:
-            # Primeiro tenta obter o preço no par com EUR
-            url_price_eur = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol.upper()}EUR"
-            async with session.get(url_price_eur, timeout=10) as res:
-                data = await res.json()
-                if 'price' in data:
-                    return f"💶 {symbol.upper()}: {float(data['price']):.8f} EUR"
-
-            # Se não existir par em EUR, tenta no par USDT (equivalente a USD)
-            url_price_usd = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol.upper()}USDT"
-            async with session.get(url_price_usd, timeout=10) as res:
-                data = await res.json()
-                if 'price' in data:
-                    return f"💲 {symbol.upper()}: {float(data['price']):.8f} USD"
-
-            # Se nenhum dos pares for encontrado, devolve aviso
-            return f"⚠️ Moeda '{symbol.upper()}' não encontrada."
+        if _indice:
+            return await _preco_indexado(symbol)
+
+        # Sem índice (ainda): primeiro tenta obter o preço no par com EUR
+        preco = await _preco_par(symbol, "EUR")
+        if preco is not None:
+            return f"💶 {symbol}: {preco:.8f} EUR"
+
+        # Se não existir par em EUR, tenta no par USDT (equivalente a USD)
+        preco = await _preco_par(symbol, "USDT")
+        if preco is not None:
+            return f"💲 {symbol}: {preco:.8f} USD"
+
+        # Se nenhum dos pares for encontrado, devolve aviso
+        return f"⚠️ Moeda '{symbol}' não encontrada."
 
     # --- Tratamento de erros específicos ---
     except asyncio.TimeoutError:
@@ -44,3 +308,42 @@ async def get_crypto_price(symbol):
     except Exception as e:
         # Captura qualquer erro inesperado (ex.: resposta inválida)
         return f"⚠️ Ocorreu um erro: {e}"
+
+async def _preco_indexado(symbol):
+    # Com o índice, o par certo é conhecido à partida: no máximo um pedido.
+    cotacoes = _indice.get(symbol)
+    if cotacoes is None:
+        parecidas = sugestoes(symbol)
+        if parecidas:
+            return f"⚠️ Moeda '{symbol}' não encontrada. Querias dizer: {', '.join(parecidas)}?"
+        return f"⚠️ Moeda '{symbol}' não encontrada."
+
+    for cotacao in COTACOES:
+        if cotacao in cotacoes:
+            preco = await _preco_par(symbol, cotacao)
+            if preco is None:
+                break  # O par saiu da Binance depois da última atualização do índice
+            if cotacao == "EUR":
+                return f"💶 {symbol}: {preco:.8f} EUR"
+            return f"💲 {symbol}: {preco:.8f} USD"
+    return f"⚠️ Moeda '{symbol}' não tem par em EUR nem USDT."
+
+async def preco_atual(symbol):
+    """
+    Cotação e preço do par preferido de uma moeda (EUR e depois USDT), ou None
+    se não tiver nenhum. Usa a cache, como o !crypto.
+    """
+    cotacoes = _indice.get(symbol, ()) if _indice else COTACOES
+    for cotacao in COTACOES:
+        if cotacao in cotacoes:
+            preco = await _preco_par(symbol, cotacao)
+            if preco is not None:
+                return cotacao, preco
+    return None
+
+# Consulta o preço de uma criptomoeda
+@comando("!crypto", min_args=1, uso="!crypto <símbolo>", descricao="Mostra o preço atual de uma criptomoeda.",
+         agrupar=True)
+async def cmd_crypto(bot, source, args, canal):
+    resultado = await get_crypto_price(args[0])
+    bot.message(canal, resultado)
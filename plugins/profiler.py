@@ -0,0 +1,263 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      profiler.py                                                       #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Perfis do bot em execução, pedidos por um admin no IRC:           #
+#                !profile cpu 30 (amostragem das pilhas do event loop com o        #
+#                temporizador SIGPROF), !profile mem 30 (tracemalloc durante a     #
+#                janela) e !profile tasks (tarefas asyncio vivas e onde estão      #
+#                paradas). O resultado completo vai para ficheiro e o admin        #
+#                recebe um resumo com os N primeiros. Desligado não há             #
+#                temporizador, hooks nem threads: nada custa enquanto não se pede  #
+#                um perfil.                                                        #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import collections
+import os
+import signal
+import threading
+import time
+import tracemalloc
+
+from logger import obter_logger
+from config import PERFIL_PASTA, PERFIL_AMOSTRAGEM, PERFIL_MAX_SEGUNDOS, PERFIL_TOP
+from plugins.registry import comando
+
+logger = obter_logger("perfil")
+
+# Duração por defeito (segundos) do perfil de CPU e de memória
+DURACAO = 30
+
+# Tarefas destacadas no !profile tasks (comandos e reconexões que podem ficar presos)
+TAREFAS_VIGIADAS = ("executar_comando", "_executar_agrupado", "reconectar")
+
+# Perfil em curso (só um de cada vez); lido de globals() para sobreviver a um !reload
+_em_curso = globals().get("_em_curso", None)
+
+def _ficheiro(tipo, extensao):
+    os.makedirs(PERFIL_PASTA, exist_ok=True)
+    return os.path.join(PERFIL_PASTA, f"{tipo}-{time.strftime('%Y%m%d-%H%M%S')}.{extensao}")
+
+def _local(codigo):
+    # "bot.py:on_pubmsg" (o caminho completo fica só nos ficheiros)
+    return f"{os.path.basename(codigo.co_filename)}:{getattr(codigo, 'co_qualname', codigo.co_name)}"
+
+def _percentagem(parte, total):
+    return f"{100 * parte / total:.0f}%" if total else "-"
+
+# ================================================================================ #
+# ------------------------------------- CPU -------------------------------------- #
+# ================================================================================ #
+
+def _em_espera(pilha):
+    # O event loop parado no select/epoll: a CPU dessa amostra foi gasta noutra thread
+    return os.path.basename(pilha[-1].co_filename) == "selectors.py"
+
+async def perfil_cpu(segundos):
+    """
+    Amostra o event loop durante 'segundos' com SIGPROF: o temporizador conta
+    tempo de CPU, e o handler corre na thread principal e vê a pilha que foi
+    interrompida, sem o desvio de uma thread de amostragem (que só apanha o
+    GIL quando o loop o larga, no select). Grava as pilhas no formato
+    "a;b;c contagem" (flamegraph.pl, speedscope) e devolve as linhas do resumo.
+    """
+    if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        return ["ℹ️ O perfil de CPU precisa de signal.setitimer (Linux/Unix) e do bot na thread principal."]
+
+    pilhas = collections.Counter()
+    def amostra(signum, frame):
+        pilha = []
+        while frame is not None:
+            pilha.append(frame.f_code)
+            frame = frame.f_back
+        pilhas[tuple(reversed(pilha))] += 1
+
+    anterior = signal.signal(signal.SIGPROF, amostra)
+    cpu, inicio = time.process_time(), time.monotonic()
+    signal.setitimer(signal.ITIMER_PROF, PERFIL_AMOSTRAGEM, PERFIL_AMOSTRAGEM)
+    try:
+        await asyncio.sleep(segundos)
+    finally:
+        # Desligado, o bot volta a não ter temporizador nem handler
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, anterior)
+    cpu = _percentagem(time.process_time() - cpu, time.monotonic() - inicio)
+    total = sum(pilhas.values())
+    espera = sum(n for pilha, n in pilhas.items() if _em_espera(pilha))
+
+    caminho = _ficheiro("cpu", "folded")
+    proprio = collections.Counter()     # Amostras em que a função estava no topo da pilha
+    inclusivo = collections.Counter()   # Amostras em que a função estava na pilha
+    with open(caminho, "w", encoding="utf-8") as f:
+        for pilha, n in pilhas.most_common():
+            f.write(";".join(_local(codigo) for codigo in pilha) + f" {n}\n")
+            if _em_espera(pilha):
+                continue
+            proprio[_local(pilha[-1])] += n
+            for local in {_local(codigo) for codigo in pilha}:
+                inclusivo[local] += n
+    logger.info(f"Perfil de CPU ({total} amostras) gravado em {caminho}")
+
+    ocupado = total - espera
+    # As funções do próprio asyncio estão em todas as pilhas: no resumo interessam as do bot
+    inclusivo = [(local, n) for local, n in inclusivo.most_common()
+                 if not local.startswith(("base_events.py", "runners.py", "events.py", "bot.py:main"))
+                 and not local.endswith(":<module>")]
+    linhas = [f"🔥 CPU {segundos:g}s: processo a {cpu} de um núcleo, {total} amostras "
+              f"({_percentagem(ocupado, total)} no event loop). Pilhas em {caminho}"]
+    if ocupado:
+        linhas.append("Topo: " + ", ".join(f"{local} {_percentagem(n, ocupado)}"
+                                           for local, n in proprio.most_common(PERFIL_TOP)))
+        linhas.append("Inclusivo: " + ", ".join(f"{local} {_percentagem(n, ocupado)}"
+                                                for local, n in inclusivo[:PERFIL_TOP]))
+    return linhas
+
+# ================================================================================ #
+# ----------------------------------- MEMÓRIA ------------------------------------ #
+# ================================================================================ #
+
+def _comparar(depois, antes):
+    # Fora do event loop: agrupar milhões de blocos demora
+    filtros = [tracemalloc.Filter(False, tracemalloc.__file__),
+               tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+    depois, antes = depois.filter_traces(filtros), antes.filter_traces(filtros)
+    return depois.compare_to(antes, "lineno"), depois.statistics("traceback")
+
+async def perfil_mem(segundos):
+    """
+    Segue as alocações com tracemalloc durante 'segundos' (só durante a janela,
+    se não estava já ligado) e devolve as linhas que mais cresceram.
+    """
+    ligou = not tracemalloc.is_tracing()
+    if ligou:
+        tracemalloc.start(10)
+    try:
+        antes = tracemalloc.take_snapshot()
+        await asyncio.sleep(segundos)
+        depois = tracemalloc.take_snapshot()
+        atual, pico = tracemalloc.get_traced_memory()
+    finally:
+        if ligou:
+            tracemalloc.stop()
+
+    diferencas, pilhas = await asyncio.to_thread(_comparar, depois, antes)
+    caminho = _ficheiro("mem", "txt")
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(f"# Memória seguida: atual {atual} B, pico {pico} B\n\n# Crescimento por linha\n")
+        f.writelines(f"{stat}\n" for stat in diferencas[:200])
+        f.write("\n# Maiores alocações vivas, com a pilha\n")
+        for stat in pilhas[:20]:
+            f.write(f"\n{stat.count} blocos, {stat.size / 1024:.1f} KiB\n")
+            f.writelines(f"    {linha}\n" for linha in stat.traceback.format())
+    logger.info(f"Perfil de memória gravado em {caminho}")
+
+    crescimento = [stat for stat in diferencas if stat.size_diff > 0][:PERFIL_TOP]
+    linhas = [f"🧠 Memória {segundos:g}s: seguida {atual / 2 ** 20:.1f} MB (pico {pico / 2 ** 20:.1f} MB). "
+              f"Detalhes em {caminho}"]
+    if crescimento:
+        linhas.append("Cresceu: " + ", ".join(
+            f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno} "
+            f"+{stat.size_diff / 1024:.1f} KiB ({stat.count_diff:+d})" for stat in crescimento))
+    return linhas
+
+# ================================================================================ #
+# ----------------------------------- TAREFAS ------------------------------------ #
+# ================================================================================ #
+
+def _nome(tarefa):
+    coro = tarefa.get_coro()
+    return getattr(coro, "__qualname__", None) or tarefa.get_name()
+
+def _cadeia(tarefa):
+    # Frames desde a corrotina da tarefa até ao await onde está parada (cr_await)
+    frames = []
+    coro = tarefa.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+def _onde(frames):
+    if not frames:
+        return "?"
+    frame = frames[-1]
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+def perfil_tarefas(bot):
+    """
+    Lista as tarefas asyncio vivas: todas no ficheiro, com a cadeia de awaits;
+    no resumo a contagem por corrotina, os comandos a correr há mais tempo e
+    onde estão parados os comandos e as reconexões.
+    """
+    tarefas = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    caminho = _ficheiro("tasks", "txt")
+    vigiadas = []
+    with open(caminho, "w", encoding="utf-8") as f:
+        for tarefa in sorted(tarefas, key=_nome):
+            frames = _cadeia(tarefa)
+            f.write(f"{tarefa.get_name()} {_nome(tarefa)}\n")
+            f.writelines(f"    {frame.f_code.co_filename}:{frame.f_lineno} em {frame.f_code.co_name}\n"
+                         for frame in frames)
+            if _nome(tarefa).rsplit(".", 1)[-1] in TAREFAS_VIGIADAS:
+                vigiadas.append(f"{_nome(tarefa)} em {_onde(frames)}")
+    logger.info(f"Lista de {len(tarefas)} tarefas gravada em {caminho}")
+
+    contagem = collections.Counter(_nome(t).rsplit(".", 1)[-1] for t in tarefas)
+    linhas = [f"🧵 {len(tarefas)} tarefas: " + ", ".join(f"{n}× {nome}" for nome, n in
+                                                      contagem.most_common(PERFIL_TOP)) + f". Pilhas em {caminho}"]
+    a_correr = bot.entrada.em_execucao()[:PERFIL_TOP]
+    if a_correr:
+        linhas.append("A correr: " + ", ".join(f"{nome} em {alvo} há {segundos:.1f}s"
+                                               for alvo, nome, segundos in a_correr))
+    if vigiadas:
+        linhas.append("Parados: " + "; ".join(vigiadas[:PERFIL_TOP]))
+    return linhas
+
+# ================================================================================ #
+# ----------------------------------- COMANDO ------------------------------------ #
+# ================================================================================ #
+
+async def _executar(bot, source, perfil):
+    # Corre fora da fila de entrada (uma janela de 30s não prende o canal) e envia o resumo ao admin.
+    global _em_curso
+    try:
+        linhas = await perfil
+    except Exception as e:
+        logger.exception("Erro no perfil.")
+        linhas = [f"❌ O perfil falhou: {e}"]
+    finally:
+        _em_curso = None
+    for linha in linhas:
+        bot.message(source, linha)
+
+@comando("!profile", admin=True, min_args=1, uso="!profile cpu [segundos] | mem [segundos] | tasks",
+         descricao="Perfil de CPU, memória ou tarefas do bot em execução (resumo em privado).")
+async def cmd_profile(bot, source, args, canal):
+    global _em_curso
+    tipo = args[0].lower()
+    if tipo in ("tasks", "tarefas"):
+        for linha in perfil_tarefas(bot):
+            bot.message(source, linha)
+        return
+    if tipo not in ("cpu", "mem"):
+        bot.message(canal, "ℹ️ Uso correto: !profile cpu [segundos] | mem [segundos] | tasks")
+        return
+    if _em_curso is not None and not _em_curso.done():
+        bot.message(canal, "⏳ Já há um perfil em curso.")
+        return
+
+    try:
+        segundos = min(max(float(args[1]), 1), PERFIL_MAX_SEGUNDOS) if len(args) > 1 else DURACAO
+    except ValueError:
+        bot.message(canal, "ℹ️ Uso correto: !profile cpu [segundos] | mem [segundos] | tasks")
+        return
+    perfil = perfil_cpu(segundos) if tipo == "cpu" else perfil_mem(segundos)
+    _em_curso = asyncio.create_task(_executar(bot, source, perfil))
+    bot.message(canal, f"⏺️ Perfil de {tipo} durante {segundos:g}s; o resumo segue em privado para {source}.")
@@ -0,0 +1,181 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      registry.py                                                       #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Registo de comandos do bot. Cada plugin regista os seus comandos  #
+#                com o decorador @comando (nome, aliases, admin, nº de argumentos, #
+#                uso, descrição, cooldown). O despacho é uma pesquisa num dict e   #
+#                o texto do !ajuda é gerado a partir do registo. Permite também    #
+#                recarregar um plugin em execução sem perder a ligação IRC.        #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import importlib
+import os
+import sys
+from dataclasses import dataclass
+
+from logger import obter_logger
+from outbound import PRIORIDADE_ALTA, PRIORIDADE_NORMAL
+
+logger = obter_logger("plugins")
+
+@dataclass(frozen=True)
+class Comando:
+    nome: str                # Nome principal, ex.: "!kick"
+    handler: object          # async def handler(bot, source, args, canal)
+    aliases: tuple = ()      # Nomes alternativos, ex.: ("!k",)
+    admin: bool = False      # Só administradores podem usar
+    min_args: int = 0        # Número mínimo de argumentos
+    uso: str = ""            # Sintaxe mostrada no !ajuda e em caso de erro
+    descricao: str = ""      # Texto do !ajuda
+    cooldown: float = 0      # Segundos entre usos do mesmo nick (0 = sem cooldown)
+    plugin: str = ""         # Módulo que registou o comando
+    prioridade: int = PRIORIDADE_NORMAL  # Na fila de entrada cheia, os menos importantes saem primeiro
+    tempo_limite: float = 0  # Segundos até o comando ser cancelado (0 = ENTRADA_TEMPO_LIMITE, < 0 = sem limite)
+    agrupar: bool = False    # Pedidos iguais no mesmo canal, em poucos segundos, têm uma só resposta
+
+# Nome ou alias → Comando (o despacho é uma única pesquisa neste dict)
+_comandos = {}
+
+# Linhas do !ajuda, geradas apenas quando o registo muda
+_cache_ajuda = None
+
+# Durante um !reload os comandos novos ficam aqui até o import terminar com sucesso
+_em_recarga = None
+
+# Plugins que não podem ser recarregados (o próprio registo)
+NAO_RECARREGAVEIS = {"registry", "__init__"}
+
+def comando(nome, *aliases, admin=False, min_args=0, uso="", descricao="", cooldown=0,
+            prioridade=None, tempo_limite=0, agrupar=False):
+    """
+    Decorador que regista um handler como comando do bot. Sem 'prioridade', os
+    comandos de admin são de prioridade alta e os restantes de prioridade normal.
+    'agrupar' só serve para consultas: um comando de admin nunca é agrupado.
+    Exemplo:
+        @comando("!seen", min_args=1, uso="!seen <nick>", descricao="...")
+        async def cmd_seen(bot, source, args, canal): ...
+    """
+    if agrupar and admin:
+        raise ValueError(f"o comando de admin {nome} não pode ser agrupado")
+
+    def decorador(handler):
+        nivel = (PRIORIDADE_ALTA if admin else PRIORIDADE_NORMAL) if prioridade is None else prioridade
+        registar(Comando(nome, handler, aliases, admin, min_args, uso or nome,
+                         descricao, cooldown, handler.__module__, nivel, tempo_limite, agrupar))
+        return handler
+    return decorador
+
+def registar(cmd):
+    global _cache_ajuda
+    destino = _comandos if _em_recarga is None else _em_recarga
+    for nome in (cmd.nome, *cmd.aliases):
+        anterior = _comandos.get(nome)
+        if anterior is not None and anterior.plugin != cmd.plugin:
+            logger.warning(f"Comando {nome} de {anterior.plugin} substituído por {cmd.plugin}.")
+        destino[nome] = cmd
+    _cache_ajuda = None
+
+def obter(nome):
+    return _comandos.get(nome)
+
+def listar():
+    # Comandos únicos (sem repetir aliases), pela ordem de registo.
+    return list(dict.fromkeys(_comandos.values()))
+
+def linhas_ajuda():
+    global _cache_ajuda
+    if _cache_ajuda is None:
+        _cache_ajuda = ["🤖 Comandos disponíveis:"] + [
+            f"{cmd.uso} – {cmd.descricao}{' (admin apenas)' if cmd.admin else ''}"
+            for cmd in listar()
+        ]
+    return _cache_ajuda
+
+def carregar_plugins(nomes):
+    # Importa os plugins indicados (ex.: "seen,crypto"); o import regista os comandos.
+    for nome in nomes:
+        nome = nome.strip()
+        if not nome:
+            continue
+        try:
+            importlib.import_module(f"plugins.{nome}")
+        except Exception:
+            logger.exception(f"Erro ao carregar o plugin {nome}.")
+
+# ================================================================================ #
+# -------------------------- RECARREGAR PLUGINS A QUENTE ------------------------- #
+# ================================================================================ #
+
+def recarregar_plugin(nome):
+    """
+    Volta a executar plugins.<nome> no próprio módulo e troca os seus comandos
+    de uma só vez. O estado que o plugin guarda com globals().get(...) mantém-se.
+    Se o novo código falhar, a versão anterior continua ativa e o erro é lançado.
+    Devolve o número de comandos registados pelo plugin.
+    """
+    global _comandos, _em_recarga, _cache_ajuda
+    if nome in NAO_RECARREGAVEIS:
+        raise ValueError(f"o plugin {nome} não pode ser recarregado")
+    modulo_nome = f"plugins.{nome}"
+
+    modulo = sys.modules.get(modulo_nome)
+    copia = dict(modulo.__dict__) if modulo is not None else None
+    _em_recarga = {}
+    try:
+        if modulo is None:
+            importlib.import_module(modulo_nome)  # Plugin novo: primeiro carregamento
+        else:
+            importlib.reload(modulo)
+    except BaseException:
+        if modulo is not None:
+            # Repõe exatamente o módulo anterior (funções e estado)
+            modulo.__dict__.clear()
+            modulo.__dict__.update(copia)
+        else:
+            sys.modules.pop(modulo_nome, None)
+        raise
+    finally:
+        novos, _em_recarga = _em_recarga, None
+
+    # Troca atómica: sai tudo o que era deste plugin, entra o que acabou de registar
+    restantes = {k: cmd for k, cmd in _comandos.items() if cmd.plugin != modulo_nome}
+    _comandos = {**restantes, **novos}
+    _cache_ajuda = None
+    logger.info(f"Plugin {nome} recarregado ({len(set(novos.values()))} comandos).")
+    return len(set(novos.values()))
+
+def _ficheiros_plugins():
+    # plugin → data de modificação do ficheiro, para os plugins carregados.
+    datas = {}
+    for modulo_nome, modulo in list(sys.modules.items()):
+        if not modulo_nome.startswith("plugins.") or modulo is None:
+            continue
+        nome = modulo_nome.split(".", 1)[1]
+        ficheiro = getattr(modulo, "__file__", None)
+        if nome in NAO_RECARREGAVEIS or not ficheiro:
+            continue
+        try:
+            datas[nome] = os.stat(ficheiro).st_mtime
+        except OSError:
+            pass
+    return datas
+
+async def vigiar_plugins(intervalo=2):
+    # Modo de vigilância: recarrega um plugin sempre que o ficheiro muda.
+    conhecidas = _ficheiros_plugins()
+    while True:
+        await asyncio.sleep(intervalo)
+        atuais = _ficheiros_plugins()
+        for nome, data in atuais.items():
+            if nome in conhecidas and data != conhecidas[nome]:
+                try:
+                    recarregar_plugin(nome)
+                except Exception:
+                    logger.exception(f"Erro ao recarregar o plugin {nome}; mantém-se a versão anterior.")
+        conhecidas = atuais
@@ -2,50 +2,348 @@
 #                                                                                  #
 # Ficheiro:      seen.py                                                           #
 # Autor:         NunchuckCoder                                                     #
-# Versão:        1.0                                                               #
-# Data:          Julho 2025                                                        #
-# Descrição:     Módulo responsável por registar e consultar a última vez que      #
-#                um utilizador foi visto no IRC. Usa uma base de dados SQLite      #
-#                simples para armazenamento persistente.                           #
+# Versão:        2.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Histórico de atividade dos utilizadores no IRC: para cada nick    #
+#                guarda a última ação (mensagem, entrada, saída, quit, mudança de  #
+#                nick, kick), o canal, a mensagem e o instante (epoch), mais os    #
+#                nicks usados por cada pessoa. Usa SQLite com escrita diferida     #
+#                em lote, índices para pesquisas por prefixo (!seen foo*) sem      #
+#                distinguir maiúsculas e uma limpeza periódica que limita o        #
+#                tamanho da base de dados.                                         #
 # Licença:       MIT License                                                       #
 #                                                                                  #
 # ================================================================================ #
 
+import asyncio
+import atexit
+import fnmatch
 import os
 import sqlite3
-from datetime import datetime
+import time
+
+from irc.strings import lower  # Minúsculas segundo o IRC: "[Nick]" e "{nick}" são o mesmo
+
+import metrics
+from logger import obter_logger
+from config import (SEEN_FLUSH_INTERVALO, SEEN_FLUSH_LIMITE, SEEN_DB, SEEN_RETENCAO_DIAS,
+                    SEEN_MAX_REGISTOS, SEEN_LIMPEZA_INTERVALO)
+from plugins.registry import comando
+
+logger = obter_logger("seen")
 
 # Caminho para a base de dados SQLite
-DB_PATH = "db/seen.db"
+DB_PATH = SEEN_DB
+
+# Tamanho máximo guardado de cada mensagem
+MAX_MENSAGEM = 200
+
+# Uma pesquisa com * lê no máximo este número de nicks candidatos (mantém-na em ms)
+MAX_CANDIDATOS = 1000
+
+# Linhas apagadas por transação na limpeza (o event loop respira entre lotes)
+LOTE_LIMPEZA = 1000
+
+# Depois de uma gravação falhar, o log_seen espera antes de tentar outra vez
+# (o dobro a cada falha seguida, até este máximo em segundos)
+MAX_ESPERA_FLUSH = 300
+
+# O estado lê-se de globals() para sobreviver a um !reload do plugin.
+# Atividade ainda por gravar: chave do nick → (nick, instante, ação, canal, mensagem).
+# Várias ações do mesmo nick entre gravações ocupam uma só entrada.
+_atividade = globals().get("_atividade", {})
+
+# Mudanças de nick por gravar: (chave antiga, chave nova, instante)
+_apelidos = globals().get("_apelidos", [])
+
+# Ligação única e persistente à base de dados (modo WAL)
+_conn = globals().get("_conn", None)
+
+# Falhas seguidas a gravar e instante (monotonic) a partir do qual o log_seen volta a tentar
+_falhas = globals().get("_falhas", 0)
+_proxima_tentativa = globals().get("_proxima_tentativa", 0.0)
+
+def _formatar(instante):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(instante))
+
+def _ha(segundos):
+    # 42 → "42s", 5400 → "1h30m", 200000 → "2d7h"
+    segundos = int(max(0, segundos))
+    if segundos < 60:
+        return f"{segundos}s"
+    if segundos < 3600:
+        return f"{segundos // 60}min"
+    if segundos < 86400:
+        return f"{segundos // 3600}h{segundos % 3600 // 60:02d}m"
+    return f"{segundos // 86400}d{segundos % 86400 // 3600}h"
+
+def _ligacao():
+    # Abre (uma única vez) a ligação à base de dados em modo WAL.
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+        _conn = sqlite3.connect(DB_PATH)
+        # Tem de vir antes de criar tabelas para o incremental_vacuum funcionar
+        _conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+    return _conn
 
 def init_db():
-    # Inicializa a base de dados, criando a tabela 'seen' se não existir.
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("CREATE TABLE IF NOT EXISTS seen (nick TEXT PRIMARY KEY, last_seen TEXT)")
-        conn.commit()
-
-def log_seen(nick):
-    # Regista a última vez que o utilizador foi visto.
-    conn = sqlite3.connect(DB_PATH)
+    # Cria as tabelas (e converte a tabela 'seen' antiga, se existir).
+    conn = _ligacao()
+    with conn:
+        # Uma linha por nick; a chave em minúsculas IRC serve as pesquisas exatas e por prefixo
+        conn.execute("""CREATE TABLE IF NOT EXISTS atividade (
+                            chave TEXT PRIMARY KEY,
+                            nick TEXT NOT NULL,
+                            instante REAL NOT NULL,
+                            acao TEXT NOT NULL,
+                            canal TEXT,
+                            mensagem TEXT
+                        ) WITHOUT ROWID""")
+        conn.execute("CREATE INDEX IF NOT EXISTS atividade_instante ON atividade (instante)")
+        # Nicks usados pela mesma pessoa (guardados nos dois sentidos)
+        conn.execute("""CREATE TABLE IF NOT EXISTS apelidos (
+                            chave TEXT NOT NULL,
+                            outra TEXT NOT NULL,
+                            instante REAL NOT NULL,
+                            PRIMARY KEY (chave, outra)
+                        ) WITHOUT ROWID""")
+        conn.execute("CREATE INDEX IF NOT EXISTS apelidos_instante ON apelidos (instante)")
+    _migrar(conn)
+
+def _migrar(conn):
+    # Versão 1.x: tabela seen (nick, last_seen TEXT em hora local)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='seen'").fetchone():
+        return
+    linhas = []
+    for nick, texto in conn.execute("SELECT nick, last_seen FROM seen"):
+        try:
+            instante = time.mktime(time.strptime(texto, "%Y-%m-%d %H:%M:%S"))
+        except (TypeError, ValueError):
+            continue
+        linhas.append((lower(nick), nick, instante, "visto", None, None))  # Sem canal nem ação
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO atividade VALUES (?, ?, ?, ?, ?, ?)", linhas)
+        conn.execute("DROP TABLE seen")
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("VACUUM")  # Aplica o auto_vacuum incremental à base de dados existente
+    logger.info(f"Tabela seen antiga convertida: {len(linhas)} nicks.")
+
+# ================================================================================ #
+# ------------------------------- REGISTO DE ATIVIDADE --------------------------- #
+# ================================================================================ #
+
+def log_seen(nick, acao="msg", canal=None, mensagem=None):
+    # Regista a última ação do utilizador (apenas em memória).
+    if mensagem is not None and len(mensagem) > MAX_MENSAGEM:
+        mensagem = mensagem[:MAX_MENSAGEM - 1] + "…"
+    _atividade[lower(nick)] = (nick, time.time(), acao, canal, mensagem)
+    if len(_atividade) >= SEEN_FLUSH_LIMITE and time.monotonic() >= _proxima_tentativa:
+        flush_db()
+
+def log_nick(antigo, novo):
+    # Mudança de nick: a ação fica nos dois nicks e cada um passa a ser apelido do outro.
+    log_seen(antigo, "nick", mensagem=novo)
+    log_seen(novo, "nick", mensagem=antigo)
+    _apelidos.append((lower(antigo), lower(novo), time.time()))
+
+def flush_db():
+    # Grava todas as atualizações pendentes numa única transação.
+    global _falhas, _proxima_tentativa
+    if not _atividade and not _apelidos:
+        return
+    lote = [(chave,) + valor for chave, valor in _atividade.items()]
+    apelidos = [(a, b, t) for a, b, t in _apelidos] + [(b, a, t) for a, b, t in _apelidos]
+    copia, copia_apelidos = dict(_atividade), list(_apelidos)
+    _atividade.clear()
+    _apelidos.clear()
+    inicio = time.perf_counter()
     try:
-        c = conn.cursor()
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.execute("INSERT OR REPLACE INTO seen (nick, last_seen) VALUES (?, ?)", (nick, now))
-        conn.commit()
-    finally:
-        conn.close()
+        conn = _ligacao()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO atividade VALUES (?, ?, ?, ?, ?, ?)", lote)
+            conn.executemany("INSERT OR REPLACE INTO apelidos VALUES (?, ?, ?)", apelidos)
+        metrics.observar("seen_flush_segundos", time.perf_counter() - inicio)
+        _falhas, _proxima_tentativa = 0, 0.0
+    except sqlite3.Error as e:
+        _falhas += 1
+        espera = min(MAX_ESPERA_FLUSH, SEEN_FLUSH_INTERVALO * 2 ** (_falhas - 1))
+        _proxima_tentativa = time.monotonic() + espera
+        logger.error(f"Erro ao gravar {len(lote)} registos do seen (nova tentativa em {espera:g}s): {e}")
+        # Devolve ao mapa o que falhou, sem apagar atualizações mais recentes
+        for chave, valor in copia.items():
+            _atividade.setdefault(chave, valor)
+        _apelidos[:0] = copia_apelidos
+
+async def flush_periodico(intervalo=SEEN_FLUSH_INTERVALO):
+    # Tarefa de fundo que grava o mapa pendente a cada 'intervalo' segundos.
+    while True:
+        await asyncio.sleep(intervalo)
+        flush_db()
+
+def close_db():
+    # Grava o que falta e fecha a ligação (usado no encerramento do bot).
+    global _conn
+    flush_db()
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+
+# Garante que nada fica por gravar mesmo numa saída via sys.exit()
+# (registado uma só vez, mesmo que o plugin seja recarregado)
+if not globals().get("_atexit_registado"):
+    atexit.register(close_db)
+    _atexit_registado = True
+
+# ================================================================================ #
+# ------------------------------ RETENÇÃO E COMPACTAÇÃO -------------------------- #
+# ================================================================================ #
+
+def _apagar_lote(conn, tabela, colunas, limite):
+    # Apaga até LOTE_LIMPEZA linhas com instante < limite; devolve quantas apagou.
+    with conn:
+        cursor = conn.execute(
+            f"DELETE FROM {tabela} WHERE ({colunas}) IN "
+            f"(SELECT {colunas} FROM {tabela} WHERE instante < ? LIMIT ?)", (limite, LOTE_LIMPEZA))
+    return cursor.rowcount
+
+async def limpar(agora=None):
+    """
+    Apaga a atividade mais antiga que SEEN_RETENCAO_DIAS e o excesso acima de
+    SEEN_MAX_REGISTOS, em lotes pequenos, e devolve o espaço libertado ao disco.
+    """
+    flush_db()
+    conn = _ligacao()
+    agora = time.time() if agora is None else agora
+    inicio = time.perf_counter()
+    apagados = 0
+
+    limites = []
+    if SEEN_RETENCAO_DIAS > 0:
+        limites.append(agora - SEEN_RETENCAO_DIAS * 86400)
+    if SEEN_MAX_REGISTOS > 0:
+        # Instante do N-ésimo registo mais recente (percorre o índice de instante)
+        linha = conn.execute("SELECT instante FROM atividade ORDER BY instante DESC LIMIT 1 OFFSET ?",
+                             (SEEN_MAX_REGISTOS,)).fetchone()
+        if linha:
+            limites.append(linha[0] + 1e-6)
+    if limites:
+        limite = max(limites)
+        for tabela, colunas in (("atividade", "chave"), ("apelidos", "chave, outra")):
+            while True:
+                n = _apagar_lote(conn, tabela, colunas, limite)
+                apagados += n
+                if n < LOTE_LIMPEZA:
+                    break
+                await asyncio.sleep(0)
+
+    if apagados:
+        conn.execute("PRAGMA incremental_vacuum").fetchall()  # Liberta uma página por linha lida
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    metrics.observar("seen_limpeza_segundos", time.perf_counter() - inicio)
+    logger.info(f"Limpeza do seen: {apagados} registos apagados.")
+    return apagados
+
+async def limpeza_periodica(intervalo=SEEN_LIMPEZA_INTERVALO):
+    # Tarefa de fundo que aplica a retenção a cada 'intervalo' segundos.
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await limpar()
+        except sqlite3.Error as e:
+            logger.error(f"Erro na limpeza do seen: {e}")
+
+# ================================================================================ #
+# ------------------------------------ CONSULTAS --------------------------------- #
+# ================================================================================ #
+
+def procurar(padrao, limite=5):
+    """
+    Nicks que correspondem ao padrão (* e ? como no IRC), do mais recente para o
+    mais antigo: [(nick, instante, ação, canal, mensagem), ...]. O padrão tem de
+    começar por letras para a pesquisa usar o índice. O que ainda está por
+    gravar vem do mapa em memória, que é sempre mais recente que a base de dados.
+    """
+    chave = lower(padrao)
+    conn = _ligacao()
+    if "*" not in chave and "?" not in chave:
+        pendente = _atividade.get(chave)
+        if pendente is not None:
+            return [pendente]
+        linha = conn.execute("SELECT nick, instante, acao, canal, mensagem FROM atividade WHERE chave=?",
+                             (chave,)).fetchone()
+        return [linha] if linha else []
+    # As minúsculas IRC não têm [ ], por isso só * e ? são especiais para o GLOB
+    linhas = {lower(linha[0]): linha for linha in conn.execute(
+        "SELECT nick, instante, acao, canal, mensagem FROM "
+        "(SELECT * FROM atividade WHERE chave GLOB ? LIMIT ?) ORDER BY instante DESC LIMIT ?",
+        (chave, MAX_CANDIDATOS, limite))}
+    linhas.update((k, v) for k, v in _atividade.items() if fnmatch.fnmatchcase(k, chave))
+    return sorted(linhas.values(), key=lambda linha: linha[1], reverse=True)[:limite]
+
+def apelidos(nick, limite=5):
+    # Outros nicks usados por quem usa 'nick', do mais recente para o mais antigo.
+    chave = lower(nick)
+    # Primeiro as trocas ainda por gravar (as mais recentes estão no fim da lista)
+    outras = {}
+    for a, b, _ in reversed(_apelidos):
+        outra = b if a == chave else a if b == chave else None
+        if outra is not None and outra not in outras:
+            outras[outra] = _atividade.get(outra, (outra,))[0]
+    for outra, nome in _ligacao().execute(
+            "SELECT a.chave, a.nick FROM apelidos p JOIN atividade a ON a.chave = p.outra "
+            "WHERE p.chave=? ORDER BY p.instante DESC LIMIT ?", (chave, limite)):
+        outras.setdefault(outra, _atividade.get(outra, (nome,))[0])
+    return list(outras.values())[:limite]
+
+def _descrever(acao, canal, mensagem):
+    if acao == "msg":
+        return f"em {canal} a dizer: {mensagem}" if canal else "a falar em privado"
+    if acao == "action":
+        return f"em {canal}: * {mensagem}"
+    if acao == "join":
+        return f"a entrar em {canal}"
+    if acao == "part":
+        return f"a sair de {canal}" + (f" ({mensagem})" if mensagem else "")
+    if acao == "kick":
+        return f"a ser expulso de {canal}" + (f" ({mensagem})" if mensagem else "")
+    if acao == "quit":
+        return "a sair do IRC" + (f" ({mensagem})" if mensagem else "")
+    if acao == "nick":
+        return f"a trocar de nick com {mensagem}"
+    return ""
 
 def get_seen(nick):
-    # Obtém a última vez que o utilizador foi visto.
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        c = conn.cursor()
-        c.execute("SELECT last_seen FROM seen WHERE nick=?", (nick,))
-        row = c.fetchone()
-        if row:
-            return f"{nick} foi visto pela última vez em {row[0]}"
+    # Resposta do !seen: detalhe para um nick, lista curta para um padrão.
+    agora = time.time()
+    if "*" in nick or "?" in nick:
+        if len(nick.split("*")[0].split("?")[0]) < 2:
+            return "Indica pelo menos 2 letras antes de * ou ? (ex.: !seen ana*)."
+        linhas = procurar(nick)
+        if not linhas:
+            return f"Nenhum nick corresponde a {nick}."
+        return "Encontrados: " + ", ".join(
+            f"{n} (há {_ha(agora - t)}" + (f" em {c})" if c else ")") for n, t, _, c, _ in linhas)
+
+    linhas = procurar(nick)
+    if not linhas:
         return f"{nick} nunca foi visto."
-    finally:
-        conn.close()
+    nome, instante, acao, canal, mensagem = linhas[0]
+    texto = f"{nome} foi visto há {_ha(agora - instante)} ({_formatar(instante)})"
+    descricao = _descrever(acao, canal, mensagem)
+    if descricao:
+        texto += " " + descricao
+    outros = apelidos(nick)
+    if outros:
+        texto += f" — também usou: {', '.join(outros)}"
+    return texto
+
+# Consulta quando foi a última vez que um nick foi visto
+@comando("!seen", min_args=1, uso="!seen <nick|padrão*>", agrupar=True,
+         descricao="Informa quando, onde e a fazer o quê um nick foi visto.")
+async def cmd_seen(bot, source, args, canal):
+    bot.message(canal, get_seen(args[0]))
+
+init_db()  # Garante que a base de dados está inicializada
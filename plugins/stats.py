@@ -0,0 +1,60 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      stats.py                                                          #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Comando !stats: resumo das métricas internas do bot (latência     #
+#                de comandos e handlers, atraso do event loop, linhas IRC, cache   #
+#                do crypto e pedidos ao Telegram/Binance). Requer METRICAS=true.   #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import metrics
+from plugins import crypto
+from plugins.registry import comando
+
+def _ms(segundos):
+    return f"{segundos * 1000:.1f}ms"
+
+def _percentis(hist):
+    # "p50/p99 (n)" de um histograma, ou "-" se ainda não houver valores
+    if hist is None or not hist.total:
+        return "-"
+    return f"p50 {_ms(hist.quantil(0.5))} p99 {_ms(hist.quantil(0.99))} ({hist.total})"
+
+def _juntar(nome):
+    # Junta todos os histogramas de uma métrica (ex.: todos os comandos)
+    total = metrics.Histograma()
+    for _, hist in metrics.histogramas(nome):
+        total.contagens = [a + b for a, b in zip(total.contagens, hist.contagens)]
+        total.soma += hist.soma
+        total.total += hist.total
+    return total
+
+def linhas_stats():
+    cache = crypto.estatisticas()
+    pedidos = cache["hits"] + cache["misses"]
+    taxa = f"{100 * cache['hits'] / pedidos:.0f}%" if pedidos else "-"
+    bloqueados = sum(v for _, v in metrics.contadores("irc_comandos_bloqueados_total"))
+    return [
+        f"📊 IRC: {metrics.contador('irc_linhas_recebidas_total')} linhas recebidas, "
+        f"{metrics.contador('irc_linhas_enviadas_total')} enviadas, {bloqueados} comandos bloqueados",
+        f"⏱️ Comandos: {_percentis(_juntar('irc_comando_segundos'))} | "
+        f"Handlers: {_percentis(_juntar('irc_handler_segundos'))}",
+        f"🔁 Event loop: atraso {_percentis(metrics.histograma('loop_atraso_segundos'))} | "
+        f"Fila de saída: {_percentis(metrics.histograma('irc_saida_atraso_segundos'))}",
+        f"🌐 Binance: {_percentis(metrics.histograma('binance_pedido_segundos'))}, cache {taxa} | "
+        f"Telegram: {_percentis(metrics.histograma('telegram_pedido_segundos'))} | "
+        f"seen: {_percentis(metrics.histograma('seen_flush_segundos'))}",
+    ]
+
+# Resumo das métricas internas
+@comando("!stats", admin=True, uso="!stats", descricao="Mostra as métricas de desempenho do bot.", cooldown=10)
+async def cmd_stats(bot, source, args, canal):
+    if not metrics.ATIVAS:
+        bot.message(canal, "ℹ️ As métricas estão desligadas (METRICAS=true para ativar).")
+        return
+    for linha in linhas_stats():
+        bot.message(canal, linha)
@@ -1,63 +1,466 @@
-# ================================================================================ #
-#                                                                                  #
-# Ficheiro:      telegram.py                                                       #
-# Autor:         NunchuckCoder                                                     #
-# Versão:        1.0                                                               #
-# Data:          Julho 2025                                                        #
-# Descrição:     Integração do bot com o Telegram. Responsável por enviar          #
-#                notificações e alertas (entradas/saídas, erros, avisos) para      #
-#                o chat configurado, usando a API oficial de bots do Telegram.     #
-# Licença:       MIT License                                                       #
-#                                                                                  #
-# ================================================================================ #
-
-import requests
-from logger import logger
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
-
-# Cria uma sessão HTTP persistente (em vez de abrir uma ligação nova a cada pedido),
-# o que melhora a performance quando há muitos envios de mensagens.
-session = requests.Session()
-session.headers.update({'Content-Type': 'application/x-www-form-urlencoded'})
-
-# ================================================================================ #
-# ------------------ MENSAGEM PARA TELEGRAM USANDO API DOS BOTS ------------------ #
-# ================================================================================ #
-
-def enviar_telegram(mensagem):
-    """
-    Envia uma mensagem para o Telegram usando a API de bots.
-    """
-    # Verifica se o token e o chat ID foram configurados
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        logger.warning("Token ou Chat ID do Telegram não estão definidos.")
-        return
-
-    # Endpoint da API oficial do Telegram para envio de mensagens
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    
-    # Dados do pedido: para quem enviar, texto, formato e opções
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,     # ID do utilizador/grupo de destino
-        "text": mensagem,                # Mensagem propriamente dita
-        "parse_mode": "HTML",            # Permite usar formatação HTML
-        "disable_web_page_preview": True # Impede mostrar pré-visualizações de links
-    }
-
-    try:
-        # Log detalhado antes de enviar
-        logger.debug(f"Enviando para Telegram: {mensagem}")
-        
-        # Envia a mensagem via POST com timeout de 5 segundos
-        response = session.post(url, data=payload, timeout=5)
-
-        # Verifica se o envio foi bem-sucedido
-        if response.ok:
-            logger.info("✅ Mensagem enviada para o Telegram com sucesso.")
-        else:
-            logger.error(f"❌ Erro ao enviar mensagem para o Telegram. "
-                         f"Status: {response.status_code}, Detalhes: {response.text}")
-
-    except requests.RequestException as e:
-        # Captura qualquer erro de rede ou exceção do requests
-        logger.exception(f"[Telegram] Exceção ao tentar enviar mensagem: {e}")
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      telegram.py                                                       #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.2                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Integração do bot com o Telegram. Responsável por enviar          #
+#                notificações e alertas (entradas/saídas, erros, avisos) para      #
+#                o chat configurado, usando a API oficial de bots do Telegram.     #
+#                Os envios passam por uma fila assíncrona: os handlers IRC nunca   #
+#                esperam pela API, rajadas de alertas são juntas numa só           #
+#                mensagem e os limites de envio por chat são respeitados.          #
+#                Ponte nos dois sentidos (TELEGRAM_PONTES): as mensagens dos       #
+#                chats chegam por long polling (getUpdates) aos canais IRC, os     #
+#                /comandos passam pelo mesmo despacho do IRC, e as linhas dos      #
+#                canais vão para o chat acrescentadas (editMessageText) à mesma    #
+#                mensagem.                                                         #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import collections
+import html
+import os
+import re
+import time
+
+import aiohttp
+import requests
+from irc.strings import lower
+
+import metrics
+from plugins import admin, commands  # Os /comandos do Telegram usam o mesmo despacho do IRC
+from logger import obter_logger
+from outbound import espaco_privmsg, partir_bytes  # As linhas da ponte cabem nos 512 bytes do IRC
+from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_API_URL
+from config import TELEGRAM_FILA_MAX, TELEGRAM_JANELA, TELEGRAM_INTERVALO, TELEGRAM_TENTATIVAS
+from config import (TELEGRAM_PONTES, TELEGRAM_ADMINS, TELEGRAM_POLL_TIMEOUT, TELEGRAM_OFFSET_FICHEIRO,
+                    TELEGRAM_EDITAR_JANELA)
+
+logger = obter_logger("telegram")
+
+# Cria uma sessão HTTP persistente (em vez de abrir uma ligação nova a cada pedido),
+# o que melhora a performance quando há muitos envios de mensagens.
+# É usada apenas quando não existe event loop (ex.: erro fatal antes/depois do asyncio.run).
+session = requests.Session()
+session.headers.update({'Content-Type': 'application/x-www-form-urlencoded'})
+
+# Tamanho máximo de uma mensagem na API do Telegram
+LIMITE_TEXTO = 4096
+
+# O estado lê-se de globals() para sobreviver a um !reload do plugin.
+# Fila de saída: (chat_id, texto). Com maxlen, os alertas mais antigos caem primeiro.
+_fila = globals().get("_fila", collections.deque(maxlen=TELEGRAM_FILA_MAX))
+_tarefa = globals().get("_tarefa", None)  # Tarefa de fundo que esvazia a fila
+_sessao = globals().get("_sessao", None)  # aiohttp.ClientSession partilhada (pool de ligações)
+_ultimo_envio = globals().get("_ultimo_envio", {})  # chat_id → instante do último envio (limite por chat)
+descartadas = globals().get("descartadas", 0)  # Número de alertas perdidos por a fila estar cheia
+
+# Lido pelo endpoint de métricas
+metrics.registar_coletor("telegram", lambda: [("telegram_fila", {}, len(_fila)),
+                                              ("telegram_descartadas", {}, descartadas)])
+
+def _url(metodo):
+    return f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/{metodo}"
+
+def _payload(chat_id, mensagem):
+    # Dados do pedido: para quem enviar, texto, formato e opções
+    return {
+        "chat_id": chat_id,              # ID do utilizador/grupo de destino
+        "text": mensagem,                # Mensagem propriamente dita
+        "parse_mode": "HTML",            # Permite usar formatação HTML
+        "disable_web_page_preview": "true" # Impede mostrar pré-visualizações de links
+    }
+
+# ================================================================================ #
+# ------------------ MENSAGEM PARA TELEGRAM USANDO API DOS BOTS ------------------ #
+# ================================================================================ #
+
+def enviar_telegram(mensagem, chat_id=TELEGRAM_CHAT_ID):
+    """
+    Coloca uma mensagem na fila de envio para o Telegram e regressa de imediato.
+    Sem event loop em execução, envia de forma síncrona.
+    """
+    global descartadas, _tarefa
+
+    # Verifica se o token e o chat ID foram configurados
+    if not TELEGRAM_BOT_TOKEN or not chat_id:
+        logger.warning("Token ou Chat ID do Telegram não estão definidos.")
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _enviar_direto(chat_id, mensagem)
+        return
+
+    if len(_fila) == _fila.maxlen:
+        descartadas += 1
+        logger.warning("Fila do Telegram cheia: descartado o alerta mais antigo.")
+    _fila.append((chat_id, mensagem))
+    if _tarefa is None or _tarefa.done():
+        _tarefa = loop.create_task(_processar_fila())
+
+def _enviar_direto(chat_id, mensagem):
+    # Envio síncrono (bloqueante), usado apenas fora do event loop.
+    try:
+        logger.debug("Enviando para Telegram: %s", mensagem)
+        response = session.post(_url("sendMessage"), data=_payload(chat_id, mensagem), timeout=5)
+        if response.ok:
+            logger.info("✅ Mensagem enviada para o Telegram com sucesso.")
+        else:
+            logger.error(f"❌ Erro ao enviar mensagem para o Telegram. "
+                         f"Status: {response.status_code}, Detalhes: {response.text}")
+    except requests.RequestException as e:
+        # Captura qualquer erro de rede ou exceção do requests
+        logger.exception(f"[Telegram] Exceção ao tentar enviar mensagem: {e}")
+
+# ================================================================================ #
+# ---------------------------- ENVIO EM SEGUNDO PLANO ---------------------------- #
+# ================================================================================ #
+
+def _agrupar(itens):
+    """
+    Junta as mensagens por chat numa ou mais mensagens de várias linhas,
+    respeitando o limite de tamanho da API.
+    """
+    por_chat = {}
+    for chat_id, texto in itens:
+        blocos = por_chat.setdefault(chat_id, [])
+        if blocos and len(blocos[-1]) + 1 + len(texto) <= LIMITE_TEXTO:
+            blocos[-1] += "\n" + texto
+        else:
+            blocos.append(texto[:LIMITE_TEXTO])
+    return [(chat_id, texto) for chat_id, blocos in por_chat.items() for texto in blocos]
+
+async def _processar_fila(janela=TELEGRAM_JANELA):
+    # Esvazia a fila enquanto houver mensagens, juntando as que chegam em rajada.
+    while _fila:
+        # Dá tempo para a rajada terminar antes de montar a mensagem
+        await asyncio.sleep(janela)
+        itens = list(_fila)
+        _fila.clear()
+        for chat_id, texto in _agrupar(itens):
+            await _enviar_com_retentativas(chat_id, texto)
+
+def _obter_sessao():
+    global _sessao
+    if _sessao is None or _sessao.closed:
+        _sessao = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+    return _sessao
+
+async def _enviar_com_retentativas(chat_id, texto):
+    return await _chamar("sendMessage", _payload(chat_id, texto), chat_id)
+
+async def _chamar(metodo, dados, chat_id):
+    """
+    Pedido à API com o limite de envios por chat e novas tentativas. Devolve o
+    'result' da resposta, ou None se a mensagem não pôde ser entregue.
+    """
+    espera = 1
+    for tentativa in range(1, TELEGRAM_TENTATIVAS + 1):
+        # Respeita o intervalo mínimo entre envios para o mesmo chat. A vez fica
+        # reservada antes de esperar: a fila de alertas e a ponte correm em tarefas
+        # separadas e não podem ler o mesmo último envio e enviar ao mesmo tempo.
+        agora = time.monotonic()
+        vez = max(agora, _ultimo_envio.get(chat_id, 0) + TELEGRAM_INTERVALO)
+        _ultimo_envio[chat_id] = vez
+        if vez > agora:
+            await asyncio.sleep(vez - agora)
+
+        try:
+            logger.debug("Telegram %s: %s", metodo, dados.get("text"))
+            inicio = time.perf_counter()
+            async with _obter_sessao().post(_url(metodo), data=dados) as res:
+                _ultimo_envio[chat_id] = max(_ultimo_envio[chat_id], time.monotonic())
+                metrics.observar("telegram_pedido_segundos", time.perf_counter() - inicio)
+                detalhes = await res.json(content_type=None)
+                if res.status == 200:
+                    logger.info("✅ Mensagem enviada para o Telegram com sucesso.")
+                    return detalhes.get("result") or {}
+                if res.status == 429:
+                    # O Telegram indica quanto tempo esperar
+                    espera = detalhes.get("parameters", {}).get("retry_after", espera)
+                elif 400 <= res.status < 500:
+                    logger.error(f"❌ Erro ao enviar mensagem para o Telegram. "
+                                 f"Status: {res.status}, Detalhes: {detalhes}")
+                    return None  # Pedido inválido: repetir não adianta
+                else:
+                    logger.warning(f"[Telegram] Status {res.status} (tentativa {tentativa}).")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"[Telegram] Falha no envio (tentativa {tentativa}): {e}")
+
+        await asyncio.sleep(espera)
+        espera = min(espera * 2, 60)
+
+    logger.error(f"❌ Mensagem para o Telegram descartada após {TELEGRAM_TENTATIVAS} tentativas.")
+    return None
+
+async def fechar_telegram(timeout=10):
+    """
+    Entrega o que ainda está na fila (sem esperar pela janela de agrupamento)
+    e fecha a sessão HTTP. Usado no encerramento do bot.
+    """
+    global _sessao
+    try:
+        if _tarefa is not None and not _tarefa.done():
+            await asyncio.wait_for(_tarefa, timeout)
+        if _fila:
+            await asyncio.wait_for(_processar_fila(janela=0), timeout)
+        if _tarefa_ponte is not None and not _tarefa_ponte.done():
+            await asyncio.wait_for(_tarefa_ponte, timeout)
+        if any(estado["linhas"] for estado in _retransmissao.values()):
+            await asyncio.wait_for(_processar_retransmissao(janela=0), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"{len(_fila)} mensagens para o Telegram não foram entregues.")
+    finally:
+        if _sessao is not None:
+            await _sessao.close()
+            _sessao = None
+
+# ================================================================================ #
+# ----------------------------- PONTE TELEGRAM ↔ IRC ----------------------------- #
+# ================================================================================ #
+
+# Uma mensagem do Telegram dá no máximo estas linhas no canal (linhas longas são
+# partidas pelo limite de 512 bytes do IRC e cada pedaço conta como uma linha)
+MAX_LINHAS_IRC = 4
+
+# Linhas de um canal à espera de seguir para o chat (as mais antigas caem primeiro)
+MAX_LINHAS_PONTE = 500
+
+# Cores e formatação do IRC (\x03NN,NN, negrito, ...) que não fazem sentido no Telegram
+_FORMATACAO_IRC = re.compile(r"\x03(\d{1,2}(,\d{1,2})?)?|[\x00-\x1f]")
+
+# chat → (bot, canal) e (rede, canal em minúsculas) → chat; preenchidos por ponte(bots)
+_pontes_tg = globals().get("_pontes_tg", {})
+_pontes_irc = globals().get("_pontes_irc", {})
+
+# Por chat: linhas por entregar e a última mensagem enviada, que vai sendo editada
+# {"linhas": deque, "id": message_id, "texto": texto atual, "desde": instante do envio}
+_retransmissao = globals().get("_retransmissao", {})
+_tarefa_ponte = globals().get("_tarefa_ponte", None)  # Tarefa que entrega as linhas dos canais
+
+metrics.registar_coletor("telegram_ponte", lambda: [
+    ("telegram_ponte_pendentes", {}, sum(len(e["linhas"]) for e in _retransmissao.values()))])
+
+def _configurar_pontes(bots):
+    # "chat=#canal" usa a primeira rede; "chat=rede/#canal" escolhe a rede.
+    _pontes_tg.clear()
+    _pontes_irc.clear()
+    por_rede = {bot.rede.nome.lower(): bot for bot in bots}
+    for chat_id, destino in TELEGRAM_PONTES.items():
+        rede, _, canal = destino.rpartition("/")
+        bot = por_rede.get(rede.lower()) if rede else bots[0]
+        if bot is None or not canal:
+            logger.error("Ponte do Telegram inválida: %s=%s (rede desconhecida?)", chat_id, destino)
+            continue
+        _pontes_tg[chat_id] = (bot, canal)
+        _pontes_irc[(bot.rede.nome, lower(canal))] = chat_id
+
+# -------------------------------- IRC → Telegram -------------------------------- #
+
+def chat_da_ponte(rede, canal):
+    # Chat do Telegram ligado ao canal (None se o canal não tiver ponte)
+    return _pontes_irc.get((rede, lower(canal)))
+
+def retransmitir(rede, canal, nick, texto):
+    # Linha de um canal com ponte: segue para o chat na próxima entrega (sem esperar pela API).
+    global _tarefa_ponte
+    chat_id = _pontes_irc.get((rede, lower(canal)))
+    if chat_id is None:
+        return
+    estado = _retransmissao.get(chat_id)
+    if estado is None:
+        estado = _retransmissao[chat_id] = {"linhas": collections.deque(maxlen=MAX_LINHAS_PONTE),
+                                            "id": None, "texto": "", "desde": 0.0}
+    texto = _FORMATACAO_IRC.sub("", texto)
+    estado["linhas"].append(f"<b>{html.escape(nick)}</b>: {html.escape(texto)}")
+    if _tarefa_ponte is None or _tarefa_ponte.done():
+        _tarefa_ponte = asyncio.get_running_loop().create_task(_processar_retransmissao())
+
+async def _processar_retransmissao(janela=TELEGRAM_JANELA):
+    # Como a fila de alertas: junta o que chega durante a janela num só pedido por chat.
+    while any(estado["linhas"] for estado in _retransmissao.values()):
+        await asyncio.sleep(janela)
+        for chat_id, estado in list(_retransmissao.items()):
+            if estado["linhas"]:
+                await _entregar(chat_id, estado)
+
+async def _entregar(chat_id, estado):
+    """
+    Acrescenta as linhas novas à última mensagem do chat (editMessageText) enquanto
+    ela é recente e cabe no limite da API; senão abre uma mensagem nova. Um canal
+    movimentado custa assim um pedido por janela e não um por linha, e o chat não
+    recebe uma notificação por cada linha.
+    """
+    novas = list(estado["linhas"])
+    estado["linhas"].clear()
+    texto = estado["texto"] + "\n" + "\n".join(novas)
+    if (estado["id"] is not None and time.monotonic() - estado["desde"] < TELEGRAM_EDITAR_JANELA
+            and len(texto) <= LIMITE_TEXTO):
+        dados = _payload(chat_id, texto)
+        dados["message_id"] = estado["id"]
+        if await _chamar("editMessageText", dados, chat_id) is not None:
+            estado["texto"] = texto
+            metrics.contar("telegram_ponte_pedidos_total", metodo="editMessageText")
+            return
+
+    # Mensagem anterior cheia, antiga ou que já não se pode editar: mensagem nova
+    for _, bloco in _agrupar([(chat_id, linha) for linha in novas]):
+        resultado = await _chamar("sendMessage", _payload(chat_id, bloco), chat_id)
+        metrics.contar("telegram_ponte_pedidos_total", metodo="sendMessage")
+        if resultado:
+            estado.update(id=resultado.get("message_id"), texto=bloco, desde=time.monotonic())
+
+# -------------------------------- Telegram → IRC -------------------------------- #
+
+class BotTelegram:
+    """
+    O bot IRC visto por um comando que veio do Telegram: fila de entrada, estado
+    dos canais e moderação são os do bot da rede, mas as respostas vão para o
+    chat e a conta do remetente é a que está em TELEGRAM_ADMINS (o Telegram já
+    autenticou o utilizador; não há NickServ a quem perguntar).
+    """
+
+    def __init__(self, bot, chat_id, nick, conta):
+        self._bot = bot
+        self.chat_id = chat_id
+        self.nick = nick
+        self._conta = conta
+        self.origem = f"telegram:{chat_id}"  # Pedidos do chat não se agrupam com os do canal
+        self.contas = self                   # conta()/verificar() abaixo
+
+    def __getattr__(self, nome):
+        return getattr(self._bot, nome)
+
+    def message(self, alvo, texto, prioridade=None):
+        enviar_telegram(html.escape(texto), self.chat_id)
+
+    def comando_esgotado(self, alvo, comando):
+        # O aviso de cancelamento vai para o chat, não para o canal da ponte
+        self.message(alvo, f"⌛ {comando} demorou demasiado e foi cancelado.")
+
+    def conta(self, nick):
+        if lower(nick) == lower(self.nick):
+            return True, self._conta
+        return self._bot.contas.conta(nick)
+
+    async def verificar(self, nick, *args, **kwargs):
+        if lower(nick) == lower(self.nick):
+            return self._conta
+        return await self._bot.contas.verificar(nick, *args, **kwargs)
+
+def _remetente(utilizador):
+    # (nick, conta): o nome de TELEGRAM_ADMINS para os admins, "nome@telegram" para os outros
+    conta = TELEGRAM_ADMINS.get(str(utilizador.get("id", "")))
+    if conta:
+        return conta, conta
+    nome = utilizador.get("username") or utilizador.get("first_name") or str(utilizador.get("id", "?"))
+    return "".join(nome.split()) + "@telegram", None
+
+def _tratar(atualizacao):
+    # Uma mensagem de um chat com ponte: texto para o canal, "/comando" para o despacho.
+    mensagem = atualizacao.get("message") or {}
+    chat_id = str((mensagem.get("chat") or {}).get("id", ""))
+    utilizador = mensagem.get("from") or {}
+    texto = mensagem.get("text")
+    ponte = _pontes_tg.get(chat_id)
+    if ponte is None or not texto or utilizador.get("is_bot"):
+        return
+    bot, canal = ponte
+    nick, conta = _remetente(utilizador)
+    metrics.contar("telegram_ponte_recebidas_total")
+
+    if texto.startswith("/"):
+        _comando(BotTelegram(bot, chat_id, nick, conta), canal, texto)
+        return
+
+    # splitlines também parte em \r e afins: nada do Telegram chega ao servidor como comando IRC
+    prefixo = f"<{nick}> "
+    espaco = espaco_privmsg(canal, prefixo)
+    linhas = [pedaco for linha in texto.splitlines() if linha.strip()
+              for pedaco in partir_bytes(linha.replace("\x00", ""), espaco)]
+    for linha in linhas[:MAX_LINHAS_IRC]:
+        bot.message(canal, prefixo + linha)
+    if len(linhas) > MAX_LINHAS_IRC:
+        bot.message(canal, f"{prefixo}(+{len(linhas) - MAX_LINHAS_IRC} linhas)")
+
+def _comando(origem, canal, texto):
+    # "/seen@MeuBot ana" → "!seen ana", com as mesmas regras de um comando no canal
+    partes = texto.split()
+    comando = "!" + partes[0][1:].split("@", 1)[0].lower()
+    args = partes[1:]
+    if not admin.is_admin(origem.nick, origem.contas) and \
+            not origem.limitador.permitir(origem.nick, canal, comando):
+        logger.warning("%s excedeu o limite de comandos.", origem.nick)
+        return
+    logger.info("Comando do Telegram: %s de %s para %s com args: %s", comando, origem.nick, canal, args)
+    commands.despachar(origem, origem.nick, comando, args, canal)
+
+def _ler_offset():
+    try:
+        with open(TELEGRAM_OFFSET_FICHEIRO, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def _gravar_offset(offset):
+    # Escrita atómica (ficheiro temporário + rename): um crash nunca deixa o ficheiro a meio.
+    try:
+        os.makedirs(os.path.dirname(TELEGRAM_OFFSET_FICHEIRO) or ".", exist_ok=True)
+        temporario = TELEGRAM_OFFSET_FICHEIRO + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+        os.replace(temporario, TELEGRAM_OFFSET_FICHEIRO)
+    except OSError as e:
+        logger.error(f"Erro ao gravar o offset do Telegram: {e}")
+
+async def _obter_atualizacoes(offset):
+    # Long polling: o pedido fica aberto no servidor até chegar algo ou passar o timeout.
+    dados = {"offset": offset, "timeout": TELEGRAM_POLL_TIMEOUT, "allowed_updates": ["message"]}
+    tempo = aiohttp.ClientTimeout(total=TELEGRAM_POLL_TIMEOUT + 10)
+    async with _obter_sessao().post(_url("getUpdates"), json=dados, timeout=tempo) as res:
+        detalhes = await res.json(content_type=None)
+    if res.status == 200 and detalhes.get("ok"):
+        return detalhes.get("result") or []
+    if res.status == 429:
+        await asyncio.sleep(detalhes.get("parameters", {}).get("retry_after", 1))
+        return []
+    # 409: há um webhook ativo ou outra instância a ler as mesmas mensagens
+    raise ValueError(f"getUpdates: {res.status} {detalhes.get('description')}")
+
+async def ponte(bots):
+    """
+    Tarefa de fundo: liga os chats de TELEGRAM_PONTES aos canais e fica a ler
+    as mensagens (getUpdates) até o bot terminar. O offset é gravado antes de
+    tratar cada lote, para um reinício não repetir mensagens nos canais.
+    """
+    _configurar_pontes(bots)
+    if not _pontes_tg or not TELEGRAM_BOT_TOKEN:
+        return
+    logger.info("Ponte do Telegram ativa para %d chat(s).", len(_pontes_tg))
+
+    offset = _ler_offset()
+    espera = 1
+    while True:
+        try:
+            atualizacoes = await _obter_atualizacoes(offset)
+            espera = 1
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"[Telegram] Falha no getUpdates (nova tentativa em {espera}s): {e}")
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 60)
+            continue
+        if not atualizacoes:
+            continue
+
+        offset = max(atualizacao["update_id"] for atualizacao in atualizacoes) + 1
+        _gravar_offset(offset)
+        for atualizacao in atualizacoes:
+            try:
+                _tratar(atualizacao)
+            except Exception:
+                logger.exception("Erro ao tratar uma mensagem do Telegram.")
@@ -0,0 +1,76 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      ratelimit.py                                                      #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Limitador de comandos por utilizador com janela deslizante.       #
+#                Não cria tarefas nem temporizadores: os registos antigos são      #
+#                descartados quando o nick volta a usar um comando. Os limites     #
+#                podem ser definidos por canal e por comando, e a memória é        #
+#                limitada descartando os nicks inativos há mais tempo.             #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import collections
+import time
+
+from config import RATE_LIMIT, RATE_LIMIT_CANAIS, RATE_LIMIT_COMANDOS, RATE_LIMIT_MAX_NICKS
+
+class LimitadorTaxa:
+    """
+    Janela deslizante por (nick, âmbito). Cada janela guarda apenas os
+    instantes dos últimos N usos, por isso ocupa no máximo N posições.
+    """
+
+    def __init__(self, padrao=RATE_LIMIT, por_canal=RATE_LIMIT_CANAIS,
+                 por_comando=RATE_LIMIT_COMANDOS, max_nicks=RATE_LIMIT_MAX_NICKS):
+        self.padrao = padrao
+        self.por_canal = por_canal
+        self.por_comando = por_comando
+        self.max_nicks = max_nicks
+        self._janelas = collections.OrderedDict()  # (nick, âmbito) → deque de instantes
+        self.bloqueados = 0
+
+    def _janela(self, chave, limite, agora):
+        janela = self._janelas.get(chave)
+        if janela is None:
+            janela = self._janelas[chave] = collections.deque(maxlen=limite[0])
+        else:
+            self._janelas.move_to_end(chave)  # Usado agora: passa a ser o mais recente
+        # Expiração preguiçosa: só aqui se descartam os usos fora da janela
+        while janela and janela[0] <= agora - limite[1]:
+            janela.popleft()
+        return janela
+
+    def permitir(self, nick, canal=None, comando=None):
+        """
+        Verifica (e regista) um uso de 'comando' por 'nick' em 'canal'.
+        Devolve False se algum dos limites aplicáveis já foi atingido.
+        """
+        agora = time.monotonic()
+        nick = nick.lower()
+        canal = canal.lower() if canal else None
+
+        verificacoes = [((nick, canal), self.por_canal.get(canal, self.padrao))]
+        if comando in self.por_comando:
+            verificacoes.append(((nick, comando), self.por_comando[comando]))
+
+        janelas = [self._janela(chave, limite, agora) for chave, limite in verificacoes]
+        self._aparar()
+
+        if any(len(janela) >= janela.maxlen for janela in janelas):
+            self.bloqueados += 1
+            return False
+        for janela in janelas:
+            janela.append(agora)
+        return True
+
+    def _aparar(self):
+        # Mantém a memória limitada: sai quem está inativo há mais tempo.
+        while len(self._janelas) > self.max_nicks:
+            self._janelas.popitem(last=False)
+
+    def __len__(self):
+        return len(self._janelas)
@@ -0,0 +1,38 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      conftest.py                                                       #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Configuração comum dos testes: variáveis de ambiente que          #
+#                apontam as bases de dados e o log para uma pasta temporária e     #
+#                caminhos para importar o bot e as APIs falsas de benchmarks/.     #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import os
+import sys
+import tempfile
+
+# Antes de importar o config: bases de dados, log e offsets numa pasta
+# temporária, e janelas curtas para os testes não esperarem segundos
+PASTA = tempfile.mkdtemp(prefix="testes-bot-")
+os.environ.update({
+    "LOG_FICHEIRO": os.path.join(PASTA, "bot.log"),
+    "LOG_NIVEL": "WARNING",
+    "SEEN_DB": os.path.join(PASTA, "seen.db"),
+    "ARQUIVO_PASTA": os.path.join(PASTA, "arquivo"),
+    "ALERTAS_DB": os.path.join(PASTA, "alertas.db"),
+    "PERFIL_PASTA": os.path.join(PASTA, "perfis"),
+    "TELEGRAM_BOT_TOKEN": "teste",
+    "TELEGRAM_CHAT_ID": "1",
+    "TELEGRAM_JANELA": "0.05",
+    "TELEGRAM_INTERVALO": "0",
+    "TELEGRAM_POLL_TIMEOUT": "1",
+    "TELEGRAM_OFFSET_FICHEIRO": os.path.join(PASTA, "telegram.offset"),
+})
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))  # APIs falsas do Telegram e da Binance
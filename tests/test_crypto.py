@@ -0,0 +1,92 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      test_crypto.py                                                    #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Testes do índice de pares do !crypto contra a Binance falsa       #
+#                de benchmarks/servidores.py: um só pedido de preço por moeda,     #
+#                enganos recusados localmente com sugestões, arranque a partir de  #
+#                db/symbols.json e atualização do índice em fundo.                 #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+import json
+
+import pytest
+
+from servidores import APIsFalsas
+from plugins import crypto
+
+@pytest.fixture
+def binance(monkeypatch, tmp_path):
+    # Cache e índice vazios, snapshot em tmp_path/db/symbols.json e a Binance falsa
+    monkeypatch.chdir(tmp_path)
+    crypto._cache.clear()
+    crypto._instalar_indice([])
+    api = APIsFalsas(moedas=50)
+    yield api
+    crypto._cache.clear()
+    crypto._instalar_indice([])
+
+async def _com_api(api, teste, monkeypatch):
+    porta = await api.iniciar()
+    monkeypatch.setattr(crypto, "BINANCE_URL", f"http://127.0.0.1:{porta}/api/v3")
+    try:
+        await teste()
+    finally:
+        await crypto.fechar_sessao()
+        await api.parar()
+
+def test_par_resolvido_com_um_so_pedido(binance, monkeypatch):
+    async def teste():
+        await crypto.atualizar_indice()
+        antes = binance.binance
+        assert await crypto.get_crypto_price("m001") == "💶 M001: 1.23450000 EUR"
+        assert binance.binance - antes == 1  # Base → cotação vem do índice: sem tentar outros pares
+        await crypto.get_crypto_price("M001")
+        assert binance.binance - antes == 1  # Segunda vez vem da cache
+
+    asyncio.run(_com_api(binance, teste, monkeypatch))
+
+def test_engano_recusado_sem_pedidos_e_com_sugestoes(binance, monkeypatch):
+    async def teste():
+        await crypto.atualizar_indice()
+        antes = binance.binance
+        resposta = await crypto.get_crypto_price("M01")
+        assert resposta.startswith("⚠️ Moeda 'M01' não encontrada. Querias dizer: ")
+        assert "M010" in resposta
+        assert binance.binance == antes  # Recusado localmente
+
+    asyncio.run(_com_api(binance, teste, monkeypatch))
+
+def test_arranque_com_o_snapshot_do_disco(binance, tmp_path):
+    (tmp_path / "db").mkdir()
+    (tmp_path / "db" / "symbols.json").write_text(json.dumps(
+        {"atualizado": 0, "pares": [["BTCEUR", "BTC", "EUR"], ["XRPUSDT", "XRP", "USDT"]]}))
+    crypto.carregar_snapshot()
+    assert crypto._indice == {"BTC": {"EUR": "BTCEUR"}, "XRP": {"USDT": "XRPUSDT"}}
+    assert crypto.sugestoes("BT") == ["BTC"]
+
+def test_atualizacao_em_fundo_substitui_o_indice(binance, monkeypatch, tmp_path):
+    (tmp_path / "db").mkdir()
+    (tmp_path / "db" / "symbols.json").write_text(json.dumps(
+        {"atualizado": 0, "pares": [["VELHAEUR", "VELHA", "EUR"]]}))
+
+    async def teste():
+        tarefa = asyncio.create_task(crypto.manter_indice(intervalo=3600))
+        try:
+            for _ in range(500):
+                if "M049" in crypto._indice:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            tarefa.cancel()
+        assert "VELHA" not in crypto._indice
+        assert len(crypto._indice) == 50
+        gravado = json.loads((tmp_path / "db" / "symbols.json").read_text())
+        assert len(gravado["pares"]) == 50  # O snapshot também foi substituído
+
+    asyncio.run(_com_api(binance, teste, monkeypatch))
@@ -0,0 +1,124 @@
+# ================================================================================ #
+#                                                                                  #
+# Ficheiro:      test_telegram.py                                                  #
+# Autor:         NunchuckCoder                                                     #
+# Versão:        1.0                                                               #
+# Data:          Outubro 2026                                                      #
+# Descrição:     Testes da ponte com o Telegram contra a API falsa de              #
+#                benchmarks/servidores.py: offset gravado e sem repetições depois  #
+#                de reiniciar, /comandos entregues ao despacho e rajadas do canal  #
+#                agrupadas numa mensagem que depois é editada.                     #
+# Licença:       MIT License                                                       #
+#                                                                                  #
+# ================================================================================ #
+
+import asyncio
+
+from servidores import APIsFalsas
+from plugins import telegram
+
+CHAT = "-1001"
+CANAL = "#canal"
+
+class Rede:
+    nome = "rede"
+
+class Limitador:
+    def permitir(self, nick, canal, comando):
+        return True
+
+class BotFalso:
+    # O mínimo do IRCBot que a ponte usa: rede, message e o limitador dos comandos
+    def __init__(self):
+        self.rede = Rede()
+        self.limitador = Limitador()
+        self.mensagens = []
+
+    def message(self, alvo, texto, prioridade=None):
+        self.mensagens.append((alvo, texto))
+
+async def _esperar(condicao, limite=5):
+    fim = asyncio.get_running_loop().time() + limite
+    while not condicao():
+        assert asyncio.get_running_loop().time() < fim, "tempo esgotado"
+        await asyncio.sleep(0.01)
+
+async def _com_api(teste, monkeypatch, tmp_path):
+    # Corre 'teste(api)' com o plugin ligado à API falsa e uma ponte CHAT=#canal
+    api = APIsFalsas()
+    porta = await api.iniciar()
+    monkeypatch.setattr(telegram, "TELEGRAM_API_URL", f"http://127.0.0.1:{porta}")
+    monkeypatch.setattr(telegram, "TELEGRAM_PONTES", {CHAT: CANAL})
+    monkeypatch.setattr(telegram, "TELEGRAM_OFFSET_FICHEIRO", str(tmp_path / "telegram.offset"))
+    try:
+        await teste(api)
+    finally:
+        await telegram.fechar_telegram()
+        await api.parar()
+        telegram._retransmissao.clear()
+
+def test_offset_gravado_e_sem_repeticoes_depois_de_reiniciar(monkeypatch, tmp_path):
+    async def teste(api):
+        api.publicar(CHAT, "primeira")
+        api.publicar(CHAT, "segunda")
+        bot = BotFalso()
+        tarefa = asyncio.create_task(telegram.ponte([bot]))
+        await _esperar(lambda: len(bot.mensagens) == 2)
+        tarefa.cancel()
+        assert [texto for _, texto in bot.mensagens] == ["<ana@telegram> primeira", "<ana@telegram> segunda"]
+        assert (tmp_path / "telegram.offset").read_text() == "3"
+
+        # Reinício: o offset gravado faz o getUpdates saltar o que já foi tratado
+        api.publicar(CHAT, "terceira")
+        bot = BotFalso()
+        tarefa = asyncio.create_task(telegram.ponte([bot]))
+        await _esperar(lambda: bot.mensagens)
+        await asyncio.sleep(0.1)
+        tarefa.cancel()
+        assert bot.mensagens == [(CANAL, "<ana@telegram> terceira")]
+        assert (tmp_path / "telegram.offset").read_text() == "4"
+
+    asyncio.run(_com_api(teste, monkeypatch, tmp_path))
+
+def test_comando_do_chat_chega_ao_despacho(monkeypatch, tmp_path):
+    despachados = []
+    monkeypatch.setattr(telegram.commands, "despachar",
+                        lambda bot, source, comando, args, canal: despachados.append(
+                            (bot.chat_id, source, comando, args, canal)))
+
+    async def teste(api):
+        api.publicar(CHAT, "/seen@MeuBot ana")
+        bot = BotFalso()
+        tarefa = asyncio.create_task(telegram.ponte([bot]))
+        await _esperar(lambda: despachados)
+        tarefa.cancel()
+        assert despachados == [(CHAT, "ana@telegram", "!seen", ["ana"], CANAL)]
+        assert bot.mensagens == []  # O comando não é retransmitido como texto
+
+    asyncio.run(_com_api(teste, monkeypatch, tmp_path))
+
+def test_rajada_do_canal_agrupada_e_depois_editada(monkeypatch, tmp_path):
+    enviados = []
+
+    async def teste(api):
+        api.ao_enviar = lambda chat_id, texto, instante: enviados.append((chat_id, texto))
+        telegram._configurar_pontes([BotFalso()])
+
+        # Uma rajada de linhas no canal dá uma só mensagem no chat
+        for i in range(5):
+            telegram.retransmitir("rede", CANAL, "bob", f"linha {i}")
+        await _esperar(lambda: enviados)
+        await asyncio.sleep(0.1)
+        assert api.telegram == 1 and api.edicoes == 0
+        assert enviados[0][0] == CHAT
+        assert all(f"linha {i}" in enviados[0][1] for i in range(5))
+
+        # A rajada seguinte edita essa mensagem em vez de abrir outra
+        for i in range(5, 8):
+            telegram.retransmitir("rede", CANAL, "bob", f"linha {i}")
+        await _esperar(lambda: api.edicoes == 1)
+        await asyncio.sleep(0.1)
+        assert api.telegram == 2
+        assert all(f"linha {i}" in enviados[-1][1] for i in range(8))
+
+    asyncio.run(_com_api(teste, monkeypatch, tmp_path))